@@ -1,23 +1,105 @@
-#from Crypto.Hash import CMAC
-from Crypto.Cipher import AES
+from AES_ECB import AES_ECB
 from binascii import b2a_hex
+import functools
+
+BLOCK_SIZE = 16
+CMAC_CACHE_SIZE = 4096
+RB = 0x87
+MASK128 = (1 << 128) - 1
+
+def cmac_dbl(v):
+    '''
+    v: a block in integer.
+    doubling in GF(2^128) defined in RFC 4493.
+    '''
+    v <<= 1
+    if v >> 128:
+        v = (v & MASK128) ^ RB
+    return v
+
+class CMACKey(object):
+    '''
+    the AES context and the subkeys K1 and K2 of a key, derived once.
+    It has no state of a message, so that it can be shared by get_cmac().
+    '''
+    def __init__(self, key):
+        self.ecb = AES_ECB(bytes(key))
+        L = int.from_bytes(self.ecb.encrypt_fixed(b"\x00"*BLOCK_SIZE), "big")
+        self.k1 = cmac_dbl(L)
+        self.k2 = cmac_dbl(self.k1)
+
+    def new(self):
+        '''
+        return a new AES_CMAC with this key.
+        '''
+        return AES_CMAC(self)
+
+    def mac(self, data):
+        '''
+        data: any size of bytes.
+        return the 16 bytes of CMAC of the data.
+        '''
+        data = bytes(data)
+        n = len(data)
+        if n and n % BLOCK_SIZE == 0:
+            last_pos = n - BLOCK_SIZE
+            last = int.from_bytes(data[last_pos:], "big") ^ self.k1
+        else:
+            last_pos = n - n % BLOCK_SIZE
+            last = data[last_pos:] + b"\x80"
+            last += b"\x00"*(BLOCK_SIZE - len(last))
+            last = int.from_bytes(last, "big") ^ self.k2
+        enc = self.ecb.encrypt_fixed
+        x = 0
+        for i in range(0, last_pos, BLOCK_SIZE):
+            x ^= int.from_bytes(data[i:i+BLOCK_SIZE], "big")
+            x = int.from_bytes(enc(x.to_bytes(BLOCK_SIZE, "big")), "big")
+        return enc((x ^ last).to_bytes(BLOCK_SIZE, "big"))
 
 class AES_CMAC():
     '''
+    key: in bytes, or CMACKey.  the subkeys of the key in bytes are
+    taken from get_cmac(), and each AES_CMAC has its own buffer.
+
     >>> cmac = AES_CMAC(b'Sixteen byte key')
     >>> cmac.update(b'Hello')
     >>> print(cmac.hexdigest())
     '''
     def __init__(self, key):
-        self.obj = CMAC.new(key, ciphermod=AES)
-        self.__cmac = None
+        if not isinstance(key, CMACKey):
+            key = get_cmac(bytes(key))
+        self.key = key
+        self.__chunks = []
 
     def update(self, data):
-        self.__cmac = self.obj.update(data)
+        self.__chunks.append(bytes(data))
 
     def get(self):
-        return self.__cmac
+        return self.key.mac(b"".join(self.__chunks))
+
+    def hexdigest(self):
+        return b2a_hex(self.get()).decode()
+
+    def mac(self, data):
+        '''
+        data: any size of bytes.
+        return the 16 bytes of CMAC of the data.
+        it doesn't touch the buffer of update().
+        '''
+        return self.key.mac(data)
 
-    def hexdigetst(self):
-        return b2a_hex(self.__cmac)
+@functools.lru_cache(maxsize=CMAC_CACHE_SIZE)
+def get_cmac(key):
+    '''
+    key: in bytes.
+    return the CMACKey for the key, cached per key.
+    use get_cmac(key).new() or AES_CMAC(key) to hash a message by update().
+    '''
+    return CMACKey(key)
 
+def aes_cmac(key, data):
+    '''
+    key: in bytes.
+    data: in bytes.
+    '''
+    return get_cmac(bytes(key)).mac(data)
@@ -1,4 +1,7 @@
 from Crypto.Cipher import AES
+import functools
+
+ECB_CACHE_SIZE = 4096
 
 class AES_ECB():
     def __init__(self, key):
@@ -10,13 +13,12 @@ class AES_ECB():
     def encrypt(self, data):
         '''
         data: any size of bytearray. expanded into 16 bytes if less.
+        all blocks are encrypted in one call.
         '''
-        blk_list = []
-        for i in range(0,len(data),16):
-            blk = data[i:i+16]
-            blk += b"\x00"*(16-len(blk))
-            blk_list.append(self.encrypt_fixed(blk))
-        return b"".join(blk_list)
+        pad = -len(data) % 16
+        if pad:
+            data = bytes(data) + b"\x00"*pad
+        return self.aes_ecb.encrypt(bytes(data))
 
     def encrypt_fixed(self, blk):
         '''
@@ -24,11 +26,30 @@ class AES_ECB():
         '''
         return self.aes_ecb.encrypt(bytes(blk))
 
+    def decrypt(self, data):
+        '''
+        data: the size of data must be a multiple of 16 bytes.
+        '''
+        return self.aes_ecb.decrypt(bytes(data))
+
+@functools.lru_cache(maxsize=ECB_CACHE_SIZE)
+def get_aes_ecb(key):
+    '''
+    key: in bytes.
+    return the AES_ECB for the key, cached per key.
+    '''
+    return AES_ECB(key)
+
 def aes_ecb_encrypt(key, data):
     '''
     key: in bytes.
     data: in bytes.
     '''
-    cipher = AES_ECB(key)
-    return cipher.encrypt(data)
+    return get_aes_ecb(bytes(key)).encrypt(data)
 
+def aes_ecb_decrypt(key, data):
+    '''
+    key: in bytes.
+    data: in bytes.
+    '''
+    return get_aes_ecb(bytes(key)).decrypt(data)
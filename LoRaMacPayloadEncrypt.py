@@ -2,11 +2,19 @@
 
 from AES_ECB import AES_ECB
 import binascii
+import struct
+import functools
 
 # The direction field (Dir) is 0 for uplink frames and 1 for downlink frames.
 UP_LINK = 0
 DOWN_LINK = 1
 
+# the number of keys of which the AES context is cached.
+CIPHER_CACHE_SIZE = 4096
+
+# 0x01 | 4 x 0x00 | Dir | DevAddr | FCntUp or FCntDown | 0x00 | (i)
+A_BLOCK_STRUCT = struct.Struct("<B4xBIIxB")
+
 '''
 LoRaWAN MAC Payload encoder/decoder.
 
@@ -31,54 +39,150 @@ in Lora-net/LoRaMac-node.
 '''
 def LoRaMacPayloadEncrypt(buf_hex, key_hex, devaddr_hex, dir_down, fcnt_hex,
                           bigendian=True):
-    buf = bytearray(binascii.a2b_hex(buf_hex))
-    key = binascii.a2b_hex(key_hex)
     devaddr = binascii.a2b_hex(devaddr_hex)
     fcnt = binascii.a2b_hex(fcnt_hex)
-    size = len(buf)
-    encBuffer = bytearray(size)
-
-    aBlock = bytearray(16)
-    aBlock[0] = 1
-    aBlock[5] = dir_down
     if bigendian:
-        aBlock[6] = devaddr[3]
-        aBlock[7] = devaddr[2]
-        aBlock[8] = devaddr[1]
-        aBlock[9] = devaddr[0]
-        aBlock[10] = fcnt[3]
-        aBlock[11] = fcnt[2]
-        aBlock[12] = fcnt[1]
-        aBlock[13] = fcnt[0]
-    else:
-        aBlock[6] = devaddr[0]
-        aBlock[7] = devaddr[1]
-        aBlock[8] = devaddr[2]
-        aBlock[9] = devaddr[3]
-        aBlock[10] = fcnt[0]
-        aBlock[11] = fcnt[1]
-        aBlock[12] = fcnt[2]
-        aBlock[13] = fcnt[3]
-
-    bufferIndex = 0
-    ctr = 1
-
-    cipher = AES_ECB(key)
-
-    while size >= 16:
-        aBlock[15] = ctr & 0xff
-        ctr += 1
-        sBlock = bytearray(cipher.encrypt(aBlock))
-        for i in range(16):
-            encBuffer[bufferIndex + i] = buf[bufferIndex + i] ^ sBlock[i]
-        size -= 16
-        bufferIndex += 16
-
-    if size > 0:
-        aBlock[15] = ctr & 0xff
-        sBlock = bytearray(cipher.encrypt(aBlock))
-        for i in range(size):
-            encBuffer[bufferIndex + i] = buf[bufferIndex + i] ^ sBlock[i]
-
-    return encBuffer
+        devaddr = devaddr[::-1]
+        fcnt = fcnt[::-1]
+    return bytearray(LoRaMacPayloadEncryptRaw(binascii.a2b_hex(buf_hex),
+                                              binascii.a2b_hex(key_hex),
+                                              struct.unpack("<I", devaddr)[0],
+                                              dir_down,
+                                              struct.unpack("<I", fcnt)[0]))
+
+'''
+LoRaWAN MAC Payload encoder/decoder taking bytes and integers.
+
+Arguments:
+    buf: payload in bytes.
+    key: key in bytes (16-byte).
+    devaddr: DevAddr in integer.
+    dir_down: UP_LINK(=0) or DOWN_LINK(=1)
+    fcnt: 32-bit FCnt in integer.
+'''
+def LoRaMacPayloadEncryptRaw(buf, key, devaddr, dir_down, fcnt):
+    return get_payload_cipher(bytes(key)).encrypt(buf, devaddr, dir_down, fcnt)
+
+'''
+LoRaWAN MAC Payload encoder/decoder bound to a key.
+
+The AES context is created once for the key.  All A blocks for a payload
+are built in one buffer and encrypted in one ECB call, and the key stream
+is XORed with the payload as a single integer.
+'''
+class LoRaMacPayloadCipher(object):
+    def __init__(self, key):
+        '''
+        key: 16 bytes of bytes.
+        '''
+        self.cipher = AES_ECB(key)
+
+    def keystream(self, size, devaddr, dir_down, fcnt):
+        '''
+        return the key stream of the size, i.e. S = S1 | S2 | .. | Sk
+        '''
+        nb_blocks = (size + 15) // 16
+        aBlocks = bytearray(16 * nb_blocks)
+        fill_a_blocks(aBlocks, 0, nb_blocks, devaddr, dir_down, fcnt)
+        return self.cipher.encrypt(aBlocks)
+
+    def encrypt(self, buf, devaddr, dir_down, fcnt):
+        '''
+        buf: payload in bytes.
+        it returns the encrypted or decrypted payload in bytes.
+        '''
+        size = len(buf)
+        if size == 0:
+            return b""
+        sBlocks = self.keystream(size, devaddr, dir_down, fcnt)
+        x = (int.from_bytes(buf, "big") ^
+             int.from_bytes(sBlocks[:size], "big"))
+        return x.to_bytes(size, "big")
 
+    decrypt = encrypt
+
+'''
+fill nb_blocks of A blocks into buf from the block index of pos.
+'''
+def fill_a_blocks(buf, pos, nb_blocks, devaddr, dir_down, fcnt):
+    start = 16 * pos
+    end = start + 16 * nb_blocks
+    buf[start:end] = A_BLOCK_STRUCT.pack(1, dir_down, devaddr, fcnt,
+                                         0) * nb_blocks
+    buf[start+15:end:16] = bytes([i & 0xff for i in range(1, nb_blocks + 1)])
+
+'''
+return LoRaMacPayloadCipher for the key, cached for each key.
+key: in bytes.
+'''
+@functools.lru_cache(maxsize=CIPHER_CACHE_SIZE)
+def get_payload_cipher(key):
+    return LoRaMacPayloadCipher(key)
+
+'''
+return numpy module if available, otherwise None.
+'''
+def get_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+'''
+LoRaWAN MAC Payload encoder/decoder for many frames.
+
+Arguments:
+    bufs: list of payload in bytes.
+    keys: list of key in bytes (16-byte).
+    devaddrs: list of DevAddr in integer.
+    dirs: list of UP_LINK(=0) or DOWN_LINK(=1)
+    fcnts: list of 32-bit FCnt in integer.
+    use_numpy: XOR with numpy.  None means to use it if available.
+
+The frames are grouped by the key.  The A blocks of all frames in a group
+are built in one contiguous buffer and encrypted in one ECB call.
+It returns the list of the encrypted or decrypted payloads in bytes,
+in the same order of bufs.
+'''
+def LoRaMacPayloadEncryptBatch(bufs, keys, devaddrs, dirs, fcnts,
+                               use_numpy=None):
+    np = get_numpy() if use_numpy is not False else None
+    if use_numpy and np is None:
+        raise ValueError("numpy is not available.")
+    groups = {}
+    for i, key in enumerate(keys):
+        groups.setdefault(bytes(key), []).append(i)
+    results = [None] * len(bufs)
+    for key, index in groups.items():
+        nb_blocks = [(len(bufs[i]) + 15) // 16 for i in index]
+        aBlocks = bytearray(16 * sum(nb_blocks))
+        pos = 0
+        for i, n in zip(index, nb_blocks):
+            fill_a_blocks(aBlocks, pos, n, devaddrs[i], dirs[i], fcnts[i])
+            pos += n
+        sBlocks = get_payload_cipher(key).cipher.encrypt(aBlocks)
+        if np is not None:
+            # the payloads are placed at the same offset of the A blocks,
+            # padded by 0.  any buffer, e.g. memoryview, can be assigned.
+            pBlocks = bytearray(len(aBlocks))
+            pos = 0
+            for i, n in zip(index, nb_blocks):
+                pBlocks[16*pos:16*pos+len(bufs[i])] = bufs[i]
+                pos += n
+            xBlocks = np.bitwise_xor(np.frombuffer(pBlocks, dtype=np.uint8),
+                                     np.frombuffer(sBlocks, dtype=np.uint8)
+                                     ).tobytes()
+            pos = 0
+            for i, n in zip(index, nb_blocks):
+                results[i] = xBlocks[pos:pos+len(bufs[i])]
+                pos += 16 * n
+        else:
+            pos = 0
+            for i, n in zip(index, nb_blocks):
+                size = len(bufs[i])
+                x = (int.from_bytes(bufs[i], "big") ^
+                     int.from_bytes(sBlocks[16*pos:16*pos+size], "big"))
+                results[i] = x.to_bytes(size, "big")
+                pos += n
+    return results
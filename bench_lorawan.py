@@ -0,0 +1,382 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import io
+import re
+import gc
+import json
+import time
+import random
+import struct
+import argparse
+import subprocess
+import tracemalloc
+import contextlib
+from Crypto.Cipher import AES
+from lorawan_phy_parser import (decode_phy_payload, parse_phy_payload,
+                                decode_mac_cmd, mac_cmd_desc, bytes2hex, Keys,
+                                MSGDIR_UP, MSGDIR_DOWN)
+from LoRaMacPayloadEncrypt import (LoRaMacPayloadEncrypt,
+                                   LoRaMacPayloadEncryptRaw,
+                                   LoRaMacPayloadEncryptBatch)
+from lorawan_batch import decode_batch
+from lorawan_cipher import (lorawan_gen_key, lorawan_mic_data,
+                            lorawan_mic_joinreq, lorawan_mic_joinaccept)
+
+NSKEY = bytes(range(16))
+ASKEY = bytes(range(16, 32))
+AKEY = bytes(range(32, 48))
+KEYS = Keys(NSKEY, ASKEY, AKEY)
+
+#
+# synthetic corpora
+#
+'''
+the MAC commands of random contents, up to max_len bytes.
+'''
+def make_mac_cmds(rnd, msg_dir, max_len):
+    descs = [d for d in mac_cmd_desc[msg_dir] if d is not None]
+    data = b""
+    while True:
+        d = rnd.choice(descs)
+        if len(data) + 1 + d.size > max_len:
+            return data
+        data += bytes([d.cid]) + bytes(rnd.getrandbits(8)
+                                       for i in range(d.size))
+
+def make_data_frame(rnd, dir_down, fopts=b"", fport=None, plain=b""):
+    mtype = rnd.choice([3, 5] if dir_down else [2, 4])
+    devaddr = rnd.getrandbits(32)
+    fcnt = rnd.getrandbits(16)
+    msg = struct.pack("<BIBH", mtype << 5, devaddr, len(fopts), fcnt) + fopts
+    if fport is not None:
+        key = NSKEY if fport == 0 else ASKEY
+        msg += bytes([fport]) + LoRaMacPayloadEncryptRaw(plain, key, devaddr,
+                                                         dir_down, fcnt)
+    return msg + lorawan_mic_data(NSKEY, msg, devaddr, dir_down, fcnt)
+
+def make_joinreq(rnd):
+    msg = b"\x00" + bytes(rnd.getrandbits(8) for i in range(18))
+    return msg + lorawan_mic_joinreq(AKEY, msg)
+
+def make_joinaccept(rnd):
+    plain = bytes(rnd.getrandbits(8) for i in range(12))
+    if rnd.random() < 0.5:
+        plain += bytes(15) + b"\x00"
+    mic = lorawan_mic_joinaccept(AKEY, b"\x20" + plain)
+    return b"\x20" + AES.new(AKEY, AES.MODE_ECB).decrypt(plain + mic)
+
+def random_bytes(rnd, lo, hi):
+    return bytes(rnd.getrandbits(8) for i in range(rnd.randint(lo, hi)))
+
+'''
+the corpora of the PHYPayloads in bytes, keyed by the name.
+'''
+def make_corpora(n, seed=1):
+    rnd = random.Random(seed)
+    return {
+        "data_up": [make_data_frame(rnd, 0, fport=rnd.randint(1, 223),
+                                    plain=random_bytes(rnd, 1, 51))
+                    for i in range(n)],
+        "data_down": [make_data_frame(rnd, 1, fport=rnd.randint(1, 223),
+                                      plain=random_bytes(rnd, 1, 51))
+                      for i in range(n)],
+        "join": [make_joinreq(rnd) if i % 2 == 0 else make_joinaccept(rnd)
+                 for i in range(n)],
+        "fopts": [make_data_frame(rnd, i % 2,
+                                  fopts=make_mac_cmds(rnd, (MSGDIR_UP,
+                                                            MSGDIR_DOWN)[i % 2],
+                                                      15))
+                  for i in range(n)],
+        "port0": [make_data_frame(rnd, i % 2, fport=0,
+                                  plain=make_mac_cmds(rnd, (MSGDIR_UP,
+                                                            MSGDIR_DOWN)[i % 2],
+                                                      40))
+                  for i in range(n)],
+    }
+
+#
+# benchmarks
+#
+'''
+each benchmark takes the corpora and returns (the number of items, func),
+where func processes all the items once.
+'''
+def bench_decode_phy_payload(corpora, name):
+    frames = corpora[name]
+    def run():
+        for data in frames:
+            decode_phy_payload(data, KEYS)
+    return len(frames), run
+
+def bench_parse_phy_payload(corpora, name):
+    hexstrs = [bytes2hex(data) for data in corpora[name]]
+    nskey, askey, akey = [bytes2hex(k) for k in (NSKEY, ASKEY, AKEY)]
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            for h in hexstrs:
+                parse_phy_payload(h, nskey, askey, akey)
+    return len(hexstrs), run
+
+def bench_decode_mac_cmd(corpora):
+    rnd = random.Random(2)
+    items = [(d, make_mac_cmds(rnd, d, 15))
+             for d in [MSGDIR_UP, MSGDIR_DOWN] * (len(corpora["fopts"]) // 2)]
+    def run():
+        for msg_dir, data in items:
+            decode_mac_cmd(msg_dir, data)
+    return len(items), run
+
+def payload_items(corpora):
+    rnd = random.Random(3)
+    return [(random_bytes(rnd, 1, 51), rnd.getrandbits(32), rnd.getrandbits(1),
+             rnd.getrandbits(32)) for i in range(len(corpora["data_up"]))]
+
+def bench_payload_encrypt(corpora):
+    items = payload_items(corpora)
+    def run():
+        for buf, devaddr, dir_down, fcnt in items:
+            LoRaMacPayloadEncryptRaw(buf, ASKEY, devaddr, dir_down, fcnt)
+    return len(items), run
+
+def bench_payload_encrypt_hex(corpora):
+    key = bytes2hex(ASKEY)
+    items = [(bytes2hex(buf), "%08x" % devaddr, dir_down, "%08x" % fcnt)
+             for buf, devaddr, dir_down, fcnt in payload_items(corpora)]
+    def run():
+        for buf, devaddr, dir_down, fcnt in items:
+            LoRaMacPayloadEncrypt(buf, key, devaddr, dir_down, fcnt)
+    return len(items), run
+
+def bench_payload_encrypt_batch(corpora):
+    items = payload_items(corpora)
+    bufs, devaddrs, dirs, fcnts = [list(v) for v in zip(*items)]
+    keys = [ASKEY] * len(bufs)
+    def run():
+        LoRaMacPayloadEncryptBatch(bufs, keys, devaddrs, dirs, fcnts)
+    return len(items), run
+
+def bench_gen_key(corpora):
+    rnd = random.Random(4)
+    items = [(random_bytes(rnd, 3, 3), random_bytes(rnd, 3, 3),
+              random_bytes(rnd, 2, 2)) for i in range(len(corpora["join"]))]
+    def run():
+        for appnonce, netid, devnonce in items:
+            lorawan_gen_key(AKEY, appnonce, netid, devnonce)
+    return len(items), run
+
+def bench_mic_data(corpora):
+    items = [(data[:-4], struct.unpack_from("<I", data, 1)[0],
+              struct.unpack_from("<H", data, 6)[0])
+             for data in corpora["data_up"]]
+    def run():
+        for msg, devaddr, fcnt in items:
+            lorawan_mic_data(NSKEY, msg, devaddr, 0, fcnt)
+    return len(items), run
+
+def bench_decode_batch(corpora):
+    frames = []
+    for name in ["data_up", "data_down", "fopts", "port0"]:
+        frames += corpora[name]
+    def run():
+        decode_batch(frames)
+    return len(frames), run
+
+'''
+the startup of a python process running args in this directory, in which
+nb_items is 1, i.e. the result is the number of the starts per second.
+'''
+def bench_startup(args):
+    cmd = [sys.executable] + args
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    def run():
+        subprocess.run(cmd, cwd=cwd, stdout=subprocess.DEVNULL, check=True)
+    return 1, run
+
+STARTUP_FRAME = "40F17DBE4900020001954378762B11FF0D"
+startup_benchmarks = [
+    ("startup.import", ["-c", "import lorawan_phy_parser"]),
+    ("startup.cli", ["lorawan_phy_parser.py", "-i", STARTUP_FRAME]),
+    ("startup.cli_keys", ["lorawan_phy_parser.py", "--nskey", bytes2hex(NSKEY),
+                          "--askey", bytes2hex(ASKEY), "--verify-mic",
+                          STARTUP_FRAME]),
+]
+
+benchmarks = [
+    ("decode_phy_payload.%s" % name,
+     (lambda name: lambda c: bench_decode_phy_payload(c, name))(name))
+    for name in ["data_up", "data_down", "join", "fopts", "port0"]
+] + [
+    ("parse_phy_payload.%s" % name,
+     (lambda name: lambda c: bench_parse_phy_payload(c, name))(name))
+    for name in ["data_up", "fopts", "port0"]
+] + [
+    ("decode_mac_cmd", bench_decode_mac_cmd),
+    ("LoRaMacPayloadEncrypt", bench_payload_encrypt_hex),
+    ("LoRaMacPayloadEncryptRaw", bench_payload_encrypt),
+    ("LoRaMacPayloadEncryptBatch", bench_payload_encrypt_batch),
+    ("lorawan_gen_key", bench_gen_key),
+    ("lorawan_mic_data", bench_mic_data),
+    ("decode_batch", bench_decode_batch),
+] + [
+    (name, (lambda args: lambda c: bench_startup(args))(args))
+    for name, args in startup_benchmarks
+]
+
+'''
+run the func repeat times, and return the best items per second and
+the peak of the memory traced in a run in bytes.
+'''
+def measure(nb_items, func, repeat):
+    func()  # warm up
+    best = None
+    gc.collect()
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        t = time.perf_counter() - t0
+        best = t if best is None else min(best, t)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return { "items": nb_items, "fps": nb_items / best, "peak": peak }
+
+def run_benchmarks(n, repeat, pattern=None, out=sys.stdout):
+    corpora = make_corpora(n)
+    results = {}
+    for name, bench in benchmarks:
+        if pattern and not re.search(pattern, name):
+            continue
+        nb_items, func = bench(corpora)
+        results[name] = r = measure(nb_items, func, repeat)
+        print("%-34s %12.0f /s %10.1f KiB peak" % (name, r["fps"],
+                                                 r["peak"] / 1024), file=out)
+    return results
+
+#
+# memory footprint
+#
+'''
+the same tree as the record in dicts, i.e. the footprint before the records
+had __slots__.
+'''
+def record_to_dict(obj):
+    if isinstance(obj, list):
+        return [record_to_dict(v) for v in obj]
+    slots = getattr(type(obj), "__slots__", None)
+    if slots is None:
+        return obj
+    return dict([(k, record_to_dict(getattr(obj, k))) for k in slots])
+
+'''
+return the bytes retained per item by the items made by make(item).
+'''
+def retained_size(make, items):
+    gc.collect()
+    tracemalloc.start()
+    kept = [make(v) for v in items]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size / len(items)
+
+'''
+each returns the list of (name, make, items) of the records, of which
+make(item) returns a record.
+'''
+def memory_frames(corpora):
+    return [("Frame.%s" % name,
+             lambda data: decode_phy_payload(data, KEYS), corpora[name])
+            for name in ["data_up", "join", "fopts", "port0"]]
+
+def memory_mac_cmds(corpora):
+    rnd = random.Random(5)
+    ret = {}
+    for msg_dir in [MSGDIR_UP, MSGDIR_DOWN]:
+        for t in mac_cmd_desc[msg_dir]:
+            if t is None or t.size == 0:
+                continue
+            name = type(t.decoder(bytes(t.size))).__name__
+            ret[name] = (name, t.decoder,
+                         [random_bytes(rnd, t.size, t.size)
+                          for i in range(len(corpora["fopts"]))])
+    return list(ret.values())
+
+def run_memory(n, pattern=None, out=sys.stdout):
+    corpora = make_corpora(n)
+    results = {}
+    print("%-34s %12s %12s" % ("", "record", "dict"), file=out)
+    for name, make, items in memory_frames(corpora) + memory_mac_cmds(corpora):
+        if pattern and not re.search(pattern, name):
+            continue
+        record = retained_size(make, items)
+        plain = retained_size(lambda v: record_to_dict(make(v)), items)
+        results[name] = { "record": record, "dict": plain }
+        print("%-34s %10.0f B %10.0f B %6.2fx" % (name, record, plain,
+                                                  record / plain), file=out)
+    return results
+
+'''
+compare the results with the baseline.
+return the names of the benchmarks slower than the baseline by threshold.
+'''
+def compare(results, baseline, threshold, out=sys.stdout):
+    regressions = []
+    for name, r in results.items():
+        b = baseline.get(name)
+        if b is None:
+            continue
+        ratio = r["fps"] / b["fps"]
+        mark = ""
+        if ratio < 1 - threshold:
+            mark = "  REGRESSION"
+            regressions.append(name)
+        print("%-34s %12.0f /s %12.0f /s %6.2fx%s" % (name, r["fps"],
+                                                    b["fps"], ratio, mark),
+              file=out)
+    return regressions
+
+def parse_args():
+    p = argparse.ArgumentParser(description="""
+        benchmark of the parser and the crypto.
+        the frames per second and the peak memory of each benchmark are
+        shown.""")
+    p.add_argument("-n", action="store", dest="n", type=int, default=2000,
+        help="specify the number of the frames in each corpus.")
+    p.add_argument("--repeat", action="store", dest="repeat", type=int,
+        default=5, help="specify the number of the runs, the best is taken.")
+    p.add_argument("-k", action="store", dest="pattern",
+        help="run only the benchmarks of which name matches the regex.")
+    p.add_argument("--save", action="store", dest="save",
+        help="save the results into the file as the baseline.")
+    p.add_argument("--compare", action="store", dest="compare",
+        help="compare the results with the baseline in the file.")
+    p.add_argument("--threshold", action="store", dest="threshold",
+        type=float, default=0.1,
+        help="specify the ratio of the slowdown regarded as a regression.")
+    p.add_argument("--memory", action="store_true", dest="f_memory",
+        help="show the bytes retained per decoded record and per the same "
+        "fields in dicts, instead of the speed.")
+    return p.parse_args()
+
+def main():
+    opt = parse_args()
+    if opt.f_memory:
+        run_memory(opt.n, opt.pattern)
+        return
+    results = run_benchmarks(opt.n, opt.repeat, opt.pattern)
+    if opt.save:
+        with open(opt.save, "w") as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if opt.compare:
+        with open(opt.compare) as f:
+            baseline = json.load(f)
+        print("", "%-34s %15s %15s" % ("", "current", "baseline"), sep="\n")
+        if compare(results, baseline, opt.threshold):
+            exit(1)
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+from LoRaMacPayloadEncrypt import get_numpy
+
+# the number of the frames decoded at once by iter_batches().
+BATCH_SIZE = 65536
+MIC_LEN = 4
+# MHDR | DevAddr | FCtrl | FCnt | MIC
+MIN_DATA_LEN = 1 + 7 + MIC_LEN
+# the offset of FOpts.
+FOPTS_OFFSET = 8
+# the MTypes of the downlink, i.e. Join Accept and Data Down.
+DOWN_MTYPES = (1, 3, 5)
+
+def require_numpy():
+    np = get_numpy()
+    if np is None:
+        raise ValueError("ERROR: numpy is required for the batch decoder.")
+    return np
+
+'''
+pack the frames in bytes into a 2-D uint8 array padded by 0, and
+return (the array, the lengths of the frames in int64).
+    width: the number of the columns, the max length if None.
+        the frames longer than it are truncated.
+'''
+def pack_frames(frames, width=None):
+    np = require_numpy()
+    frames = [bytes(f) for f in frames]
+    n = len(frames)
+    lengths = np.fromiter(map(len, frames), dtype=np.int64, count=n)
+    if width is None:
+        width = int(lengths.max()) if n else 0
+    arr = np.zeros((n, width), dtype=np.uint8)
+    if n == 0 or width == 0:
+        return arr, lengths
+    buf = np.frombuffer(b"".join(frames), dtype=np.uint8)
+    offsets = np.zeros(n, dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    # the row and the column of each byte in buf.
+    rows = np.repeat(np.arange(n), lengths)
+    cols = np.arange(len(buf)) - np.repeat(offsets, lengths)
+    keep = cols < width
+    arr[rows[keep], cols[keep]] = buf[keep]
+    return arr, lengths
+
+'''
+decode the headers of the frames packed by pack_frames() all at once,
+and return a dict of the column arrays of the fields, which can be passed
+to pandas.DataFrame() or pyarrow.table() as it is.
+
+    mtype, major: MHDR.
+    dir_down: True for the downlink.
+    is_data: True for the data frames long enough to have the FHDR.
+    devaddr, fctrl, adr, ack, adrackreq, classb, fpending, foptslen, fcnt:
+        FHDR, 0 for the others than the data frames.
+        adrackreq and classb are only for uplink, fpending is only for
+        downlink, same as decode_fctrl().
+    fport: FPort, or -1 if absent.
+    frm_payload_len: the length of FRMPayload.
+    mic: the MIC in uint32, of which "%08x" is same as the hex string of
+        the MIC, 0 if the frame is too short or truncated by the width.
+    length: the length of the frame.
+'''
+def decode_headers(arr, lengths):
+    np = require_numpy()
+    arr = np.asarray(arr, dtype=np.uint8)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    n, width = arr.shape
+    rows = np.arange(n)
+
+    def col(i):
+        if i < width:
+            return arr[:, i]
+        return np.zeros(n, dtype=np.uint8)
+
+    def gather(pos, valid):
+        if width == 0:
+            return np.zeros(n, dtype=np.uint8)
+        v = arr[rows, np.clip(pos, 0, width - 1)]
+        return np.where(valid, v, 0).astype(np.uint8)
+
+    b0 = col(0)
+    mtype = b0 >> 5
+    major = b0 & 0x03
+    dir_down = np.isin(mtype, DOWN_MTYPES)
+    is_data = (mtype >= 2) & (mtype <= 5) & (lengths >= MIN_DATA_LEN)
+    u32 = np.uint32
+    devaddr = (col(1).astype(u32) | (col(2).astype(u32) << 8) |
+               (col(3).astype(u32) << 16) | (col(4).astype(u32) << 24))
+    devaddr = np.where(is_data, devaddr, 0).astype(u32)
+    fctrl = np.where(is_data, col(5), 0).astype(np.uint8)
+    bit6 = (fctrl >> 6) & 1
+    bit4 = (fctrl >> 4) & 1
+    fcnt = np.where(is_data, col(6).astype(np.uint16) |
+                    (col(7).astype(np.uint16) << 8), 0).astype(np.uint16)
+    foptslen = fctrl & 0x0f
+    fport_pos = FOPTS_OFFSET + foptslen.astype(np.int64)
+    has_fport = is_data & (fport_pos < lengths - MIC_LEN) & (fport_pos < width)
+    fport = np.where(has_fport,
+                     gather(fport_pos, has_fport).astype(np.int16), -1)
+    mic_pos = lengths - MIC_LEN
+    has_mic = (lengths >= 1 + MIC_LEN) & (lengths <= width)
+    mic = np.zeros(n, dtype=u32)
+    for k in range(MIC_LEN):
+        mic = (mic << 8) | gather(mic_pos + k, has_mic).astype(u32)
+    return {
+        "mtype": mtype,
+        "major": major,
+        "dir_down": dir_down,
+        "is_data": is_data,
+        "devaddr": devaddr,
+        "fctrl": fctrl,
+        "adr": fctrl >> 7,
+        "ack": (fctrl >> 5) & 1,
+        "adrackreq": np.where(dir_down, 0, bit6).astype(np.uint8),
+        "classb": np.where(dir_down, 0, bit4).astype(np.uint8),
+        "fpending": np.where(dir_down, bit4, 0).astype(np.uint8),
+        "foptslen": foptslen,
+        "fcnt": fcnt,
+        "fport": fport,
+        "frm_payload_len": np.where(has_fport,
+                                    lengths - MIC_LEN - fport_pos - 1, 0),
+        "mic": mic,
+        "length": lengths,
+    }
+
+'''
+decode the headers of the frames in bytes.
+'''
+def decode_batch(frames):
+    return decode_headers(*pack_frames(frames))
+
+'''
+yield the dict of the column arrays of every batch_size frames
+from the iterable, so that a large archive is decoded in the bounded
+memory.
+'''
+def iter_batches(frames, batch_size=BATCH_SIZE):
+    batch = []
+    for data in frames:
+        batch.append(data)
+        if len(batch) >= batch_size:
+            yield decode_batch(batch)
+            batch = []
+    if batch:
+        yield decode_batch(batch)
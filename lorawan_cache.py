@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+import copy
+import struct
+import collections
+
+# the max number of the Frames cached.
+CACHE_SIZE = 4096
+# the number of the frames to wait for the duplicates.
+DEDUP_WINDOW = 64
+DEVADDR_STRUCT = struct.Struct("<I")
+# MHDR | DevAddr | FCtrl | FCnt | MIC
+MIN_DATA_LEN = 1 + 7 + 4
+
+class DecodeCache(object):
+    '''
+    LRU cache of the Frames decoded, for the same uplink received by
+    the gateways.  It is keyed by the PHYPayload in bytes, the keys used
+    to decode it and xfcnt, so that the frame decoded by other keys is not
+    returned.  Only the data frames are cached.
+        maxsize: the max number of the Frames cached.
+        hits, misses: the number of the lookups found and not found.
+    '''
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.table = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.table)
+
+    def make_key(self, data, keys, xfcnt):
+        '''
+        return the key of the frame, or None if it is not to be cached.
+        keys: Keys or a keystore passed to decode_phy_payload().
+        '''
+        if len(data) < MIN_DATA_LEN or not 2 <= data[0] >> 5 <= 5:
+            return None
+        if hasattr(keys, "lookup"):
+            session = keys.lookup(DEVADDR_STRUCT.unpack_from(data, 1)[0])
+            keys = session if session is not None else keys.default
+        return (bytes(data), keys, xfcnt)
+
+    def get(self, key):
+        '''
+        return the copy of the Frame cached, or None.
+        '''
+        frame = self.table.get(key)
+        if frame is None:
+            self.misses += 1
+            return None
+        self.table.move_to_end(key)
+        self.hits += 1
+        return copy.copy(frame)
+
+    def put(self, key, frame):
+        self.table[key] = copy.copy(frame)
+        if len(self.table) > self.maxsize:
+            self.table.popitem(last=False)
+
+class Deduplicator(object):
+    '''
+    collapse the identical frames received within the window into one,
+    e.g. the same uplink received by the gateways.
+        window: the number of the frames following the first one to wait
+            for its duplicates.
+        duplicates: the number of the frames collapsed.
+    '''
+    def __init__(self, window=DEDUP_WINDOW):
+        self.window = window
+        self.duplicates = 0
+
+    def filter(self, frames, with_meta=False):
+        '''
+        yield the frames in bytes without the duplicates in the order of
+        the first one.
+        with_meta: each item is (meta, frame in bytes), and it yields
+            (the list of the metas of the duplicates, frame in bytes).
+        '''
+        window = self.window
+        pending = {}
+        order = collections.deque()
+        for i, item in enumerate(frames):
+            if with_meta:
+                meta, data = item
+            else:
+                meta, data = None, item
+            key = bytes(data)
+            entry = pending.get(key)
+            if entry is not None:
+                entry[1].append(meta)
+                self.duplicates += 1
+                continue
+            pending[key] = (data, [meta])
+            order.append((i, key))
+            while order[0][0] <= i - window:
+                yield self.pop(pending, order, with_meta)
+        while order:
+            yield self.pop(pending, order, with_meta)
+
+    def pop(self, pending, order, with_meta):
+        data, metas = pending.pop(order.popleft()[1])
+        if with_meta:
+            return metas, data
+        return data
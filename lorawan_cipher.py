@@ -1,5 +1,11 @@
 from AES_ECB import aes_ecb_encrypt as aes128_encrypt
-#from AES_CMAC import aes_cmac
+from AES_ECB import aes_ecb_decrypt as aes128_decrypt
+from AES_CMAC import aes_cmac
+import struct
+
+MIC_LEN = 4
+B0_STRUCT = struct.Struct("<BHxxBIIxB")
+B1_STRUCT = struct.Struct("<BHBBBIIxB")
 
 '''
 Generating LoRaWAN Keys for v1.0
@@ -15,19 +21,96 @@ Return (NwkSKey, AppSKey)
     v1.0.2
     NwkSKey = aes128_encrypt(AppKey, 0x01 | AppNonce | NetID | DevNonce | pad16)
     AppSKey = aes128_encrypt(AppKey, 0x02 | AppNonce | NetID | DevNonce | pad16)
+
+both blocks are encrypted in one call with the cipher cached per AppKey.
 '''
 def lorawan_gen_key(appkey, appnonce, netid, devnonce):
-    base_data = appnonce + netid + devnonce + b"\x00\x00"
-    nskey = aes128_encrypt(appkey, b"\x01" + base_data)
-    askey = aes128_encrypt(appkey, b"\x02" + base_data)
-    return nskey, askey
+    # padded into 15 bytes so that each block is 16 bytes.
+    base_data = appnonce + netid + devnonce + b"\x00"*7
+    keys = aes128_encrypt(appkey, b"\x01" + base_data + b"\x02" + base_data)
+    return keys[:16], keys[16:]
+
+'''
+MIC of the data frames
 
-def lorawan_mic_joinreq():
-    pass
+Arguments:
+    key: NwkSKey (v1.0), FNwkSIntKey or SNwkSIntKey (v1.1) in bytes.
+    msg: MHDR | FHDR | FPort | FRMPayload in bytes.
+    devaddr, fcnt: in integer.  fcnt is the 32-bit FCnt.
+    dir_down: 0 for uplink, 1 for downlink.
+    conf_fcnt: the FCnt of the confirmed frame if ACK is set (v1.1).
+
+    B0 = 0x49 | ConfFCnt(2) | 0x0000 | Dir | DevAddr | FCnt | 0x00 | len(msg)
+    MIC = aes128_cmac(NwkSKey, B0 | msg)[0..3]
+
+In v1.0, ConfFCnt is always 0.
+'''
+def lorawan_b0(msg, devaddr, dir_down, fcnt, conf_fcnt=0):
+    return B0_STRUCT.pack(0x49, conf_fcnt, dir_down, devaddr,
+                          fcnt & 0xffffffff, len(msg))
+
+def lorawan_mic_data(key, msg, devaddr, dir_down, fcnt, conf_fcnt=0):
+    b0 = lorawan_b0(msg, devaddr, dir_down, fcnt, conf_fcnt)
+    return aes_cmac(key, b0 + msg)[:MIC_LEN]
+
+'''
+MIC of the uplink data frames in v1.1
+
+    B1 = 0x49 | ConfFCnt(2) | TxDr | TxCh | Dir | DevAddr | FCntUp | 0x00 |
+         len(msg)
+    cmacS = aes128_cmac(SNwkSIntKey, B1 | msg)
+    cmacF = aes128_cmac(FNwkSIntKey, B0 | msg)
+    MIC = cmacS[0..1] | cmacF[0..1]
+
+the downlink uses lorawan_mic_data() with SNwkSIntKey and conf_fcnt.
+'''
+def lorawan_mic_data11_up(fnwk_key, snwk_key, msg, devaddr, fcnt,
+                          conf_fcnt=0, txdr=0, txch=0):
+    b1 = B1_STRUCT.pack(0x49, conf_fcnt, txdr, txch, 0, devaddr,
+                        fcnt & 0xffffffff, len(msg))
+    cmac_s = aes_cmac(snwk_key, b1 + msg)
+    cmac_f = aes_cmac(fnwk_key, lorawan_b0(msg, devaddr, 0, fcnt) + msg)
+    return cmac_s[:2] + cmac_f[:2]
+
+'''
+MIC of the Join Request
+
+    msg: MHDR | AppEUI | DevEUI | DevNonce
+    MIC = aes128_cmac(AppKey, msg)[0..3]
+
+NwkKey is used instead of AppKey in v1.1.
+'''
+def lorawan_mic_joinreq(key, msg):
+    return aes_cmac(key, msg)[:MIC_LEN]
+
+'''
+MIC of the Join Accept
+
+    msg: MHDR | AppNonce | NetID | DevAddr | DLSettings | RxDelay | CFList,
+         i.e. the decrypted one.
+    MIC = aes128_cmac(AppKey, msg)[0..3]
+
+In v1.1 with OptNeg set, the key is JSIntKey and the prefix is
+JoinReqType | JoinEUI | DevNonce.
+'''
+def lorawan_mic_joinaccept(key, msg, prefix=b""):
+    return aes_cmac(key, prefix + msg)[:MIC_LEN]
 
 def lorawan_encrypt(key, data):
     return aes128_encrypt(key, data)
 
+'''
+Join Accept encryption by the network server
+
+    data: AppNonce | NetID | DevAddr | DLSettings | RxDelay | CFList | MIC
+          i.e. 16 or 32 bytes.
+
+It is encrypted by aes128_decrypt(), so that the device decrypts it
+by aes128_encrypt().
+'''
+def lorawan_encrypt_joinaccept(key, data):
+    return aes128_decrypt(key, data)
+
 if __name__ == "__main__" :
     from binascii import a2b_hex, b2a_hex
     def test_decode(key_hex, data_hex):
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import csv
+import array
+import binascii
+
+# the number of the rows in a row group.
+ROW_GROUP_SIZE = 65536
+
+'''
+the columns of the export, (name, type).
+the types are of Arrow.  the columns are nullable.
+'''
+COLUMNS = (
+    ("mtype", "uint8"),
+    ("major", "uint8"),
+    ("dir", "string"),
+    ("devaddr", "uint32"),
+    ("adr", "uint8"),
+    ("ack", "uint8"),
+    ("adrackreq", "uint8"),
+    ("classb", "uint8"),
+    ("fpending", "uint8"),
+    ("foptslen", "uint8"),
+    ("fcnt", "uint16"),
+    ("fcnt32", "uint32"),
+    ("fport", "uint8"),
+    ("cids", "list<uint8>"),
+    ("frm_payload", "binary"),
+    ("frm_payload_plain", "binary"),
+    ("appeui", "uint64"),
+    ("deveui", "uint64"),
+    ("devnonce", "uint16"),
+    ("mic", "binary"),
+    ("mic_ok", "bool"),
+    ("tmst", "uint32"),
+    ("freq", "float64"),
+    ("datr", "string"),
+    ("rssi", "float64"),
+    ("lsnr", "float64"),
+    ("gweui", "uint64"),
+    ("gateways", "uint16"),
+)
+COLUMN_NAMES = tuple([name for name, t in COLUMNS])
+# the typecodes of array.array for the numeric types.
+TYPECODES = {
+    "uint8": "B",
+    "uint16": "H",
+    "uint32": "I",
+    "uint64": "Q",
+    "float64": "d",
+    "bool": "B",
+}
+# the columns in hex string in CSV, as they are shown.
+HEX_COLUMNS = {
+    "devaddr": "%08x",
+    "appeui": "%016x",
+    "deveui": "%016x",
+    "gweui": "%016x",
+}
+RADIO_FIELDS = ("tmst", "freq", "datr", "rssi", "lsnr", "gweui")
+NO_RADIO = (None,) * (len(RADIO_FIELDS) + 1)
+
+'''
+the radio metadata into the values of RADIO_FIELDS and the number of
+the gateways.  the first one is taken for the metas of the duplicates.
+'''
+def meta_to_radio(meta):
+    nb = 1
+    if isinstance(meta, list):
+        nb = len(meta)
+        meta = meta[0] if meta else None
+    if meta is None:
+        return NO_RADIO
+    return tuple([getattr(meta, k, None) for k in RADIO_FIELDS]) + (nb,)
+
+'''
+the Frame into a row, i.e. the tuple of the values in the order of COLUMNS.
+the Frame is seen by MType, so that it works for any copy of the parser
+module.
+'''
+def frame_to_row(frame):
+    mhdr = frame.mhdr
+    p = frame.payload
+    radio = meta_to_radio(frame.meta)
+    if mhdr.mtype == 0:
+        return ((mhdr.mtype, mhdr.major, frame.msg_dir,
+                 None, None, None, None, None, None, None, None, None, None,
+                 None, None, None, p.appeui, p.deveui, p.devnonce,
+                 frame.mic, frame.mic_ok) + radio)
+    if mhdr.mtype == 1:
+        return ((mhdr.mtype, mhdr.major, frame.msg_dir,
+                 p.devaddr, None, None, None, None, None, None, None, None,
+                 None, None, p.encrypted, p.decrypted, None, None, None,
+                 p.mic if p.mic is not None else frame.mic, frame.mic_ok) +
+                radio)
+    fhdr = p.fhdr
+    fctrl = fhdr.fctrl
+    return ((mhdr.mtype, mhdr.major, frame.msg_dir,
+             fhdr.devaddr, fctrl.adr, fctrl.ack, fctrl.adrackreq,
+             fctrl.classb, fctrl.fpending, fctrl.foptslen, fhdr.fcnt,
+             p.fcnt32, p.fport,
+             None if p.mac_commands is None else
+             [c.cid for c in p.mac_commands],
+             p.frm_payload, p.frm_payload_plain, None, None, None,
+             frame.mic, frame.mic_ok) + radio)
+
+class ColumnBuffer(object):
+    '''
+    the values of a column in a row group.
+    the numeric values are kept in array.array of the type with 0 for null,
+    and valid is 1 or 0 for each value.  the others are kept in a list
+    with None for null.
+    '''
+    __slots__ = ("name", "type", "typecode", "values", "valid", "nulls")
+
+    def __init__(self, name, type):
+        self.name = name
+        self.type = type
+        self.typecode = TYPECODES.get(type)
+        self.clear()
+
+    def clear(self):
+        self.values = array.array(self.typecode) if self.typecode else []
+        self.valid = bytearray()
+        self.nulls = 0
+
+    def append(self, v):
+        if v is None:
+            self.values.append(0 if self.typecode else None)
+            self.valid.append(0)
+            self.nulls += 1
+        else:
+            self.values.append(v)
+            self.valid.append(1)
+
+    def to_list(self):
+        '''
+        return the values in a list with None for null.
+        '''
+        if not self.typecode:
+            return self.values
+        values = self.values.tolist()
+        if self.type == "bool":
+            values = [bool(v) for v in values]
+        if self.nulls:
+            values = [v if ok else None for v, ok in zip(values, self.valid)]
+        return values
+
+#
+# writers
+#
+def csv_format(name, type):
+    if name in HEX_COLUMNS:
+        fmt = HEX_COLUMNS[name]
+        return lambda v: "" if v is None else fmt % v
+    if type == "binary":
+        return lambda v: "" if v is None else binascii.b2a_hex(v).decode()
+    if type == "list<uint8>":
+        return lambda v: "" if v is None else "|".join(["%02x" % i
+                                                        for i in v])
+    if type == "bool":
+        return lambda v: "" if v is None else str(int(v))
+    return lambda v: "" if v is None else str(v)
+
+class CsvWriter(object):
+    '''
+    CSV with the header line.  null is empty, the bytes, DevAddr and EUIs
+    are in hex string, and the CIDs are in hex separated by "|".
+    '''
+    def __init__(self, path):
+        self.f = open(path, "w", newline="")
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(COLUMN_NAMES)
+        self.formats = [csv_format(name, t) for name, t in COLUMNS]
+
+    def write_group(self, columns):
+        cols = []
+        for col, fmt in zip(columns, self.formats):
+            cols.append([fmt(v) for v in col.to_list()])
+        self.writer.writerows(zip(*cols))
+
+    def close(self):
+        self.f.close()
+
+def get_pyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        return None
+
+class ArrowWriter(object):
+    '''
+    Parquet, or Arrow IPC file if fmt is "arrow".  each row group is written
+    as a row group of Parquet, or as a record batch of Arrow.
+    pyarrow is required.
+    '''
+    def __init__(self, path, fmt="parquet"):
+        pa = get_pyarrow()
+        if pa is None:
+            raise ValueError("ERROR: pyarrow is required for %s." % fmt)
+        self.pa = pa
+        types = {
+            "uint8": pa.uint8(),
+            "uint16": pa.uint16(),
+            "uint32": pa.uint32(),
+            "uint64": pa.uint64(),
+            "float64": pa.float64(),
+            "bool": pa.bool_(),
+            "string": pa.string(),
+            "binary": pa.binary(),
+            "list<uint8>": pa.list_(pa.uint8()),
+        }
+        self.schema = pa.schema([(name, types[t]) for name, t in COLUMNS])
+        if fmt == "parquet":
+            import pyarrow.parquet
+            self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        else:
+            import pyarrow.ipc
+            self.writer = pyarrow.ipc.new_file(path, self.schema)
+
+    def write_group(self, columns):
+        pa = self.pa
+        arrays = [pa.array(col.to_list(), type=field.type)
+                  for col, field in zip(columns, self.schema)]
+        table = pa.Table.from_arrays(arrays, schema=self.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        self.writer.close()
+
+class FrameExporter(object):
+    '''
+    accumulate the rows of the Frames in the column buffers, and write them
+    into the writer in each row group.
+
+    >>> exporter = open_export("frames.parquet")
+    >>> for frame in decode_stream(frames, keys):
+    ...     exporter.add(frame)
+    >>> exporter.close()
+    '''
+    def __init__(self, writer, row_group_size=ROW_GROUP_SIZE):
+        self.writer = writer
+        self.row_group_size = row_group_size
+        self.columns = [ColumnBuffer(name, t) for name, t in COLUMNS]
+        self.nb_rows = 0
+
+    def add(self, frame):
+        for col, v in zip(self.columns, frame_to_row(frame)):
+            col.append(v)
+        self.nb_rows += 1
+        if self.nb_rows >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        if self.nb_rows:
+            self.writer.write_group(self.columns)
+            for col in self.columns:
+                col.clear()
+            self.nb_rows = 0
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+'''
+return the FrameExporter of the file, of which format is chosen by
+the extension, .parquet, .arrow (or .feather) or .csv.
+Parquet and Arrow are written into the CSV of the same name if pyarrow
+is not available.
+'''
+def open_export(path, row_group_size=ROW_GROUP_SIZE):
+    ext = os.path.splitext(path)[1].lower()
+    if ext in (".parquet", ".arrow", ".feather"):
+        if get_pyarrow() is not None:
+            fmt = "parquet" if ext == ".parquet" else "arrow"
+            return FrameExporter(ArrowWriter(path, fmt), row_group_size)
+        path = os.path.splitext(path)[0] + ".csv"
+        print("WARNING: pyarrow is not available, written into %s." % path,
+              file=sys.stderr)
+    elif ext != ".csv":
+        raise ValueError("ERROR: unknown format of the export, %s" % path)
+    return FrameExporter(CsvWriter(path), row_group_size)
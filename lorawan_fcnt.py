@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import os
+import struct
+
+# MAX_FCNT_GAP in LoRaWAN v1.0.
+MAX_FCNT_GAP = 16384
+# DevAddr | Dir | FCnt, in the state file.
+STATE_STRUCT = struct.Struct("<IBI")
+
+class FCntTracker(object):
+    '''
+    the last 32-bit FCnt seen per DevAddr and direction.
+        max_gap: the max number of the frames lost, which is the limit
+            to infer the upper 16-bit from the last FCnt.
+        use_mic: try the next and previous upper 16-bit if the MIC
+            doesn't match with the inferred one, and the state is
+            updated only by the frames of which MIC matches.
+
+    the table is a dict keyed by (DevAddr << 1 | Dir) in integer.
+    '''
+    def __init__(self, max_gap=MAX_FCNT_GAP, use_mic=False):
+        self.max_gap = max_gap
+        self.use_mic = use_mic
+        self.table = {}
+
+    def __len__(self):
+        return len(self.table)
+
+    def infer(self, devaddr, dir_down, fcnt, xfcnt=0):
+        '''
+        fcnt: the 16-bit FCnt in the frame.
+        xfcnt: the upper 16-bit used if the device is not seen yet.
+        return the 32-bit FCnt.
+        '''
+        last = self.table.get(devaddr << 1 | dir_down)
+        if last is None:
+            return (xfcnt << 16) | fcnt
+        gap = (fcnt - last) & 0xffff
+        if gap <= self.max_gap:
+            return last + gap
+        # it is an old frame, e.g. replayed or reordered.
+        v = last - ((last - fcnt) & 0xffff)
+        return v if v >= 0 else v + 0x10000
+
+    def candidates(self, devaddr, dir_down, fcnt, xfcnt=0):
+        '''
+        return the list of the 32-bit FCnts to be tried with the MIC,
+        the inferred one first.
+        '''
+        v = self.infer(devaddr, dir_down, fcnt, xfcnt)
+        return [ c for c in (v, v + 0x10000, v - 0x10000)
+                if 0 <= c <= 0xffffffff ]
+
+    def update(self, devaddr, dir_down, fcnt32):
+        key = devaddr << 1 | dir_down
+        if fcnt32 > self.table.get(key, -1):
+            self.table[key] = fcnt32
+
+    def reset(self, devaddr):
+        '''
+        forget the FCnt of the DevAddr in both directions, e.g. when a new
+        session is started by the join.
+        '''
+        self.table.pop(devaddr << 1, None)
+        self.table.pop(devaddr << 1 | 1, None)
+
+    def save(self, path):
+        '''
+        write the table into the file atomically.
+        '''
+        data = b"".join([STATE_STRUCT.pack(k >> 1, k & 1, v)
+                         for k, v in self.table.items()])
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        '''
+        read the table from the file written by save().
+        '''
+        with open(path, "rb") as f:
+            data = f.read()
+        for devaddr, dir_down, fcnt32 in STATE_STRUCT.iter_unpack(data):
+            self.update(devaddr, dir_down, fcnt32)
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+import struct
+import lorawan_phy_parser as parser
+
+DEVADDR_STRUCT = struct.Struct("<I")
+DEVEUI_STRUCT = struct.Struct("<Q")
+# the offset of DevEUI in the Join Request.
+DEVEUI_OFFSET = 9
+# MHDR | DevAddr | FCtrl | FCnt | MIC
+MIN_DATA_LEN = 1 + 7 + parser.MIC_LEN
+
+class FrameFilter(object):
+    '''
+    select the frames by the fields at the fixed offset of the header,
+    before they are decoded.
+        devaddr, mtype, fport, deveui: a set of the values in integer,
+            or None not to check the field.
+
+    devaddr and fport match only the data frames, deveui matches only
+    the Join Request.  the fields specified are ANDed, and the values
+    of each field are ORed.
+    '''
+    def __init__(self, devaddr=None, mtype=None, fport=None, deveui=None):
+        self.devaddr = devaddr
+        self.mtype = mtype
+        self.fport = fport
+        self.deveui = deveui
+        self.data_only = devaddr is not None or fport is not None
+
+    def match(self, data):
+        '''
+        data: the PHYPayload in bytes.
+        '''
+        mtype = data[0] >> 5
+        if self.mtype is not None and mtype not in self.mtype:
+            return False
+        if parser.MTYPE_UNCONFIRMED_DATA_UP <= mtype <= \
+                parser.MTYPE_CONFIRMED_DATA_DOWN:
+            if self.deveui is not None:
+                return False
+            if not self.data_only:
+                return True
+            if len(data) < MIN_DATA_LEN:
+                return False
+            if (self.devaddr is not None and
+                    DEVADDR_STRUCT.unpack_from(data, 1)[0] not in self.devaddr):
+                return False
+            if self.fport is not None:
+                offset = 8 + (data[5] & 0x0f)
+                if len(data) - parser.MIC_LEN <= offset:
+                    return False
+                return data[offset] in self.fport
+            return True
+        if self.data_only:
+            return False
+        if self.deveui is not None:
+            if (mtype != parser.MTYPE_JOIN_REQUEST or
+                    len(data) < DEVEUI_OFFSET + DEVEUI_STRUCT.size):
+                return False
+            return (DEVEUI_STRUCT.unpack_from(data, DEVEUI_OFFSET)[0] in
+                    self.deveui)
+        return True
+
+    def filter(self, frames, with_meta=False):
+        '''
+        yield the frames in bytes matched from the iterable.
+        with_meta: each item is (meta, frame in bytes).
+        '''
+        match = self.match
+        for item in frames:
+            data = item[1] if with_meta else item
+            if data and match(data):
+                yield item
+
+'''
+MType in integer or the name without space, e.g. UnconfirmedDataUp.
+'''
+def parse_mtype(v):
+    if v.isdigit():
+        return int(v)
+    for i in range(8):
+        if parser.get_mtype_cmd(i).replace(" ", "").lower() == v.lower():
+            return i
+    raise ValueError("ERROR: unknown mtype %s" % v)
+
+value_parsers = {
+    "devaddr": lambda v: int(v, 16),
+    "mtype": parse_mtype,
+    "fport": int,
+    "deveui": lambda v: int(v, 16),
+}
+
+'''
+the filter spec into FrameFilter.
+the values of a field are separated by "|".  devaddr and deveui are
+in hex string as they are shown, the others are in decimal.
+
+    devaddr=49be7df1|01020304,mtype=2,fport=1
+'''
+def parse_filter(spec):
+    kwargs = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, sep, values = item.partition("=")
+        name = name.strip().lower()
+        if not sep or name not in value_parsers:
+            raise ValueError("ERROR: invalid filter %s" % item)
+        try:
+            kwargs[name] = set([value_parsers[name](v.strip())
+                                for v in values.split("|")])
+        except ValueError:
+            raise ValueError("ERROR: invalid value in filter %s" % item)
+    return FrameFilter(**kwargs)
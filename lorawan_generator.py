@@ -0,0 +1,489 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import io
+import random
+import itertools
+import multiprocessing
+import queue
+import struct
+import argparse
+import binascii
+import lorawan_phy_parser as parser
+from LoRaMacPayloadEncrypt import LoRaMacPayloadEncryptRaw
+from lorawan_cipher import (lorawan_gen_key, lorawan_mic_data,
+                            lorawan_mic_joinreq, lorawan_mic_joinaccept,
+                            lorawan_encrypt_joinaccept)
+from lorawan_keystore import DeviceSession, save_csv
+from lorawan_json import dumps
+
+# MHDR | DevAddr | FCtrl | FCnt
+DATA_HDR_STRUCT = struct.Struct("<BIBH")
+# MHDR | AppEUI | DevEUI | DevNonce
+JOINREQ_STRUCT = struct.Struct("<BQQH")
+# AppNonce and NetID are 3 bytes each, packed with DevAddr later.
+JOINACCEPT_STRUCT = struct.Struct("<IBB")
+MAX_FOPTS_LEN = 15
+MAX_FCNT = 0xffffffff
+# the number of the frames passed from a job at once.
+JOB_CHUNK_SIZE = 10000
+# the seconds to wait for a chunk before checking the job process alive.
+JOB_POLL_INTERVAL = 0.1
+# the channels of EU868 for the radio metadata.
+FREQS = (868.1, 868.3, 868.5, 867.1, 867.3, 867.5, 867.7, 867.9)
+DATRS = ("SF7BW125", "SF8BW125", "SF9BW125", "SF10BW125", "SF11BW125",
+         "SF12BW125")
+
+class Device(object):
+    '''
+    the state of a simulated device.
+        devaddr: in integer, None until joined for OTAA.
+        deveui: in integer.
+        nskey, askey: the session keys in bytes.
+        fcnt_up, fcnt_down: the 32-bit FCnt of the next frame.
+    '''
+    __slots__ = ("devaddr", "deveui", "nskey", "askey", "fcnt_up",
+                 "fcnt_down", "devnonce")
+
+    def __init__(self, devaddr, deveui, nskey=None, askey=None, fcnt=0,
+                 devnonce=0):
+        self.devaddr = devaddr
+        self.deveui = deveui
+        self.nskey = nskey
+        self.askey = askey
+        self.fcnt_up = fcnt
+        self.fcnt_down = fcnt
+        self.devnonce = devnonce
+
+    def session(self):
+        return DeviceSession(self.devaddr, self.nskey, self.askey, None,
+                             self.fcnt_up >> 16)
+
+class TrafficGenerator(object):
+    '''
+    generate the encrypted and MIC-correct PHYPayloads of the devices.
+
+        nb_devices: the number of the devices.
+        devaddr: the first DevAddr in integer.  the devices have
+            the consecutive DevAddrs from it.
+        appkey: the AppKey in bytes shared by the devices for OTAA.
+        otaa: if True, each device joins before its first data frame,
+            i.e. the Join Request and the Join Accept are generated.
+            otherwise, the devices are ABP, and sessions() returns the keys.
+        rejoin_ratio: the probability of joining again instead of
+            a data frame, for OTAA.
+        payload_size: (min, max) of the size of the FRMPayload.
+            no FPort and FRMPayload for 0.
+        fopts_ratio: the probability of having FOpts.
+        port0_ratio: the probability of the MAC commands in the FRMPayload.
+        down_ratio: the probability of a downlink frame.
+        confirmed_ratio: the probability of a confirmed frame.
+        fcnt_gap: (min, max) of the increment of the FCnt of the uplinks,
+            i.e. the frames lost in between if more than 1.
+        fcnt_start: the 32-bit FCnt of the first frame of ABP.
+        cids: the CIDs of the MAC commands to be drawn, or None for all of
+            mac_cmd_tab.
+        seed: the seed of the random generator.
+    '''
+    def __init__(self, nb_devices=100, devaddr=0x26000000, appkey=None,
+                 otaa=False, rejoin_ratio=0.0, payload_size=(1, 51),
+                 fopts_ratio=0.1, port0_ratio=0.05, down_ratio=0.1,
+                 confirmed_ratio=0.1, fcnt_gap=(1, 1), fcnt_start=0,
+                 cids=None, seed=None):
+        if otaa and not appkey:
+            raise ValueError("ERROR: AppKey is required for OTAA.")
+        self.seed = seed
+        self.rnd = rnd = random.Random(seed)
+        self.appkey = appkey
+        self.otaa = otaa
+        self.rejoin_ratio = rejoin_ratio
+        self.payload_size = payload_size
+        self.fopts_ratio = fopts_ratio
+        self.port0_ratio = port0_ratio
+        self.down_ratio = down_ratio
+        self.confirmed_ratio = confirmed_ratio
+        self.fcnt_gap = fcnt_gap
+        self.appeui = rnd.getrandbits(64)
+        self.netid = rnd.getrandbits(24)
+        self.next_devaddr = devaddr
+        self.devices = []
+        for i in range(nb_devices):
+            if otaa:
+                d = Device(None, rnd.getrandbits(64),
+                           devnonce=rnd.getrandbits(16))
+            else:
+                d = Device(devaddr + i, rnd.getrandbits(64), rnd.randbytes(16),
+                           rnd.randbytes(16), fcnt_start)
+            self.devices.append(d)
+        # the descriptors of the MAC commands per direction.
+        self.mac_cmds = [[t for t in parser.mac_cmd_desc[msg_dir]
+                          if t is not None and (cids is None or t.cid in cids)]
+                         for msg_dir in (parser.MSGDIR_UP,
+                                         parser.MSGDIR_DOWN)]
+
+    def radio_random(self):
+        '''
+        return random.Random for the radio metadata, apart from the frames.
+        '''
+        return random.Random(None if self.seed is None
+                             else "%s-radio" % self.seed)
+
+    def sessions(self):
+        '''
+        return the DeviceSessions of the devices joined.
+        '''
+        return [d.session() for d in self.devices if d.devaddr is not None]
+
+    def make_mac_cmds(self, dir_down, max_len):
+        '''
+        the MAC commands in bytes drawn from mac_cmd_tab, up to max_len.
+        '''
+        rnd = self.rnd
+        cmds = self.mac_cmds[dir_down]
+        data = b""
+        while cmds:
+            t = rnd.choice(cmds)
+            if len(data) + 1 + t.size > max_len:
+                break
+            data += bytes([t.cid]) + rnd.randbytes(t.size)
+        return data
+
+    def join(self, d):
+        '''
+        return the Join Request and the Join Accept, and set the session
+        keys of the device.
+        '''
+        rnd = self.rnd
+        d.devnonce = (d.devnonce + 1) & 0xffff
+        msg = JOINREQ_STRUCT.pack(parser.MTYPE_JOIN_REQUEST << 5, self.appeui,
+                                  d.deveui, d.devnonce)
+        joinreq = msg + lorawan_mic_joinreq(self.appkey, msg)
+        if d.devaddr is None:
+            d.devaddr = self.next_devaddr
+            self.next_devaddr = (self.next_devaddr + 1) & 0xffffffff
+        appnonce = rnd.randbytes(3)
+        netid = self.netid.to_bytes(3, "little")
+        # DLSettings: RX1DRoffset 0, RX2 DR 0.  RxDelay: 1 second.
+        plain = (appnonce + netid +
+                 JOINACCEPT_STRUCT.pack(d.devaddr, 0x00, 0x01))
+        mhdr = bytes([parser.MTYPE_JOIN_ACCEPT << 5])
+        joinaccept = mhdr + lorawan_encrypt_joinaccept(
+                self.appkey, plain + lorawan_mic_joinaccept(self.appkey,
+                                                           mhdr + plain))
+        d.nskey, d.askey = lorawan_gen_key(self.appkey, appnonce, netid,
+                                           d.devnonce.to_bytes(2, "little"))
+        d.fcnt_up = 0
+        d.fcnt_down = 0
+        return joinreq, joinaccept
+
+    def data_frame(self, d, dir_down):
+        '''
+        return the data frame of the device.
+        '''
+        rnd = self.rnd
+        if dir_down:
+            fcnt = d.fcnt_down
+            d.fcnt_down = (fcnt + 1) & MAX_FCNT
+            mtype = (parser.MTYPE_CONFIRMED_DATA_DOWN
+                     if rnd.random() < self.confirmed_ratio
+                     else parser.MTYPE_UNCONFIRMED_DATA_DOWN)
+        else:
+            fcnt = d.fcnt_up
+            d.fcnt_up = (fcnt + rnd.randint(*self.fcnt_gap)) & MAX_FCNT
+            mtype = (parser.MTYPE_CONFIRMED_DATA_UP
+                     if rnd.random() < self.confirmed_ratio
+                     else parser.MTYPE_UNCONFIRMED_DATA_UP)
+        fopts = b""
+        fport = None
+        plain = b""
+        if rnd.random() < self.port0_ratio:
+            fport = 0
+            plain = self.make_mac_cmds(dir_down, self.payload_size[1])
+        else:
+            if rnd.random() < self.fopts_ratio:
+                fopts = self.make_mac_cmds(dir_down, MAX_FOPTS_LEN)
+            size = rnd.randint(*self.payload_size)
+            if size:
+                fport = rnd.randint(1, 223)
+                plain = rnd.randbytes(size)
+        msg = DATA_HDR_STRUCT.pack(mtype << 5, d.devaddr, len(fopts),
+                                   fcnt & 0xffff) + fopts
+        if fport is not None:
+            key = d.nskey if fport == 0 else d.askey
+            msg += bytes([fport]) + LoRaMacPayloadEncryptRaw(
+                    plain, key, d.devaddr, dir_down, fcnt)
+        return msg + lorawan_mic_data(d.nskey, msg, d.devaddr, dir_down, fcnt)
+
+    def generate(self, n):
+        '''
+        yield (dir_down, PHYPayload in bytes) of n frames.
+        the Join Request and the Join Accept are counted as 2 frames.
+        '''
+        rnd = self.rnd
+        devices = self.devices
+        i = 0
+        while i < n:
+            d = rnd.choice(devices)
+            if self.otaa and (d.devaddr is None or
+                              rnd.random() < self.rejoin_ratio):
+                joinreq, joinaccept = self.join(d)
+                yield 0, joinreq
+                i += 1
+                if i < n:
+                    yield 1, joinaccept
+                    i += 1
+                continue
+            dir_down = 1 if rnd.random() < self.down_ratio else 0
+            yield dir_down, self.data_frame(d, dir_down)
+            i += 1
+
+#
+# writers
+#
+def write_hex(items, f):
+    b2a_hex = binascii.b2a_hex
+    for dir_down, data in items:
+        f.write(b2a_hex(data) + b"\n")
+
+'''
+the frames prefixed by 2 bytes of the length in big endian,
+which is read by --input-format binary.
+'''
+def write_binary(items, f):
+    for dir_down, data in items:
+        f.write(len(data).to_bytes(2, "big") + data)
+
+'''
+JSON lines of the Semtech UDP packet forwarder, i.e. rxpk of the uplinks
+and txpk of the downlinks, which is read by --input-format semtech.
+    rnd: random.Random for the radio metadata.
+'''
+def write_semtech(items, f, rnd=None):
+    if rnd is None:
+        rnd = random.Random()
+    b2a_base64 = binascii.b2a_base64
+    for dir_down, data in items:
+        pkt = { "tmst": rnd.getrandbits(32), "freq": rnd.choice(FREQS),
+                "datr": rnd.choice(DATRS), "size": len(data),
+                "data": b2a_base64(data, newline=False).decode() }
+        if dir_down:
+            pkt.update({ "modu": "LORA", "codr": "4/5", "ipol": True,
+                         "powe": 14 })
+            obj = { "txpk": pkt }
+        else:
+            pkt.update({ "modu": "LORA", "codr": "4/5",
+                         "rssi": rnd.randint(-120, -30),
+                         "lsnr": rnd.randint(-200, 100) / 10 })
+            obj = { "rxpk": [pkt] }
+        f.write(dumps(obj).encode() + b"\n")
+
+writers = {
+    "hex": write_hex,
+    "binary": write_binary,
+    "semtech": write_semtech,
+}
+
+'''
+write n frames of the generator into the binary file object.
+    fmt: "hex", "binary" or "semtech".
+'''
+def write_frames(gen, n, fmt, f):
+    if fmt == "semtech":
+        write_semtech(gen.generate(n), f, gen.radio_random())
+    else:
+        writers[fmt](gen.generate(n), f)
+
+#
+# parallel generation
+#
+'''
+split the devices and the frames into the jobs, and return the list of
+the kwargs of TrafficGenerator and the number of the frames of each job.
+each job has the consecutive DevAddrs and the seed derived from the seed.
+'''
+def split_jobs(kwargs, n, jobs):
+    nb_devices = kwargs.get("nb_devices", 100)
+    devaddr = kwargs.get("devaddr", 0x26000000)
+    seed = kwargs.get("seed")
+    result = []
+    for k in range(jobs):
+        nb = nb_devices // jobs + (k < nb_devices % jobs)
+        result.append((dict(kwargs, nb_devices=nb, devaddr=devaddr,
+                            seed=None if seed is None else "%s-%d" % (seed, k)),
+                       n // jobs + (k < n % jobs)))
+        devaddr += nb
+    return result
+
+def _generate_job(kwargs, n, fmt, queue, chunk_size):
+    gen = TrafficGenerator(**kwargs)
+    items = gen.generate(n)
+    rnd = gen.radio_random()
+    while True:
+        buf = io.BytesIO()
+        chunk = itertools.islice(items, chunk_size)
+        if fmt == "semtech":
+            write_semtech(chunk, buf, rnd)
+        else:
+            writers[fmt](chunk, buf)
+        data = buf.getvalue()
+        # an empty chunk marks the end.
+        queue.put(data)
+        if not data:
+            return
+
+'''
+generate the frames in the processes of the jobs, and write them into
+the binary file object.  the chunks of the jobs are written in turn,
+so that the output is same for the same seed.
+    kwargs: the kwargs of TrafficGenerator.
+'''
+def generate_parallel(kwargs, n, jobs, fmt, f, chunk_size=JOB_CHUNK_SIZE):
+    procs = []
+    queues = []
+    for job_kwargs, job_n in split_jobs(kwargs, n, jobs):
+        q = multiprocessing.Queue(maxsize=4)
+        p = multiprocessing.Process(target=_generate_job,
+                                    args=(job_kwargs, job_n, fmt, q,
+                                          chunk_size))
+        p.daemon = True
+        p.start()
+        procs.append(p)
+        queues.append(q)
+    jobs = list(zip(procs, queues))
+    try:
+        while jobs:
+            for job in list(jobs):
+                data = get_chunk(*job)
+                if data:
+                    f.write(data)
+                else:
+                    jobs.remove(job)
+    except BaseException:
+        for p in procs:
+            p.terminate()
+        raise
+    finally:
+        for p in procs:
+            p.join()
+
+'''
+return the next chunk of the job process from the queue.
+it raises ValueError if the process exits without the end of the chunks,
+e.g. killed or failed, instead of waiting for it forever.
+'''
+def get_chunk(p, q):
+    while True:
+        try:
+            return q.get(timeout=JOB_POLL_INTERVAL)
+        except queue.Empty:
+            if p.is_alive():
+                continue
+        # the chunks put before the exit are still read.
+        try:
+            return q.get(timeout=JOB_POLL_INTERVAL)
+        except queue.Empty:
+            raise ValueError("ERROR: the job process %d exited with %s "
+                             "without finishing." % (p.pid, p.exitcode))
+
+def parse_range(v):
+    lo, sep, hi = v.partition(":")
+    return int(lo), int(hi if sep else lo)
+
+def parse_args():
+    p = argparse.ArgumentParser(description="""
+        LoRaWAN traffic generator.
+        It writes the encrypted and MIC-correct frames of the devices
+        for the load test of the decoder.""")
+    p.add_argument("-n", action="store", dest="nb_frames", type=int,
+        default=1000, help="specify the number of the frames.")
+    p.add_argument("-o", action="store", dest="output_file",
+        help="specify the file to write, or stdout if not specified.")
+    p.add_argument("--output-format", action="store", dest="output_format",
+        default="hex", choices=["hex", "binary", "semtech"],
+        help="specify the format, same as --input-format of "
+        "lorawan_phy_parser.py.")
+    p.add_argument("--devices", action="store", dest="nb_devices", type=int,
+        default=100, help="specify the number of the devices.")
+    p.add_argument("--devaddr", action="store", dest="devaddr",
+        default="26000000",
+        help="specify the first DevAddr in hex.  the devices have "
+        "the consecutive DevAddrs.")
+    p.add_argument("--otaa", action="store_true", dest="f_otaa",
+        help="join each device by --akey before its data frames.")
+    p.add_argument("--akey", action="store", dest="akey",
+        default="2b7e151628aed2a6abf7158809cf4f3c",
+        help="specify AppKey for --otaa.")
+    p.add_argument("--rejoin-ratio", action="store", dest="rejoin_ratio",
+        type=float, default=0.0,
+        help="specify the probability to join again for --otaa.")
+    p.add_argument("--keystore-out", action="store", dest="keystore_out",
+        help="write the keys of the devices into the CSV for --keystore.")
+    p.add_argument("--payload-size", action="store", dest="payload_size",
+        default="1:51", help="specify MIN:MAX of the size of the FRMPayload.")
+    p.add_argument("--fopts-ratio", action="store", dest="fopts_ratio",
+        type=float, default=0.1,
+        help="specify the probability of the MAC commands in FOpts.")
+    p.add_argument("--port0-ratio", action="store", dest="port0_ratio",
+        type=float, default=0.05,
+        help="specify the probability of the MAC commands in FRMPayload.")
+    p.add_argument("--down-ratio", action="store", dest="down_ratio",
+        type=float, default=0.1,
+        help="specify the probability of the downlink.")
+    p.add_argument("--confirmed-ratio", action="store",
+        dest="confirmed_ratio", type=float, default=0.1,
+        help="specify the probability of the confirmed frame.")
+    p.add_argument("--fcnt-gap", action="store", dest="fcnt_gap",
+        default="1:1", help="specify MIN:MAX of the increment of the FCnt.")
+    p.add_argument("--fcnt-start", action="store", dest="fcnt_start",
+        default="0", help="specify the 32-bit FCnt of ABP to start in hex.")
+    p.add_argument("--cids", action="store", dest="cids",
+        help="specify the CIDs of the MAC commands, e.g. 2,3,0x06.")
+    p.add_argument("--seed", action="store", dest="seed", type=int,
+        help="specify the seed of the random generator.")
+    p.add_argument("--jobs", action="store", dest="jobs", type=int, default=1,
+        help="specify the number of processes to generate the frames.  "
+        "each process has a part of the devices.")
+    return p.parse_args()
+
+def main():
+    opt = parse_args()
+    cids = None
+    if opt.cids:
+        cids = set([int(v, 0) for v in opt.cids.split(",")])
+    kwargs = dict(nb_devices=opt.nb_devices, devaddr=int(opt.devaddr, 16),
+                  appkey=binascii.a2b_hex(opt.akey), otaa=opt.f_otaa,
+                  rejoin_ratio=opt.rejoin_ratio,
+                  payload_size=parse_range(opt.payload_size),
+                  fopts_ratio=opt.fopts_ratio, port0_ratio=opt.port0_ratio,
+                  down_ratio=opt.down_ratio,
+                  confirmed_ratio=opt.confirmed_ratio,
+                  fcnt_gap=parse_range(opt.fcnt_gap),
+                  fcnt_start=int(opt.fcnt_start, 16), cids=cids,
+                  seed=opt.seed)
+    if opt.jobs > 1:
+        gens = [TrafficGenerator(**kw)
+                for kw, n in split_jobs(kwargs, opt.nb_frames, opt.jobs)]
+    else:
+        gens = [TrafficGenerator(**kwargs)]
+    if opt.keystore_out:
+        if opt.f_otaa:
+            print("WARNING: --keystore-out is ignored for --otaa, "
+                  "use --derive-keys to decode.", file=sys.stderr)
+        else:
+            save_csv(opt.keystore_out,
+                     [s for gen in gens for s in gen.sessions()])
+    f = open(opt.output_file, "wb") if opt.output_file else sys.stdout.buffer
+    try:
+        if opt.jobs > 1:
+            generate_parallel(kwargs, opt.nb_frames, opt.jobs,
+                              opt.output_format, f)
+        else:
+            write_frames(gens[0], opt.nb_frames, opt.output_format, f)
+    finally:
+        f.flush()
+        if opt.output_file:
+            f.close()
+
+if __name__ == "__main__" :
+    main()
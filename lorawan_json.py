@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+import json
+import lorawan_phy_parser as parser
+from lorawan_phy_parser import bytes2hex
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+'''
+serialize the object into a compact JSON string.
+orjson is used if available.
+'''
+if orjson is not None:
+    def dumps(obj):
+        return orjson.dumps(obj).decode()
+else:
+    def dumps(obj):
+        return json.dumps(obj, separators=(",", ":"))
+
+def hex_or_none(data):
+    return None if data is None else bytes2hex(data)
+
+def fctrl_to_dict(fctrl):
+    d = { "adr": fctrl.adr, "ack": fctrl.ack, "foptslen": fctrl.foptslen }
+    if fctrl.adrackreq is not None:
+        d["adrackreq"] = fctrl.adrackreq
+        d["classb"] = fctrl.classb
+    else:
+        d["rfu"] = fctrl.rfu
+        d["fpending"] = fctrl.fpending
+    return d
+
+def mac_commands_to_list(mac_commands):
+    if mac_commands is None:
+        return None
+    return [{ "cid": c.cid, "name": c.name, "raw": bytes2hex(c.raw),
+              "fields": None if c.fields is None else dict(c.fields) }
+            for c in mac_commands]
+
+def mac_payload_to_dict(mp):
+    fhdr = mp.fhdr
+    return {
+        "devaddr": "%08x" % fhdr.devaddr,
+        "fctrl": fctrl_to_dict(fhdr.fctrl),
+        "fcnt": fhdr.fcnt,
+        "fopts": hex_or_none(fhdr.fopts),
+        "fport": mp.fport,
+        "fcnt32": mp.fcnt32,
+        "frm_payload": hex_or_none(mp.frm_payload),
+        "frm_payload_plain": hex_or_none(mp.frm_payload_plain),
+        "mac_commands": mac_commands_to_list(mp.mac_commands),
+        }
+
+def joinreq_to_dict(jr):
+    return {
+        "appeui": "%016x" % jr.appeui,
+        "deveui": "%016x" % jr.deveui,
+        "devnonce": jr.devnonce,
+        }
+
+def joinaccept_to_dict(ja):
+    d = { "encrypted": bytes2hex(ja.encrypted) }
+    if ja.appnonce is not None:
+        d.update({
+            "appnonce": "%06x" % ja.appnonce,
+            "netid": "%06x" % ja.netid,
+            "devaddr": "%08x" % ja.devaddr,
+            "dlsettings": ja.dlsettings,
+            "rxdelay": ja.rxdelay,
+            "cflist": ja.cflist,
+            })
+    d["decrypted"] = hex_or_none(ja.decrypted)
+    return d
+
+'''
+Frame into a dict of which values are JSON types.
+bytes are in hex string.
+'''
+def frame_to_dict(frame):
+    mhdr = frame.mhdr
+    d = {
+        "phypayload": bytes2hex(frame.raw),
+        "mhdr": {
+            "mtype": mhdr.mtype,
+            "mtype_name": parser.get_mtype_cmd(mhdr.mtype),
+            "rfu": mhdr.rfu,
+            "major": mhdr.major,
+            },
+        "dir": frame.msg_dir,
+        }
+    if mhdr.mtype == parser.MTYPE_JOIN_REQUEST:
+        d["join_request"] = joinreq_to_dict(frame.payload)
+    elif mhdr.mtype == parser.MTYPE_JOIN_ACCEPT:
+        d["join_accept"] = joinaccept_to_dict(frame.payload)
+    else:
+        d["mac_payload"] = mac_payload_to_dict(frame.payload)
+    d["mic"] = bytes2hex(frame.mic)
+    d["mic_ok"] = frame.mic_ok
+    if isinstance(frame.meta, list):
+        # the metas of the duplicates collapsed.
+        d["radio"] = [m.to_dict() for m in frame.meta if m is not None]
+    elif frame.meta is not None:
+        d["radio"] = frame.meta.to_dict()
+    return d
+
+'''
+JSON renderer, one line per Frame.
+'''
+def print_frame_json(frame, out):
+    out.write(dumps(frame_to_dict(frame)))
+    out.write("\n")
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+
+import os
+import csv
+import json
+import binascii
+
+# the names of the fields in the keystore files.
+FIELDS = ("devaddr", "nskey", "askey", "akey", "xfcnt")
+
+class DeviceSession(object):
+    '''
+    the keys of a device, which is used as Keys.
+        devaddr: in integer, or None for the default.
+        nskey, askey, akey: in bytes, or None if not known.
+        xfcnt: the most significant 16-bit of the FCnt in integer.
+    '''
+    __slots__ = FIELDS
+
+    def __init__(self, devaddr=None, nskey=None, askey=None, akey=None,
+                 xfcnt=0):
+        self.devaddr = devaddr
+        self.nskey = nskey
+        self.askey = askey
+        self.akey = akey
+        self.xfcnt = xfcnt
+
+    def __getstate__(self):
+        return tuple([getattr(self, k) for k in FIELDS])
+
+    def __setstate__(self, state):
+        for k, v in zip(FIELDS, state):
+            setattr(self, k, v)
+
+class KeyStore(object):
+    '''
+    DeviceSessions indexed by DevAddr.
+        default: DeviceSession used for an unknown DevAddr and the join
+            frames.
+    '''
+    def __init__(self, default=None):
+        self.sessions = {}
+        self.default = default if default is not None else DeviceSession()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def add(self, session):
+        self.sessions[session.devaddr] = session
+
+    def lookup(self, devaddr):
+        '''
+        devaddr: in integer.
+        return the DeviceSession, or None if not found.
+        '''
+        return self.sessions.get(devaddr)
+
+def to_key(v):
+    if not v:
+        return None
+    if isinstance(v, str):
+        return binascii.a2b_hex(v)
+    return bytes(v)
+
+def hex2int(v):
+    if isinstance(v, int):
+        return v
+    return int(v, 16) if v else 0
+
+'''
+a record in the keystore files into the DeviceSession.
+devaddr and xfcnt are in hex string, or integer in JSON.
+the keys are in hex string, or in bytes in SQLite.
+'''
+def make_session(devaddr, nskey=None, askey=None, akey=None, xfcnt=None):
+    return DeviceSession(hex2int(devaddr), to_key(nskey), to_key(askey),
+                         to_key(akey), hex2int(xfcnt))
+
+'''
+CSV with the header line.  the columns other than devaddr are optional.
+
+    devaddr,nskey,askey,akey,xfcnt
+    01020304,2b7e1516...,...,,0000
+'''
+def load_csv(path, ks):
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = [h.strip().lower() for h in next(reader, [])]
+        for h in header:
+            if h not in FIELDS:
+                raise ValueError("ERROR: unknown column %s in %s" % (h, path))
+        if "devaddr" not in header:
+            raise ValueError("ERROR: no devaddr column in %s" % path)
+        # the position of each field in the row, in the order of FIELDS.
+        pos = [header.index(k) if k in header else None for k in FIELDS]
+        sessions = ks.sessions
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < len(header):
+                raise ValueError("ERROR: short row at line %d in %s" %
+                                 (reader.line_num, path))
+            v = [row[i] if i is not None else None for i in pos]
+            devaddr = int(v[0], 16)
+            sessions[devaddr] = DeviceSession(devaddr, to_key(v[1]),
+                                              to_key(v[2]), to_key(v[3]),
+                                              hex2int(v[4]))
+
+'''
+write the DeviceSessions into the CSV read by load_csv().
+'''
+def save_csv(path, sessions):
+    def hexkey(k):
+        return binascii.b2a_hex(k).decode() if k else ""
+    with open(path, "w") as f:
+        f.write(",".join(FIELDS) + "\n")
+        for s in sessions:
+            f.write("%08x,%s,%s,%s,%04x\n" % (s.devaddr, hexkey(s.nskey),
+                                               hexkey(s.askey), hexkey(s.akey),
+                                               s.xfcnt))
+
+'''
+JSON, a list of the objects or an object keyed by devaddr.
+
+    [ { "devaddr": "01020304", "nskey": "...", "askey": "..." }, ... ]
+    { "01020304": { "nskey": "...", "askey": "..." }, ... }
+'''
+def load_json(path, ks):
+    with open(path) as f:
+        doc = json.load(f)
+    if isinstance(doc, dict):
+        doc = [dict(v, devaddr=k) for k, v in doc.items()]
+    for v in doc:
+        ks.add(make_session(**v))
+
+'''
+SQLite, the table "sessions" having the columns of the CSV.
+'''
+def load_sqlite(path, ks, table="sessions"):
+    import sqlite3
+    con = sqlite3.connect(path)
+    try:
+        cur = con.execute("select * from %s" % table)
+        header = [d[0].lower() for d in cur.description]
+        for row in cur:
+            ks.add(make_session(**dict(zip(header, row))))
+    finally:
+        con.close()
+
+loaders = {
+    ".csv": load_csv,
+    ".json": load_json,
+    ".db": load_sqlite,
+    ".sqlite": load_sqlite,
+    ".sqlite3": load_sqlite,
+}
+
+'''
+load the keystore file.  the format is chosen by the extension.
+    default: DeviceSession for an unknown DevAddr.
+'''
+def load_keystore(path, default=None):
+    ext = os.path.splitext(path)[1].lower()
+    loader = loaders.get(ext)
+    if loader is None:
+        raise ValueError("ERROR: unknown keystore format, %s" % path)
+    ks = KeyStore(default=default)
+    loader(path, ks)
+    return ks
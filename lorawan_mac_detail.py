@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+
+'''
+the detail texts of the MAC commands shown in the verbose mode, keyed by
+the name of the command, and the sequence in the printer if it has more
+than one.  it is imported by print_detail() only when the text is shown.
+'''
+DETAILS = {
+    "ResetInd": """
+This MAC command is only available to ABP devices activated on a LoRaWAN1.1
+compatible network server. LoRaWAN1.0 servers do not implement this MAC
+command OTA devices MUST NOT implement this command. The network server SHALL
+ignore the ResetInd command coming from an OTA device.
+With the ResetInd command, an ABP end-device indicates to the network
+that it has been re-initialized and
+that he has switched back to its default MAC & radio parameters
+""",
+    "ResetConf": """
+The server's version carried by the ResetConf must be the same
+than the device's version.  Any other value is invalid.
+""",
+    "LinkCheckAns.1": """
+The demodulation margin (Margin) is an 8-bit unsigned integer
+in the range of 0..254
+indicating the link margin in dB of the last successfully
+received LinkCheckReq command.
+A value of 0 means that the frame was received at the demodulation floor
+(0 dB or no 948 margin)
+""",
+    "LinkCheckAns.2": """
+The gateway count (GwCnt) is the number of gateways that successfully
+received the last LinkCheckReq command.
+""",
+    "LinkADRReq.1": """
+REGION SPECIFIC.
+A value 0xF (15 in decimal format) of either DataRate or TXPower
+means that the device MUST
+ignore that field, and keep the current parameter value.
+""",
+    "LinkADRReq.2": """
+The channel mask (ChMask) encodes the channels usable for uplink access.
+A bit in the ChMask field set to 1 means that the corresponding channel
+can be used for uplink transmissions if this channel allows the data rate
+currently used by the end-device.
+A bit set to 0 means the corresponding channels should be avoided.
+""",
+    "LinkADRReq.3": """
+REGION SPECIFIC.
+The channel mask control (ChMaskCntl) field controls the
+interpretation of the previously
+defined ChMask bit mask.
+""",
+    "LinkADRReq.4": """
+The NbTrans field is the number of transmissions for each uplink message.
+""",
+    "LinkADRAns.1": """
+The device is unable to operate at or below the requested power level.. The
+command was discarded and the end-device state was not
+changed.
+""",
+    "LinkADRAns.2": """
+The device is able to operate at or below the requested power level,, or the
+TXPower field of the request was set to 15, meaning it
+shall be ignored
+""",
+    "LinkADRAns.3": """
+The data rate requested is unknown to the end-device or is
+not possible given the channel mask provided (not supported
+by any of the enabled channels). The command was discarded
+and the end-device state was not changed.
+""",
+    "LinkADRAns.4": """
+The data rate was successfully set or the DataRate field of
+the request was set to 15, meaning it was ignored
+""",
+    "LinkADRAns.5": """
+The channel mask sent enables a yet undefined channel or the channel mask
+required all channels to be disabled. The command was
+discarded and the end- device state was not changed.
+""",
+    "LinkADRAns.6": """
+The channel mask sent was successfully interpreted. All currently defined
+channel states were set according to the mask.
+""",
+    "DutyCycleReq": """
+A value of 0 corresponds to "no duty cycle limitation"
+except the one set by the regional regulation.
+""",
+    "RXParamSetupReq.1": """
+The RX1DRoffset field sets the offset between the uplink data
+rate and the downlink data
+rate used to communicate with the end-device on the first
+reception slot (RX1). As a default
+this offset is 0. The offset is used to take into account
+maximum power density constraints
+for base stations in some regions and to balance the
+uplink and downlink radio link margins.
+""",
+    "RXParamSetupReq.2": """
+The RX2DataRate field defines the data rate of a downlink using the second
+receive window following the same convention as the
+LinkADRReq command (0 means DR0/125kHz for example).
+""",
+    "RXParamSetupReq.3": """
+The frequency (Freq) field corresponds to the frequency of
+the channel used for the second receive window, whereby
+the frequency is coded following
+the convention defined in the NewChannelReq command.
+""",
+    "RXParamSetupAns.1": """
+the uplink/downlink data rate offset for RX1 slot is not in the allowed range.
+""",
+    "RXParamSetupAns.2": """
+RX1DRoffset was successfully set.
+""",
+    "RXParamSetupAns.3": """
+The data rate requested is unknown to the end-device.
+""",
+    "RXParamSetupAns.4": """
+RX2 slot channel was successfully set.
+""",
+    "RXParamSetupAns.5": """
+The frequency requested is not usable by the end-device.
+""",
+    "RXParamSetupAns.6": """
+RX2 slot channel was successfully set.
+""",
+    "DevStatusAns.1": """
+The end-device was not able to measure the battery level.
+""",
+    "DevStatusAns.2": """
+The end-device is connected to an external power source.
+""",
+    "DevStatusAns.3": """
+The margin (Margin) is the demodulation signal-to-noise ratio in dB rounded to
+the nearest
+integer value for the last successfully received
+DevStatusReq command. It is a signed
+integer of 6 bits with a minimum value of -32 and a
+maximum value of 31.
+""",
+    "Frequency": """
+The frequency (Freq) field is a 24 bits unsigned integer. The actual channel
+frequency in Hz is 100 x Freq whereby values representing frequencies
+below 100 MHz are reserved for future use.
+A Freq value of 0 disables the channel. The end-device MUST
+check that the frequency is actually allowed by its radio
+hardware and return an error
+otherwise.
+""",
+    "NewChannelReq.1": """
+The channel index (ChIndex) is the index of the channel being created or
+modified.
+Depending on the region and frequency band used, in
+certain regions (cf [PHY]) the LoRaWAN specification imposes default
+channels which must be common to all devices and
+cannot be modified by the NewChannelReq command.
+If the number of default channels is N,
+the default channels go from 0 to N-1,
+and the acceptable range for ChIndex is N to 15.
+A device must be able to handle at least 16 different
+channel definitions. In certain region the
+device may have to store more than 16 channel definitions.
+""",
+    "NewChannelReq.2": """
+the minimum data rate (MinDR) subfield
+designate the lowest uplink data rate allowed on this channel.
+Similarly, the maximum data rate
+(MaxDR) designates the highest uplink data rate.
+""",
+    "NewChannelAns.1": """
+The designated data rate range exceeds the ones currently defined
+for this end-device.
+""",
+    "NewChannelAns.2": """
+The data rate range is compatible with the possibilities of the end-device.
+""",
+    "NewChannelAns.3": """
+The device cannot use this frequency.
+""",
+    "NewChannelAns.4": """
+The device is able to use this frequency.
+""",
+    "RXTimingSetupReq": """
+The delay (Delay) field specifies the delay in second.
+the value of 0 and 1 indicates 1 (s).
+the value of 15 indicates 15 (s).
+""",
+    "DlChannelReq.1": """
+The channel index (ChIndex) is the index of the
+channel whose downlink frequency is
+modified.
+""",
+    "DlChannelReq.2": """
+The frequency (Freq) field is a 24 bits unsigned integer.
+The actual downlink frequency in Hz
+is 100 x Freq whereby values representing
+frequencies below 100 MHz are reserved for
+future use. The end-device has to check that the
+frequency is actually allowed by its radio
+hardware and return an error otherwise.
+""",
+    "DlChannelAns.1": """
+The uplink frequency is not defined for this channel, the downlink frequency
+can only be set for a channel that already has
+a valid uplink frequency
+""",
+    "DlChannelAns.2": """
+The uplink frequency of the channel is valid.
+""",
+    "DlChannelAns.3": """
+The device cannot use this frequency.
+""",
+    "DlChannelAns.4": """
+The device is able to use this frequency.
+""",
+    "PingSlotInfoReq": """
+Periodicity = 0 means that the end-device opens a ping slot every second.
+Periodicity = 7, every 128 seconds which is the maximum ping period
+supported by the LoRaWAN Class B specification.
+""",
+    "PingSlotChannelReq": """
+The “data rate” subfield is the index of the Data Rate used
+for the ping-slot downlinks.
+""",
+    "PingSlotChannelAns": """
+for data rate ok,
+if 0, Data rate ok: The designated data rate is not defined for this end device,
+the previous data rate is kept.
+if 1, The data rate is compatible with the possibilities of the end device
+The device cannot receiveon this frequency
+This frequency can be used by the end-device
+If either of those 2 bits equals 0, the command did not succeed and the
+ping-slot parameters have not been modified.
+""",
+    "BeaconTimingReq": """
+DEPRECATED.
+The network may answer only a limited number of requests per a given time
+period.  An end-device must not expect that BeaconTimingReq is answered
+immediately with a BeaconTimingAns. Class A end-devices wanting to switch
+to Class B should not transmit more than one BeaconTimingReq per hour.
+""",
+    "BeaconTimingAns.1": """
+DEPRECATED.
+""",
+    "BeaconTimingAns.2": """
+If the remaining time between the end of the
+current downlink frame and the start of the next beacon frame is noted RTime
+then: 30 ms x (Delay+1) > RTime >= 30 ms x Delay
+""",
+    "BeaconTimingAns.3": """
+In networks where the beacon uses alternatively several channels,
+the "Channel" field is the index of the beaconing channel
+on which the next beacon will be broadcasted.
+For networks where the beacon broadcast frequency is fixed then this field
+content is 0.
+""",
+    "BeaconFreqReq": """
+Frequency is a 24bits unsigned integer. The actual beacon
+channel frequency in Hz is 100 x frequ. This allows defining
+the beacon channel anywhere between 100 MHz to 1.67 GHz
+by 100 Hz step. The end-device has to check that the frequency
+is actually allowed by its radio hardware and return an error otherwise.
+A valid non-zero Frequency will force the device to listen
+to the beacon on a fixed frequency channel even if the default
+behavior specifies a frequency hopping beacon (i.e US ISM band).
+A value of 0 instructs the end-device to use the default
+beacon frequency plan as defined in the "Beacon physical layer" section.
+Where applicable the device resumes frequency hopping beacon search.
+""",
+    "BeaconFreqAns": """
+Bit=0: The device cannot use this frequency, the previous beacon frequency is
+kept.
+Bit=1: The beacon frequency has been changed
+""",
+    }
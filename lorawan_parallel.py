@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+import os
+import io
+import multiprocessing
+import lorawan_phy_parser as parser
+from lorawan_stream import iter_hex_frames
+from lorawan_stats import Stats
+from lorawan_cache import DecodeCache
+
+# the size of a shard of the input file.
+SHARD_SIZE = 4 * 1024 * 1024
+
+'''
+split the file into the byte ranges of about shard_size.
+each range ends at the end of a line.
+'''
+def split_file(path, shard_size=SHARD_SIZE):
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        start = 0
+        while start < size:
+            end = start + shard_size
+            if end >= size:
+                end = size
+            else:
+                f.seek(end)
+                f.readline()
+                end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+'''
+decode the lines in the byte range of the file, and print the result.
+'''
+def decode_range(path, start, end, keys, xfcnt, out, render=None,
+                 verify_mic=False, frame_filter=None, stats=None, cache=None):
+    if render is None:
+        render = parser.print_frame
+    if stats is not None:
+        render = stats.wrap("output", render)
+    with open(path, "rb") as f:
+        f.seek(start)
+        lines = f.read(end - start).split(b"\n")
+    frames = iter_hex_frames(lines)
+    if frame_filter is not None:
+        frames = frame_filter.filter(frames)
+    for frame in parser.decode_stream(frames, keys=keys, xfcnt=xfcnt,
+                                      verify_mic=verify_mic, stats=stats,
+                                      cache=cache):
+        render(frame, out)
+
+#
+# worker process
+#
+_worker = {}
+
+def _init_worker(keys, xfcnt, f_verbose, f_ignore_error, fmt, verify_mic,
+                 frame_filter, with_stats=False, cache_size=0):
+    parser.f_verbose = f_verbose
+    parser.f_ignore_error = f_ignore_error
+    if isinstance(keys, tuple):
+        keys = parser.Keys(*keys)
+    _worker["keys"] = keys
+    _worker["xfcnt"] = xfcnt
+    _worker["render"] = parser.get_renderer(fmt)
+    _worker["verify_mic"] = verify_mic
+    _worker["frame_filter"] = frame_filter
+    _worker["with_stats"] = with_stats
+    # the cache is kept in the worker across the shards.
+    _worker["cache"] = DecodeCache(cache_size) if cache_size else None
+
+def _decode_range(args):
+    path, start, end = args
+    out = io.StringIO()
+    stats = Stats() if _worker["with_stats"] else None
+    err = None
+    try:
+        decode_range(path, start, end, _worker["keys"], _worker["xfcnt"], out,
+                     render=_worker["render"],
+                     verify_mic=_worker["verify_mic"],
+                     frame_filter=_worker["frame_filter"], stats=stats,
+                     cache=_worker["cache"])
+    except Exception as e:
+        err = str(e)
+    return (out.getvalue(), err,
+            stats.snapshot() if stats is not None else None)
+
+'''
+decode the file with the pool of the processes.
+
+    path: the file containing the hex strings, one per line.
+    jobs: the number of the processes.
+    keys: Keys, or a keystore which is passed to each process.
+    xfcnt: the most significant 16-bit of the FCnt in integer.
+    out: the text stream to write the result.
+    ordered: write the result in the input order if True,
+        otherwise as each shard is completed.
+    verbose, ignore_error: f_verbose and f_ignore_error of the workers.
+    fmt: the output format, "text" or "ndjson".
+    verify_mic: verify the MIC of each frame.
+    frame_filter: FrameFilter to select the frames before decoding.
+    stats: Stats to merge the stats of each shard into.
+    cache_size: the size of DecodeCache of each process, or 0 not to cache.
+
+It returns None, or the error message of the shard which failed first.
+The results of the shards after the failed one are not written.
+'''
+def run_parallel(path, jobs, keys, xfcnt, out, ordered=True,
+                 verbose=False, ignore_error=False, fmt="text",
+                 verify_mic=False, frame_filter=None, stats=None,
+                 cache_size=0, shard_size=SHARD_SIZE):
+    if not hasattr(keys, "lookup"):
+        keys = (keys.nskey, keys.askey, keys.akey)
+    tasks = [(path, start, end)
+             for start, end in split_file(path, shard_size=shard_size)]
+    pool = multiprocessing.Pool(jobs, initializer=_init_worker,
+                                initargs=(keys, xfcnt, verbose, ignore_error,
+                                          fmt, verify_mic, frame_filter,
+                                          stats is not None, cache_size))
+    try:
+        if ordered:
+            results = pool.imap(_decode_range, tasks)
+        else:
+            results = pool.imap_unordered(_decode_range, tasks)
+        for text, err, snapshot in results:
+            if stats is not None:
+                stats.merge(snapshot)
+            out.write(text)
+            if err is not None:
+                return err
+    finally:
+        pool.terminate()
+        pool.join()
+    return None
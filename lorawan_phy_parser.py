@@ -5,870 +5,1003 @@ from __future__ import print_function
 
 import sys
 import os
-import re
-import argparse
-from LoRaMacPayloadEncrypt import LoRaMacPayloadEncrypt
+import struct
 import binascii
-from lorawan_cipher import lorawan_gen_key, lorawan_encrypt
+from lorawan_stream import (str2hexstr, iter_lines, iter_hex_frames,
+                            BatchWriter)
 
 MIC_LEN = 4
+# DevAddr | FCtrl | FCnt
+FHDR_STRUCT = struct.Struct("<IBH")
+# AppEUI | DevEUI | DevNonce
+JOINREQ_STRUCT = struct.Struct("<QQH")
+DEVADDR_STRUCT = struct.Struct("<I")
+DEVADDR_FCNT_STRUCT = struct.Struct("<IxH")
+# the length of AppNonce | NetID | DevAddr | DLSettings | RxDelay
+JOINACCEPT_LEN = 12
+CFLIST_LEN = 16
 MSGDIR_DOWN = "down"
 MSGDIR_UP = "up"
 
+MTYPE_JOIN_REQUEST = 0
+MTYPE_JOIN_ACCEPT = 1
+MTYPE_UNCONFIRMED_DATA_UP = 2
+MTYPE_UNCONFIRMED_DATA_DOWN = 3
+MTYPE_CONFIRMED_DATA_UP = 4
+MTYPE_CONFIRMED_DATA_DOWN = 5
+MTYPE_RFU = 6
+MTYPE_PROPRIETARY = 7
+
+f_verbose = False
+f_ignore_error = False
+
+'''
+the crypto functions are imported at the first call, because importing
+pycryptodome takes most of the startup time, and it is not needed to decode
+the frames without the keys.  each stub replaces itself by the function.
+'''
+def lazy_import(module, name):
+    def stub(*args, **kwargs):
+        func = getattr(__import__(module), name)
+        globals()[name] = func
+        return func(*args, **kwargs)
+    stub.__name__ = name
+    return stub
+
+LoRaMacPayloadEncryptRaw = lazy_import("LoRaMacPayloadEncrypt",
+                                       "LoRaMacPayloadEncryptRaw")
+lorawan_encrypt = lazy_import("lorawan_cipher", "lorawan_encrypt")
+lorawan_mic_data = lazy_import("lorawan_cipher", "lorawan_mic_data")
+lorawan_mic_joinreq = lazy_import("lorawan_cipher", "lorawan_mic_joinreq")
+lorawan_mic_joinaccept = lazy_import("lorawan_cipher",
+                                     "lorawan_mic_joinaccept")
+
 '''
 error case
 '''
-def error(s):
+def error(s, out=None):
     if f_ignore_error:
-        print("WARNING:", s)
+        print("WARNING:", s, file=out)
         return
     raise ValueError("ERROR: %s" % s)
 
 '''
-a hex string into a binary string in 8 bits.
+an integer into a binary string in n bits.
+'''
+def int2bin(i, n=8):
+    return bin(i)[2:].zfill(n)
+
+'''
+bytes into a hex string, separated by sep if specified.
+'''
+def bytes2hex(data, sep=""):
+    if sep:
+        return sep.join(["%02x" % i for i in data])
+    return binascii.b2a_hex(data).decode()
+
+'''
+Decoded frame objects
+
+The decoders below build a tree of these objects and never print anything.
+The text output of this tool is rendered from the tree by print_frame().
+All fields are integers or bytes.  Multi-byte integers in the frame are
+little endian, and they are converted into integers.
+'''
+class Keys(object):
+    '''
+    keys to decode a frame, in bytes (16-byte).  None if not known.
+        nskey: NwkSEncKey(v1.1) or NwkSKey(v1.0.2)
+        askey: AppSKey
+        akey: AppKey
+    '''
+    def __init__(self, nskey=None, askey=None, akey=None):
+        self.nskey = nskey
+        self.askey = askey
+        self.akey = akey
+
+class MHDR(object):
+    __slots__ = ("raw", "mtype", "rfu", "major")
+
+    def __init__(self, raw, mtype, rfu, major):
+        self.raw = raw
+        self.mtype = mtype
+        self.rfu = rfu
+        self.major = major
+
+class FCtrl(object):
+    '''
+    adrackreq and classb are only for uplink,
+    rfu and fpending are only for downlink.  None otherwise.
+    '''
+    __slots__ = ("raw", "adr", "ack", "foptslen", "adrackreq", "classb", "rfu",
+                 "fpending")
+
+    def __init__(self, raw, adr, ack, foptslen, adrackreq=None, classb=None,
+                 rfu=None, fpending=None):
+        self.raw = raw
+        self.adr = adr
+        self.ack = ack
+        self.foptslen = foptslen
+        self.adrackreq = adrackreq
+        self.classb = classb
+        self.rfu = rfu
+        self.fpending = fpending
+
+class FHDR(object):
+    __slots__ = ("devaddr", "fctrl", "fcnt", "fopts")
+
+    def __init__(self, devaddr, fctrl, fcnt, fopts=None):
+        self.devaddr = devaddr
+        self.fctrl = fctrl
+        self.fcnt = fcnt
+        self.fopts = fopts
+
+class MacCommand(object):
+    '''
+    name is None if the CID is unknown.
+    fields is None if the content is shorter than the size of the command.
+    '''
+    __slots__ = ("cid", "name", "raw", "fields")
+
+    def __init__(self, cid, name, raw, fields):
+        self.cid = cid
+        self.name = name
+        self.raw = raw
+        self.fields = fields
+
+class MACPayload(object):
+    '''
+    fcnt32: the 32-bit FCnt used to decrypt the FRMPayload and for the MIC.
+    frm_payload_plain: the decrypted FRMPayload, None if no key.
+    mac_commands: the list of MacCommand either in FOpts or in FRMPayload.
+    '''
+    __slots__ = ("raw", "fhdr", "fport", "frm_payload", "frm_payload_plain",
+                 "fcnt32", "mac_commands")
+
+    def __init__(self, raw, fhdr, fport=None, frm_payload=None,
+                 frm_payload_plain=None, fcnt32=None, mac_commands=None):
+        self.raw = raw
+        self.fhdr = fhdr
+        self.fport = fport
+        self.frm_payload = frm_payload
+        self.frm_payload_plain = frm_payload_plain
+        self.fcnt32 = fcnt32
+        self.mac_commands = mac_commands
+
+class JoinRequest(object):
+    __slots__ = ("appeui", "deveui", "devnonce")
+
+    def __init__(self, appeui, deveui, devnonce):
+        self.appeui = appeui
+        self.deveui = deveui
+        self.devnonce = devnonce
+
+class JoinAccept(object):
+    '''
+    encrypted: the payload and the MIC as it is in the frame.
+    the others are None if the AppKey is not known.
+        appnonce, netid, devaddr, dlsettings, rxdelay: in integer.
+        cflist: the CFList decoded into a dict, or None if absent.
+        decrypted: the payload and the MIC decrypted.
+        mic: the MIC decrypted.
+        mic_ok: True or False whether the MIC matches.
+    '''
+    __slots__ = ("encrypted", "appnonce", "netid", "devaddr", "dlsettings",
+                 "rxdelay", "cflist", "decrypted", "mic", "mic_ok")
+
+    def __init__(self, encrypted, appnonce=None, netid=None, devaddr=None,
+                 dlsettings=None, rxdelay=None, cflist=None, decrypted=None,
+                 mic=None, mic_ok=None):
+        self.encrypted = encrypted
+        self.appnonce = appnonce
+        self.netid = netid
+        self.devaddr = devaddr
+        self.dlsettings = dlsettings
+        self.rxdelay = rxdelay
+        self.cflist = cflist
+        self.decrypted = decrypted
+        self.mic = mic
+        self.mic_ok = mic_ok
+
+class Frame(object):
+    '''
+    PHYPayload
+        raw: the PHYPayload in bytes.
+        payload: MACPayload, JoinRequest or JoinAccept.
+        keys: Keys used to decode the frame.
+        mic_ok: True or False if the MIC was verified, otherwise None.
+        meta: the radio metadata, e.g. RadioMeta, if known.
+    '''
+    __slots__ = ("raw", "mhdr", "msg_dir", "payload", "mic", "keys", "mic_ok",
+                 "meta")
+
+    def __init__(self, raw, mhdr, msg_dir, payload, mic, keys, mic_ok=None,
+                 meta=None):
+        self.raw = raw
+        self.mhdr = mhdr
+        self.msg_dir = msg_dir
+        self.payload = payload
+        self.mic = mic
+        self.keys = keys
+        self.mic_ok = mic_ok
+        self.meta = meta
+
+'''
+MAC Command Decoders
+
+each decoder takes the content of the command in bytes,
+and returns the fields in integer, in the record of MacCmdFields.
+'''
+class MacCmdFields(object):
+    '''
+    the fields of a MAC command in __slots__ of the subclass, which is
+    made by mac_cmd_fields() for each type of the commands.  it is smaller
+    than a dict, and it is read as a dict as well, e.g. v["DataRate"] and
+    dict(v).  __init__() of the subclass takes the values in the order of
+    __slots__.
+    it is not hashable as a dict is not, because the fields can be changed.
+    '''
+    __slots__ = ()
+    __hash__ = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.__init__ = make_fields_init(cls.__slots__)
+
+    def __getitem__(self, k):
+        if k not in self.__slots__:
+            raise KeyError(k)
+        return getattr(self, k)
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def keys(self):
+        return self.__slots__
+
+    def items(self):
+        return [(k, getattr(self, k)) for k in self.__slots__]
+
+    def __eq__(self, other):
+        if isinstance(other, (MacCmdFields, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return "%s(%s)" % (type(self).__name__,
+                           ", ".join(["%s=%r" % kv for kv in self.items()]))
+
+'''
+make __init__() of a subclass of MacCmdFields, which takes the values in
+the order of the names.  it is generated as namedtuple does, because a loop
+of setattr() is slow in the decoders.
 '''
-def hex2bin(x_string):
-    return bin(int(x_string, 16))[2:].zfill(8)
+def make_fields_init(names):
+    args = "".join([", " + k for k in names])
+    body = "".join(["    self.%s = %s\n" % (k, k) for k in names])
+    ns = {}
+    exec("def __init__(self%s):\n%s    pass\n" % (args, body), ns)
+    return ns["__init__"]
 
 '''
-MAC Command Parsers
+make the subclass of MacCmdFields of the names separated by space.
+'''
+def mac_cmd_fields(name, names):
+    return type(name, (MacCmdFields,), { "__slots__": tuple(names.split()) })
+
+ServDevFields = mac_cmd_fields("ServDevFields", "Dev_LoRaWAN_version Minor")
+LinkCheckAnsFields = mac_cmd_fields("LinkCheckAnsFields", "Margin GwCnt")
+LinkADRReqFields = mac_cmd_fields("LinkADRReqFields",
+        "DataRate_TXPower DataRate TXPower ChMask Redundancy ChMaskCntl NbTrans")
+LinkADRAnsFields = mac_cmd_fields("LinkADRAnsFields",
+        "Status Power_ACK Data_rate_ACK Channel_mask_ACK")
+DutyCycleReqFields = mac_cmd_fields("DutyCycleReqFields",
+                                    "DutyCyclePL MaxDCycle")
+RXParamSetupReqFields = mac_cmd_fields("RXParamSetupReqFields",
+        "DLsettings RX1DRoffset RX2DataRate Freq")
+RXParamSetupAnsFields = mac_cmd_fields("RXParamSetupAnsFields",
+        "Status RX1DRoffset_ACK RX2_Data_rate_ACK Channel_ACK")
+DevStatusAnsFields = mac_cmd_fields("DevStatusAnsFields", "Battery Margin")
+NewChannelReqFields = mac_cmd_fields("NewChannelReqFields",
+        "ChIndex Freq DrRange MaxDR MinDR")
+NewChannelAnsFields = mac_cmd_fields("NewChannelAnsFields",
+        "Status Data_rate_range_ok Channel_frequency_ok")
+RXTimingSetupReqFields = mac_cmd_fields("RXTimingSetupReqFields",
+                                        "Settings Delay")
+TxParamSetupReqFields = mac_cmd_fields("TxParamSetupReqFields",
+        "DwellTime DownlinkDwellTime UplinkDwellTime MaxEIRP")
+DlChannelReqFields = mac_cmd_fields("DlChannelReqFields", "ChIndex Freq")
+DlChannelAnsFields = mac_cmd_fields("DlChannelAnsFields",
+        "Status Uplink_frequency_exists Channel_frequency_ok")
+PingSlotInfoReqFields = mac_cmd_fields("PingSlotInfoReqFields",
+                                       "PingSlotParam Periodicity")
+PingSlotChannelReqFields = mac_cmd_fields("PingSlotChannelReqFields",
+                                          "Freq DataRate DR")
+PingSlotChannelAnsFields = mac_cmd_fields("PingSlotChannelAnsFields",
+        "Status Data_rate_ok Channel_frequency_ok")
+BeaconTimingAnsFields = mac_cmd_fields("BeaconTimingAnsFields",
+                                       "Delay Channel")
+BeaconFreqReqFields = mac_cmd_fields("BeaconFreqReqFields", "Freq")
+BeaconFreqAnsFields = mac_cmd_fields("BeaconFreqAnsFields",
+                                     "Status Beacon_frequency_ok")
+DeviceModeFields = mac_cmd_fields("DeviceModeFields", "Class")
+EmptyFields = mac_cmd_fields("EmptyFields", "")
+
+def decode_maccmd_ServDev_LoRaWAN_version(data):
+    return ServDevFields(data[0], data[0] & 0x0f)
+
+def decode_maccmd_ResetInd(data):
+    return decode_maccmd_ServDev_LoRaWAN_version(data)
+
+def decode_maccmd_ResetConf(data):
+    return decode_maccmd_ServDev_LoRaWAN_version(data)
+
+def decode_maccmd_LinkCheckAns(data):
+    return LinkCheckAnsFields(data[0], data[1])
+
+def decode_maccmd_LinkADRReq(data):
+    return LinkADRReqFields(
+        data[0],
+        data[0] >> 4,
+        data[0] & 0x0f,
+        data[1] | (data[2] << 8),
+        data[3],
+        (data[3] >> 4) & 0x07,
+        data[3] & 0x0f)
+
+def decode_maccmd_LinkADRAns(data):
+    return LinkADRAnsFields(
+        data[0],
+        (data[0] >> 2) & 1,
+        (data[0] >> 1) & 1,
+        data[0] & 1)
+
+def decode_maccmd_DutyCycleReq(data):
+    return DutyCycleReqFields(data[0], data[0] & 0x0f)
+
+def decode_maccmd_RXParamSetupReq(data):
+    return RXParamSetupReqFields(
+        data[0],
+        (data[0] >> 4) & 0x07,
+        data[0] & 0x0f,
+        decode_maccmd_Frequency(data[1:4]))
+
+def decode_maccmd_RXParamSetupAns(data):
+    return RXParamSetupAnsFields(
+        data[0],
+        (data[0] >> 2) & 1,
+        (data[0] >> 1) & 1,
+        data[0] & 1)
+
+def decode_maccmd_DevStatusAns(data):
+    # the margin is a signed integer of 6 bits.
+    i_Margin = data[1] & 0x3f
+    if i_Margin & 0x20:
+        i_Margin -= 64
+    return DevStatusAnsFields(data[0], i_Margin)
+
+def decode_maccmd_Frequency(data):
+    return data[0] | (data[1] << 8) | (data[2] << 16)
+
+def decode_maccmd_NewChannelReq(data):
+    return NewChannelReqFields(
+        data[0],
+        decode_maccmd_Frequency(data[1:4]),
+        data[4],
+        data[4] >> 4,
+        data[4] & 0x0f)
+
+def decode_maccmd_NewChannelAns(data):
+    return NewChannelAnsFields(data[0], (data[0] >> 1) & 1, data[0] & 1)
+
+def decode_maccmd_RXTimingSetupReq(data):
+    return RXTimingSetupReqFields(data[0], data[0] & 0x0f)
+
+def decode_maccmd_TxParamSetupReq(data):
+    return TxParamSetupReqFields(
+        data[0],
+        (data[0] >> 5) & 1,
+        (data[0] >> 4) & 1,
+        data[0] & 0x0f)
+
+def decode_maccmd_DlChannelReq(data):
+    return DlChannelReqFields(data[0], decode_maccmd_Frequency(data[1:4]))
+
+def decode_maccmd_DlChannelAns(data):
+    return DlChannelAnsFields(data[0], (data[0] >> 1) & 1, data[0] & 1)
+
+def decode_maccmd_PingSlotInfoReq(data):
+    return PingSlotInfoReqFields(data[0], data[0] & 0x07)
+
+def decode_maccmd_PingSlotChannelReq(data):
+    return PingSlotChannelReqFields(decode_maccmd_Frequency(data[0:3]),
+                                    data[3], data[3] & 0x0f)
+
+def decode_maccmd_PingSlotChannelAns(data):
+    return PingSlotChannelAnsFields(data[0], (data[0] >> 1) & 1, data[0] & 1)
+
+def decode_maccmd_BeaconTimingAns(data):
+    return BeaconTimingAnsFields(data[0] | (data[1] << 8), data[2])
+
+def decode_maccmd_BeaconFreqReq(data):
+    return BeaconFreqReqFields(decode_maccmd_Frequency(data[0:3]))
+
+def decode_maccmd_BeaconFreqAns(data):
+    return BeaconFreqAnsFields(data[0], data[0] & 1)
+
+def decode_maccmd_DeviceMode(data):
+    return DeviceModeFields(data[0])
+
+def decode_maccmd_empty(data):
+    # zero length
+    return EmptyFields()
+
 '''
-def print_detail(text):
+MAC Command Printers
+
+each printer takes the fields returned by the decoder.
+the detail texts are in lorawan_mac_detail.py, and they are loaded only in
+the verbose mode.
+'''
+def print_detail(key, out=None):
     global f_verbose
     if not f_verbose:
         return
+    import re
+    from lorawan_mac_detail import DETAILS
+    text = DETAILS[key]
+    if out is None:
+        out = sys.stdout
     indent = "        "
-    sys.stdout.write(indent)
-    sys.stdout.write("** Detail: ")
-    sys.stdout.write(re.sub("\s+", " ", text))
-    sys.stdout.write("\n")
-
-def parse_maccmd_ServDev_LoRaWAN_version(x_Dev_LoRaWAN_version):
-    b_Dev_LoRaWAN_version = hex2bin(x_Dev_LoRaWAN_version)
-    b_Minor = hex2bin(b_Dev_LoRaWAN_version[4:])
-    if int(b_Minor, 2) == 1:
+    out.write(indent)
+    out.write("** Detail: ")
+    out.write(re.sub(r"\s+", " ", text))
+    out.write("\n")
+
+def print_maccmd_ServDev_LoRaWAN_version(v, out):
+    if v["Minor"] == 1:
         vs = "LoRaWAN x.1"
     else:
         vs = "RFU"
-    print("    Dev_LoRaWAN_version: [b%s] [x%s]" % (b_Dev_LoRaWAN_version,
-                                                    x_Dev_LoRaWAN_version))
-    print("      Minor: %s [b%s]" % (vs, b_Minor))
-
-def parse_maccmd_ResetInd(hex_data):
-    print("    IS SUPPORTED BY V1.1 OR LATER.")
-    offset = 0
-    #
-    parse_maccmd_ServDev_LoRaWAN_version(hex_data[offset])
-    print_detail("""
-This MAC command is only available to ABP devices activated on a LoRaWAN1.1
-compatible network server. LoRaWAN1.0 servers do not implement this MAC
-command OTA devices MUST NOT implement this command. The network server SHALL
-ignore the ResetInd command coming from an OTA device.
-With the ResetInd command, an ABP end-device indicates to the network
-that it has been re-initialized and
-that he has switched back to its default MAC & radio parameters
-""")
-
-def parse_maccmd_ResetConf(hex_data):
-    print("    IS SUPPORTED BY V1.1 OR LATER.")
-    offset = 0
-    #
-    parse_maccmd_ServDev_LoRaWAN_version(hex_data[offset])
-    print_detail("""
-The server's version carried by the ResetConf must be the same
-than the device's version.  Any other value is invalid.
-""")
-
-def parse_maccmd_LinkCheckReq(hex_data):
-    # zero length
-    pass
-
-def parse_maccmd_LinkCheckAns(hex_data):
-    offset = 0
-    #
-    x_Margin = hex_data[offset]
-    i_Margin = int(x_Margin, 16)
-    print("    Margin: %d [x%s]" % (i_Margin, x_Margin))
-    print_detail("""
-The demodulation margin (Margin) is an 8-bit unsigned integer
-in the range of 0..254
-indicating the link margin in dB of the last successfully
-received LinkCheckReq command.
-A value of 0 means that the frame was received at the demodulation floor
-(0 dB or no 948 margin) 
-""")
-    offset += 1
-    #
-    x_GwCnt = hex_data[offset]
-    i_GwCnt = int(x_GwCnt, 16)
-    print("    GwCnt: %d [x%s]" % (i_GwCnt, x_GwCnt))
-    print_detail("""
-The gateway count (GwCnt) is the number of gateways that successfully
-received the last LinkCheckReq command.
-""")
-
-def parse_maccmd_LinkADRReq(hex_data):
-    offset = 0
-    #
-    x_DataRate_TXPower = hex_data[offset]
-    b_DataRate_TXPower = hex2bin(x_DataRate_TXPower)
-    print("    DataRate_TXPower: [b%s] [x%s]" % (b_DataRate_TXPower,
-                                                 x_DataRate_TXPower))
-    b_datarate = b_DataRate_TXPower[0:3]
-    b_txpower = b_DataRate_TXPower[4:]
-    print("      DataRate      : %d [b%s]" % (int(b_datarate,2), b_datarate))
-    print("      TXPower       : %d [b%s]" % (int(b_txpower,2), b_txpower))
-    print_detail("""
-REGION SPECIFIC.
-A value 0xF (15 in decimal format) of either DataRate or TXPower
-means that the device MUST
-ignore that field, and keep the current parameter value.
-""")
-    offset += 1
-    #
-    x_ChMask = "".join(hex_data[offset:offset+2])
-    b_ChMask = "%s%s" % (hex2bin(x_ChMask[:2]), hex2bin(x_ChMask[2:]))
-    print("    ChMask          : [b%s] [b%s]" % (b_ChMask[:8], b_ChMask[8:]))
+    print("    Dev_LoRaWAN_version: [b%s] [x%02x]" % (
+            int2bin(v["Dev_LoRaWAN_version"]), v["Dev_LoRaWAN_version"]),
+          file=out)
+    print("      Minor: %s [b%s]" % (vs, int2bin(v["Minor"], 4)), file=out)
+
+def print_maccmd_ResetInd(v, out):
+    print("    IS SUPPORTED BY V1.1 OR LATER.", file=out)
+    print_maccmd_ServDev_LoRaWAN_version(v, out)
+    print_detail("ResetInd", out)
+
+def print_maccmd_ResetConf(v, out):
+    print("    IS SUPPORTED BY V1.1 OR LATER.", file=out)
+    print_maccmd_ServDev_LoRaWAN_version(v, out)
+    print_detail("ResetConf", out)
+
+def print_maccmd_LinkCheckAns(v, out):
+    print("    Margin: %d [x%02x]" % (v["Margin"], v["Margin"]), file=out)
+    print_detail("LinkCheckAns.1", out)
+    print("    GwCnt: %d [x%02x]" % (v["GwCnt"], v["GwCnt"]), file=out)
+    print_detail("LinkCheckAns.2", out)
+
+def print_maccmd_LinkADRReq(v, out):
+    print("    DataRate_TXPower: [b%s] [x%02x]" % (
+            int2bin(v["DataRate_TXPower"]), v["DataRate_TXPower"]), file=out)
+    print("      DataRate      : %d [b%s]" % (v["DataRate"],
+                                             int2bin(v["DataRate"], 4)),
+          file=out)
+    print("      TXPower       : %d [b%s]" % (v["TXPower"],
+                                             int2bin(v["TXPower"], 4)),
+          file=out)
+    print_detail("LinkADRReq.1", out)
+    ch_mask = v["ChMask"]
+    print("    ChMask          : [b%s] [b%s]" % (int2bin(ch_mask & 0xff),
+                                                int2bin(ch_mask >> 8)),
+          file=out)
     for i in range(16):
-        if b_ChMask[i] == "1":
-            print("      CH %02d         : %s" % (i, b_ChMask[i]))
-    print_detail("""
-The channel mask (ChMask) encodes the channels usable for uplink access.
-A bit in the ChMask field set to 1 means that the corresponding channel
-can be used for uplink transmissions if this channel allows the data rate
-currently used by the end-device.
-A bit set to 0 means the corresponding channels should be avoided.
-""")
-    offset += 2
-    #
-    x_Redundancy = hex_data[offset]
-    b_Redundancy = hex2bin(x_Redundancy)
-    print("    Redundancy      : [b%s] [x%s]" % (b_Redundancy, x_Redundancy))
-    print("      RFU           : [b%s]" % b_Redundancy[0])
-    print("      ChMaskCntl    : [b%s]" % b_Redundancy[1:4])
-    print_detail("""
-REGION SPECIFIC.
-The channel mask control (ChMaskCntl) field controls the
-interpretation of the previously
-defined ChMask bit mask.
-""")
-    b_NbTrans = b_Redundancy[4:]
-    print("      NbTrans: %d [b%s]" % (int(b_NbTrans,2), b_NbTrans))
-    print_detail("""
-The NbTrans field is the number of transmissions for each uplink message.
-""")
-
-def parse_maccmd_LinkADRAns(hex_data):
-    offset = 0
-    #
-    x_Status = hex_data[offset]
-    b_Status = hex2bin(x_Status)
-    b_Power_ACK = b_Status[5]
-    b_Data_rate_ACK = b_Status[6]
-    b_Channel_mask_ACK = b_Status[7]
-    print("    Status            : [b%s] [x%s]" % (b_Status, x_Status))
-    print("      RFU             : [b%s]" % b_Status[0:5])
-    print("      Power ACK       : %s" % b_Power_ACK)
-    if b_Power_ACK == "0":
-        print_detail("""
-The device is unable to operate at or below the requested power level.. The
-command was discarded and the end-device state was not
-changed.
-""")
+        if (ch_mask >> i) & 1:
+            print("      CH %02d         : 1" % i, file=out)
+    print_detail("LinkADRReq.2", out)
+    b_Redundancy = int2bin(v["Redundancy"])
+    print("    Redundancy      : [b%s] [x%02x]" % (b_Redundancy,
+                                                  v["Redundancy"]), file=out)
+    print("      RFU           : [b%s]" % b_Redundancy[0], file=out)
+    print("      ChMaskCntl    : [b%s]" % b_Redundancy[1:4], file=out)
+    print_detail("LinkADRReq.3", out)
+    print("      NbTrans: %d [b%s]" % (v["NbTrans"], b_Redundancy[4:]),
+          file=out)
+    print_detail("LinkADRReq.4", out)
+
+def print_maccmd_LinkADRAns(v, out):
+    b_Status = int2bin(v["Status"])
+    print("    Status            : [b%s] [x%02x]" % (b_Status, v["Status"]),
+          file=out)
+    print("      RFU             : [b%s]" % b_Status[0:5], file=out)
+    print("      Power ACK       : %d" % v["Power_ACK"], file=out)
+    if v["Power_ACK"] == 0:
+        print_detail("LinkADRAns.1", out)
     else:
-        print_detail("""
-The device is able to operate at or below the requested power level,, or the
-TXPower field of the request was set to 15, meaning it
-shall be ignored
-""")
-    print("      Data_rate_ACK   : %s" % b_Data_rate_ACK)
-    if b_Data_rate_ACK == "0":
-        print_detail("""
-The data rate requested is unknown to the end-device or is
-not possible given the channel mask provided (not supported
-by any of the enabled channels). The command was discarded
-and the end-device state was not changed.
-""")
+        print_detail("LinkADRAns.2", out)
+    print("      Data_rate_ACK   : %d" % v["Data_rate_ACK"], file=out)
+    if v["Data_rate_ACK"] == 0:
+        print_detail("LinkADRAns.3", out)
     else:
-        print_detail("""
-The data rate was successfully set or the DataRate field of
-the request was set to 15, meaning it was ignored
-""")
-    print("      Channel_mask_ACK: %s" % b_Channel_mask_ACK)
-    if b_Channel_mask_ACK == "0":
-        print_detail("""
-The channel mask sent enables a yet undefined channel or the channel mask
-required all channels to be disabled. The command was
-discarded and the end- device state was not changed.
-""")
+        print_detail("LinkADRAns.4", out)
+    print("      Channel_mask_ACK: %d" % v["Channel_mask_ACK"], file=out)
+    if v["Channel_mask_ACK"] == 0:
+        print_detail("LinkADRAns.5", out)
     else:
-        print_detail("""
-The channel mask sent was successfully interpreted. All currently defined
-channel states were set according to the mask.
-""")
-
-def parse_maccmd_DutyCycleReq(hex_data):
-    offset = 0
-    #
-    x_DutyCyclePL = hex_data[offset]
-    b_DutyCyclePL = hex2bin(x_DutyCyclePL)
-    i_MaxDCycle = int(b_DutyCycleP[4:],2)
-    print("    DutyCyclePL: [b%s]" % b_DutyCyclePL)
-    print("      RFU      : [b%s]" % cycle[0:4])
-    print("      MaxDCycle: %.2f [b%s]" % (1./i_MaxDCycle, b_DutyCycleP[4:]))
-    print_detail("""
-A value of 0 corresponds to "no duty cycle limitation"
-except the one set by the regional regulation.
-""")
-
-def parse_maccmd_DutyCycleAns(hex_data):
-    # zero length
-    pass
-
-def parse_maccmd_RXParamSetupReq(hex_data):
-    offset = 0
-    #
-    x_DLsettings = hex_data[offset]
-    b_DLsettings = hex2bin(x_DLsettings)
-    i_RX1DRoffset = int(b_DLsettings[1:4],2)
-    print("    DLsettings   : [b%s]" % b_DLsettings)
-    print("      RFU        : [b%s]" % b_DLsettings[0])
-    print("      RX1DRoffset: %d [b%s]" % (i_RX1DRoffset, b_DLsettings[1:4]))
-    print_detail("""
-The RX1DRoffset field sets the offset between the uplink data
-rate and the downlink data
-rate used to communicate with the end-device on the first
-reception slot (RX1). As a default
-this offset is 0. The offset is used to take into account
-maximum power density constraints
-for base stations in some regions and to balance the
-uplink and downlink radio link margins.
-""")
-    i_RX2DataRate = int(b_DLsettings[4:],2)
-    print("      RX2DataRate: %d [b%s]" % (i_RX2DataRate, b_DLsettings[4:]))
-    print_detail("""
-The RX2DataRate field defines the data rate of a downlink using the second
-receive window following the same convention as the
-LinkADRReq command (0 means DR0/125kHz for example).
-""")
-    offset += 1
-    #
-    x_Freq = "".join(hex_data[offset:offset+3][::-1])
-    i_Freq = int(x_Freq, 16)
-    print("    Freq    : %d kHz [x%s]" % (i_Freq, x_Freq)) 
-    print_detail("""
-The frequency (Freq) field corresponds to the frequency of
-the channel used for the second receive window, whereby
-the frequency is coded following
-the convention defined in the NewChannelReq command.
-""")
-
-def parse_maccmd_RXParamSetupAns(hex_data):
-    offset = 0
-    #
-    x_Status = hex_data[offset]
-    b_Status = hex2bin(x_Status)
-    b_RX1DRoffset_ACK = b_Status[5]
-    b_RX2Datarate_ACK = b_Status[6]
-    b_Channel_ACK = b_Status[7]
-    print("    Status           : [b%s]" % b_Status)
-    print("      RFU            : [b%s]" % b_Status[0:5])
-    print("      RX1DRoffset ACK: %s" % b_RX1DRoffset_ACK)
-    if b_RX1DRoffset_ACK == "0":
-        print_detail("""
-the uplink/downlink data rate offset for RX1 slot is not in the allowed range.
-""")
+        print_detail("LinkADRAns.6", out)
+
+def print_maccmd_DutyCycleReq(v, out):
+    b_DutyCyclePL = int2bin(v["DutyCyclePL"])
+    print("    DutyCyclePL: [b%s]" % b_DutyCyclePL, file=out)
+    print("      RFU      : [b%s]" % b_DutyCyclePL[0:4], file=out)
+    print("      MaxDCycle: %d (1/%d) [b%s]" % (v["MaxDCycle"],
+                                               2**v["MaxDCycle"],
+                                               b_DutyCyclePL[4:]), file=out)
+    print_detail("DutyCycleReq", out)
+
+def print_maccmd_RXParamSetupReq(v, out):
+    b_DLsettings = int2bin(v["DLsettings"])
+    print("    DLsettings   : [b%s]" % b_DLsettings, file=out)
+    print("      RFU        : [b%s]" % b_DLsettings[0], file=out)
+    print("      RX1DRoffset: %d [b%s]" % (v["RX1DRoffset"], b_DLsettings[1:4]),
+          file=out)
+    print_detail("RXParamSetupReq.1", out)
+    print("      RX2DataRate: %d [b%s]" % (v["RX2DataRate"], b_DLsettings[4:]),
+          file=out)
+    print_detail("RXParamSetupReq.2", out)
+    print("    Freq    : %d kHz [x%06x]" % (v["Freq"], v["Freq"]), file=out)
+    print_detail("RXParamSetupReq.3", out)
+
+def print_maccmd_RXParamSetupAns(v, out):
+    b_Status = int2bin(v["Status"])
+    print("    Status           : [b%s]" % b_Status, file=out)
+    print("      RFU            : [b%s]" % b_Status[0:5], file=out)
+    print("      RX1DRoffset ACK: %d" % v["RX1DRoffset_ACK"], file=out)
+    if v["RX1DRoffset_ACK"] == 0:
+        print_detail("RXParamSetupAns.1", out)
     else:
-        print_detail("""
-RX1DRoffset was successfully set.
-""")
-    print("    RX2 Data rate ACK: %s" % b_RX2Datarate_ACK)
-    if b_RX2Datarate_ACK == "0":
-        print_detail("""
-The data rate requested is unknown to the end-device.
-""")
+        print_detail("RXParamSetupAns.2", out)
+    print("    RX2 Data rate ACK: %d" % v["RX2_Data_rate_ACK"], file=out)
+    if v["RX2_Data_rate_ACK"] == 0:
+        print_detail("RXParamSetupAns.3", out)
     else:
-        print_detail("""
-RX2 slot channel was successfully set.
-""")
-    print("    Channel ACK      : %s" % b_Channel_ACK)
-    if b_Channel_ACK == "0":
-        print_detail("""
-The frequency requested is not usable by the end-device.
-""")
+        print_detail("RXParamSetupAns.4", out)
+    print("    Channel ACK      : %d" % v["Channel_ACK"], file=out)
+    if v["Channel_ACK"] == 0:
+        print_detail("RXParamSetupAns.5", out)
     else:
-        print_detail("""
-RX2 slot channel was successfully set.
-""")
-
-def parse_maccmd_DevStatusReq(hex_data):
-    # zero length
-    pass
-
-def parse_maccmd_DevStatusAns(hex_data):
-    offset = 0
-    #
-    x_Battery = hex_data[offset]
-    i_Battery = int(x_Battery, 16)
-    print("    Battery: %d [x%s]" % (i_Battery, x_Battery))
-    if i_Battery == 255:
-        print_detail("""
-The end-device was not able to measure the battery level.
-""")
-    elif i_Battery == 0:
-        print_detail("""
-The end-device is connected to an external power source.
-""")
-    offset += 1
-    #
-    x_Margin = hex_data[offset]
-    b_Margin = hex2bin(x_Margin)
-    i_Margin = int(b_Margin,2)
-    print("    Bargin  : [b%s]" % b_Margin)
-    print("      RFU   : [b%s]" % b_Margin[0:2])
-    print("      Margin: %d [b%s]" % (i_Margin, b_Margin))
-    print_detail("""
-The margin (Margin) is the demodulation signal-to-noise ratio in dB rounded to
-the nearest
-integer value for the last successfully received
-DevStatusReq command. It is a signed
-integer of 6 bits with a minimum value of -32 and a
-maximum value of 31.
-""")
-
-def parse_maccmd_Frequency(hex_data):
+        print_detail("RXParamSetupAns.6", out)
+
+def print_maccmd_DevStatusAns(v, out):
+    print("    Battery: %d [x%02x]" % (v["Battery"], v["Battery"]), file=out)
+    if v["Battery"] == 255:
+        print_detail("DevStatusAns.1", out)
+    elif v["Battery"] == 0:
+        print_detail("DevStatusAns.2", out)
+    print("    Margin : %d [b%s]" % (v["Margin"], int2bin(v["Margin"] & 0x3f, 6)),
+          file=out)
+    print_detail("DevStatusAns.3", out)
+
+def print_maccmd_Frequency(freq, out):
     '''
     it is called from:
-        - parse_maccmd_NewChannelReq()
-        - parse_maccmd_PingSlotChannelReq()
+        - print_maccmd_NewChannelReq()
+        - print_maccmd_PingSlotChannelReq()
     '''
-    offset = 0
-    x_Freq = "".join(hex_data[offset:offset+3][::-1])
-    i_Freq = int(x_Freq, 16)
-    print("    Freq   : %d kHz [x%s]" % (i_Freq, x_Freq))
-    print_detail("""
-The frequency (Freq) field is a 24 bits unsigned integer. The actual channel
-frequency in Hz is 100 x Freq whereby values representing frequencies
-below 100 MHz are reserved for future use. 
-A Freq value of 0 disables the channel. The end-device MUST
-check that the frequency is actually allowed by its radio
-hardware and return an error
-otherwise.
-""")
-    return 3
-
-def parse_maccmd_NewChannelReq(hex_data):
-    offset = 0
-    #
-    x_ChIndex = hex_data[offset]
-    i_ChIndex = int(x_ChIndex, 16)
-    print("    ChIndex: %d [x%s]" % (i_ChIndex, x_ChIndex))
-    print_detail("""
-The channel index (ChIndex) is the index of the channel being created or
-modified.
-Depending on the region and frequency band used, in
-certain regions (cf [PHY]) the LoRaWAN specification imposes default
-channels which must be common to all devices and
-cannot be modified by the NewChannelReq command.
-If the number of default channels is N,
-the default channels go from 0 to N-1,
-and the acceptable range for ChIndex is N to 15.
-A device must be able to handle at least 16 different
-channel definitions. In certain region the
-device may have to store more than 16 channel definitions.
-""")
-    offset += 1
-    #
-    offset += parse_maccmd_Frequency(hex_data)
-    #
-    x_DrRange = hex_data[offset]
-    b_DrRange = hex2bin(x_DrRange)
-    i_MaxDR = int(b_DrRange[:4], 2)
-    i_MinDR = int(b_DrRange[4:], 2)
-    print("    DrRange: [x%s]" % (x_DrRange))
-    print("      MaxDR: %d [b%s]" % (i_MaxDR, b_DrRange[:4]))
-    print("      MinDR: %d [b%s]" % (i_MinDR, b_DrRange[4:]))
-    print_detail("""
-the minimum data rate (MinDR) subfield
-designate the lowest uplink data rate allowed on this channel.
-Similarly, the maximum data rate
-(MaxDR) designates the highest uplink data rate.
-""")
-
-def parse_maccmd_NewChannelAns(hex_data):
-    offset = 0
-    #
-    x_Status = hex_data[offset]
-    b_Status = hex2bin(x_Status)
-    b_Data_rate_range_ok = b_Status[6]
-    b_Channel_frequency_ok = b_Status[7]
-    print("    Status                : [x%s]" % x_Status)
-    print("      RFU                 : [b%s]" % b_Status[0:6])
-    print("      Data rate range ok  : %s" % b_Data_rate_range_ok)
-    if b_Data_rate_range_ok == "0":
-        print_detail("""
-The designated data rate range exceeds the ones currently defined
-for this end-device.
-""")
+    print("    Freq   : %d kHz [x%06x]" % (freq, freq), file=out)
+    print_detail("Frequency", out)
+
+def print_maccmd_NewChannelReq(v, out):
+    print("    ChIndex: %d [x%02x]" % (v["ChIndex"], v["ChIndex"]), file=out)
+    print_detail("NewChannelReq.1", out)
+    print_maccmd_Frequency(v["Freq"], out)
+    print("    DrRange: [x%02x]" % v["DrRange"], file=out)
+    print("      MaxDR: %d [b%s]" % (v["MaxDR"], int2bin(v["MaxDR"], 4)),
+          file=out)
+    print("      MinDR: %d [b%s]" % (v["MinDR"], int2bin(v["MinDR"], 4)),
+          file=out)
+    print_detail("NewChannelReq.2", out)
+
+def print_maccmd_NewChannelAns(v, out):
+    b_Status = int2bin(v["Status"])
+    print("    Status                : [x%02x]" % v["Status"], file=out)
+    print("      RFU                 : [b%s]" % b_Status[0:6], file=out)
+    print("      Data rate range ok  : %d" % v["Data_rate_range_ok"], file=out)
+    if v["Data_rate_range_ok"] == 0:
+        print_detail("NewChannelAns.1", out)
     else:
-        print_detail("""
-The data rate range is compatible with the possibilities of the end-device.
-""")
-    print("      Channel frequency ok: %s" % b_Channel_frequency_ok)
-    if b_Channel_frequency_ok == "0":
-        print_detail("""
-The device cannot use this frequency.
-""")
+        print_detail("NewChannelAns.2", out)
+    print("      Channel frequency ok: %d" % v["Channel_frequency_ok"],
+          file=out)
+    if v["Channel_frequency_ok"] == 0:
+        print_detail("NewChannelAns.3", out)
     else:
-        print_detail("""
-The device is able to use this frequency.
-""")
-
-def parse_maccmd_RXTimingSetupReq(hex_data):
-    offset = 0
-    #
-    Settings = bin(int(hex_data[offset], 16))[2:].zfill(8)
-    print("    RFU:", Status[0:4])
-    print("    Delay:", Status[4:])
-    print_detail("""
-The delay (Delay) field specifies the delay in second.
-the value of 0 and 1 indicates 1 (s).
-the value of 15 indicates 15 (s).
-""")
-
-def parse_maccmd_RXTimingSetupAns(hex_data):
-    # zero length
-    pass
-
-def parse_maccmd_TxParamSetupReq(hex_data):
-    offset = 0
-    #
-    DwellTime = bin(int(hex_data[offset], 16))[2:].zfill(8)
-    print("    RFU:", DwellTime[0:2])
-    print("    DownlinkDwellTime:", DwellTime[2])
-    print("    UplinkDwellTime:", DwellTime[3])
-    print("    MaxEIRP:", DwellTime[4:])
-
-def parse_maccmd_TxParamSetupAns(hex_data):
-    # zero length
-    pass
-
-def parse_maccmd_DlChannelReq(hex_data):
-    offset = 0
-    #
-    ChIndex = int(hex_data[offset], 16)
-    print_detail("""
-The channel index (ChIndex) is the index of the
-channel whose downlink frequency is
-modified.
-""")
-    offset += 1
-    #
-    x_Freq = "".join(hex_data[offset:offset+3][::-1])
-    i_Freq = int(x_Freq, 16)
-    print("    Freq   : %d kHz [x%s]" % (i_Freq, x_Freq))
-    print_detail("""
-The frequency (Freq) field is a 24 bits unsigned integer.
-The actual downlink frequency in Hz
-is 100 x Freq whereby values representing
-frequencies below 100 MHz are reserved for
-future use. The end-device has to check that the
-frequency is actually allowed by its radio
-hardware and return an error otherwise.
-""")
-
-def parse_maccmd_DlChannelAns(hex_data):
-    offset = 0
-    #
-    Status = bin(int(hex_data[offset], 16))[2:].zfill(8)
-    print("    RFU:", Status[0:6])
-    print("    Uplink frequency exists:", Status[6])
-    if Status[6] == "0":
-        print_detail("""
-The uplink frequency is not defined for this channel, the downlink frequency
-can only be set for a channel that already has
-a valid uplink frequency
-""")
+        print_detail("NewChannelAns.4", out)
+
+def print_maccmd_RXTimingSetupReq(v, out):
+    b_Settings = int2bin(v["Settings"])
+    print("    RFU  : [b%s]" % b_Settings[0:4], file=out)
+    print("    Delay: %d [b%s]" % (v["Delay"], b_Settings[4:]), file=out)
+    print_detail("RXTimingSetupReq", out)
+
+def print_maccmd_TxParamSetupReq(v, out):
+    b_DwellTime = int2bin(v["DwellTime"])
+    print("    RFU              : [b%s]" % b_DwellTime[0:2], file=out)
+    print("    DownlinkDwellTime: %d" % v["DownlinkDwellTime"], file=out)
+    print("    UplinkDwellTime  : %d" % v["UplinkDwellTime"], file=out)
+    print("    MaxEIRP          : %d [b%s]" % (v["MaxEIRP"], b_DwellTime[4:]),
+          file=out)
+
+def print_maccmd_DlChannelReq(v, out):
+    print("    ChIndex: %d [x%02x]" % (v["ChIndex"], v["ChIndex"]), file=out)
+    print_detail("DlChannelReq.1", out)
+    print("    Freq   : %d kHz [x%06x]" % (v["Freq"], v["Freq"]), file=out)
+    print_detail("DlChannelReq.2", out)
+
+def print_maccmd_DlChannelAns(v, out):
+    b_Status = int2bin(v["Status"])
+    print("    RFU                    : [b%s]" % b_Status[0:6], file=out)
+    print("    Uplink frequency exists: %d" % v["Uplink_frequency_exists"],
+          file=out)
+    if v["Uplink_frequency_exists"] == 0:
+        print_detail("DlChannelAns.1", out)
     else:
-        print_detail("""
-The uplink frequency of the channel is valid.
-""")
-    print("    Channel frequency ok:", Status[7])
-    if Status[7] == "0":
-        print_detail("""
-The device cannot use this frequency.
-""")
+        print_detail("DlChannelAns.2", out)
+    print("    Channel frequency ok   : %d" % v["Channel_frequency_ok"],
+          file=out)
+    if v["Channel_frequency_ok"] == 0:
+        print_detail("DlChannelAns.3", out)
     else:
-        print_detail("""
-The device is able to use this frequency.
-""")
+        print_detail("DlChannelAns.4", out)
 
 #
-# Class B Mac Command Parsers
+# Class B Mac Command Printers
 #
-def parse_maccmd_PingSlotInfoReq(hex_data):
-    offset = 0
-    #
-    x_PingSlotParam = hex_data[offset]
-    b_PingSlotParam = hex2bin(x_PingSlotParam)
-    i_Periodicity = int(b_PingSlotParam[5:7], 2)
-    print("    PingSlotParam: [b%s] [x%s]" % (b_PingSlotParam,
-                                              x_PingSlotParam))
-    print("      RFU        : [b%s]" % b_PingSlotParam[0:4])
-    print("      Periodicity: %d [b%s]" % (i_Periodicity,
-                                           b_PingSlotParam[5:7]))
-    print_detail("""
-Periodicity = 0 means that the end-device opens a ping slot every second.
-Periodicity = 7, every 128 seconds which is the maximum ping period
-supported by the LoRaWAN Class B specification.
-""")
-
-def parse_maccmd_PingSlotInfoAns(hex_data):
-    # zero length
-    pass
-
-def parse_maccmd_PingSlotChannelReq(hex_data):
-    offset = 0
-    #
-    offset = parse_maccmd_Frequency(hex_data)
-    #
-    x_DataRate = hex_data[offset]
-    b_DataRate = hex2bin(x_DataRate)
-    b_RFU = b_DataRate[:4]
-    b_datarate = b_DataRate[4:]
-    i_RFU = int(b_RFU, 2)
-    i_datarate = int(b_datarate, 2)
-    print("    DataRate: [x%s]" % (x_DataRate))
-    print("      RFU      : %d [b%s]" % (i_RFU, b_RFU))
-    print("      data rate: %d [b%s]" % (i_datarate, b_datarate))
-    print_detail("""
-The “data rate” subfield is the index of the Data Rate used
-for the ping-slot downlinks.
-""")
-
-def parse_maccmd_PingSlotChannelAns(hex_data):
-    offset = 0
-    #
-    x_Status = hex_data[offset]
-    b_Status = hex2bin(x_Status)
-    b_RFU = b_Status[:6]
-    b_datarate_ok = b_Status[6:7]
-    b_chfreq_ok = b_Status[7:8]
-    print("    DataRate: [x%s]" % (b_Status))
-    print("      RFU          : [b%s]" % (b_RFU))
-    print("      data rate ok : %s" % (b_datarate_ok))
-    print("      ch freq ok   : %s" % (b_chfreq_ok))
-    print_detail("""
-for data rate ok,
-if 0, Data rate ok: The designated data rate is not defined for this end device,
-the previous data rate is kept.
-if 1, The data rate is compatible with the possibilities of the end device
-The device cannot receiveon this frequency
-This frequency can be used by the end-device
-If either of those 2 bits equals 0, the command did not succeed and the
-ping-slot parameters have not been modified.
-""")
-
-def parse_maccmd_BeaconTimingReq(hex_data):
-    print_detail("""
-DEPRECATED.
-The network may answer only a limited number of requests per a given time
-period.  An end-device must not expect that BeaconTimingReq is answered
-immediately with a BeaconTimingAns. Class A end-devices wanting to switch
-to Class B should not transmit more than one BeaconTimingReq per hour.
-""")
-
-def parse_maccmd_BeaconTimingAns(hex_data):
-    print_detail("""
-DEPRECATED.
-""")
-    offset = 0
-    #
-    x_Delay = "".join(hex_data[offset:offset+2])
-    i_Delay = int(x_Delay, 16)
-    print("    Delay  : %d [x%s]" % (i_Delay, x_Delay))
-    print_detail("""
-If the remaining time between the end of the
-current downlink frame and the start of the next beacon frame is noted RTime
-then: 30 ms x (Delay+1) > RTime >= 30 ms x Delay
-""")
-    offset += 2
-    #
-    x_Channel = hex_data[offset] 
-    i_Channel = int(x_Channel, 16)
-    print("    Channel: %d [x%s]" % (i_Channel, x_Channel))
-    print_detail("""
-In networks where the beacon uses alternatively several channels,
-the "Channel" field is the index of the beaconing channel
-on which the next beacon will be broadcasted.
-For networks where the beacon broadcast frequency is fixed then this field
-content is 0.
-""")
-
-def parse_maccmd_BeaconFreqReq(hex_data):
-    offset = 0
-    #
-    x_Freq = "".join(hex_data[offset:offset+3][::-1])
-    i_Freq = int(x_Freq, 16)
-    print("    Freq   : %d kHz [x%s]" % (i_Freq, x_Freq))
-    print_detail("""
-Frequency is a 24bits unsigned integer. The actual beacon
-channel frequency in Hz is 100 x frequ. This allows defining
-the beacon channel anywhere between 100 MHz to 1.67 GHz
-by 100 Hz step. The end-device has to check that the frequency
-is actually allowed by its radio hardware and return an error otherwise.
-A valid non-zero Frequency will force the device to listen
-to the beacon on a fixed frequency channel even if the default
-behavior specifies a frequency hopping beacon (i.e US ISM band).
-A value of 0 instructs the end-device to use the default
-beacon frequency plan as defined in the "Beacon physical layer" section.
-Where applicable the device resumes frequency hopping beacon search.
-""")
-
-def parse_maccmd_BeaconFreqAns(hex_data):
-    offset = 0
-    #
-    status = bin(int(hex_data[offset], 16))[2:].zfill(8)
-    print("    Status:", hex_data[offset])
-    print("      RFU:", status[0:6])
-    print("      Beacon frequency ok:", period[6:7])
-    print_detail("""
-Bit=0: The device cannot use this frequency, the previous beacon frequency is
-kept.
-Bit=1: The beacon frequency has been changed
-""")
+def print_maccmd_PingSlotInfoReq(v, out):
+    b_PingSlotParam = int2bin(v["PingSlotParam"])
+    print("    PingSlotParam: [b%s] [x%02x]" % (b_PingSlotParam,
+                                                v["PingSlotParam"]), file=out)
+    print("      RFU        : [b%s]" % b_PingSlotParam[0:5], file=out)
+    print("      Periodicity: %d [b%s]" % (v["Periodicity"],
+                                           b_PingSlotParam[5:]), file=out)
+    print_detail("PingSlotInfoReq", out)
+
+def print_maccmd_PingSlotChannelReq(v, out):
+    print_maccmd_Frequency(v["Freq"], out)
+    b_DataRate = int2bin(v["DataRate"])
+    print("    DataRate: [x%02x]" % v["DataRate"], file=out)
+    print("      RFU      : [b%s]" % b_DataRate[:4], file=out)
+    print("      data rate: %d [b%s]" % (v["DR"], b_DataRate[4:]), file=out)
+    print_detail("PingSlotChannelReq", out)
+
+def print_maccmd_PingSlotChannelAns(v, out):
+    b_Status = int2bin(v["Status"])
+    print("    Status: [b%s]" % b_Status, file=out)
+    print("      RFU          : [b%s]" % b_Status[:6], file=out)
+    print("      data rate ok : %d" % v["Data_rate_ok"], file=out)
+    print("      ch freq ok   : %d" % v["Channel_frequency_ok"], file=out)
+    print_detail("PingSlotChannelAns", out)
+
+def print_maccmd_BeaconTimingReq(v, out):
+    print_detail("BeaconTimingReq", out)
+
+def print_maccmd_BeaconTimingAns(v, out):
+    print_detail("BeaconTimingAns.1", out)
+    print("    Delay  : %d [x%04x]" % (v["Delay"], v["Delay"]), file=out)
+    print_detail("BeaconTimingAns.2", out)
+    print("    Channel: %d [x%02x]" % (v["Channel"], v["Channel"]), file=out)
+    print_detail("BeaconTimingAns.3", out)
+
+def print_maccmd_BeaconFreqReq(v, out):
+    print("    Freq   : %d kHz [x%06x]" % (v["Freq"], v["Freq"]), file=out)
+    print_detail("BeaconFreqReq", out)
+
+def print_maccmd_BeaconFreqAns(v, out):
+    b_Status = int2bin(v["Status"])
+    print("    Status: [x%02x]" % v["Status"], file=out)
+    print("      RFU: [b%s]" % b_Status[0:7], file=out)
+    print("      Beacon frequency ok: %d" % v["Beacon_frequency_ok"], file=out)
+    print_detail("BeaconFreqAns", out)
 
 #
-# Class C Mac Command Parsers
+# Class C Mac Command Printers
 #
-def parse_maccmd_DeviceModeInd(hex_data):
-    print("    NOT YET IMPLEMENTED.")
+def print_maccmd_DeviceMode(v, out):
+    print("    Class: %s [x%02x]" % ({0: "Class A", 2: "Class C"}.get(
+            v["Class"], "RFU"), v["Class"]), file=out)
 
-def parse_maccmd_DeviceModeConf(hex_data):
-    print("    NOT YET IMPLEMENTED.")
+def print_maccmd_empty(v, out):
+    # zero length
+    pass
 
 '''
 Table for MAC Command Parser
     name: MAC command name
     size: content size in size.
-    parser: function name.
+    decoder: function to decode the content.
+    printer: function to print the decoded fields.
 '''
 mac_cmd_tab = {
     #
     # Class A Mac Command
     #
-    "01": {
+    0x01: {
         MSGDIR_UP: {
             "name": "ResetInd",
             "size": 1,
-            "parser": parse_maccmd_ResetInd
+            "decoder": decode_maccmd_ResetInd,
+            "printer": print_maccmd_ResetInd
         },
         MSGDIR_DOWN: {
             "name": "ResetConf",
             "size": 1,
-            "parser": parse_maccmd_ResetConf
+            "decoder": decode_maccmd_ResetConf,
+            "printer": print_maccmd_ResetConf
         }
     },
-    "02": {
+    0x02: {
         MSGDIR_UP: {
             "name": "LinkCheckReq",
             "size": 0,
-            "parser": parse_maccmd_LinkCheckReq
+            "decoder": decode_maccmd_empty,
+            "printer": print_maccmd_empty
         },
         MSGDIR_DOWN: {
             "name": "LinkCheckAns",
             "size": 2,
-            "parser": parse_maccmd_LinkCheckAns
+            "decoder": decode_maccmd_LinkCheckAns,
+            "printer": print_maccmd_LinkCheckAns
         }
     },
-    "03": {
+    0x03: {
         MSGDIR_UP: {
             "name": "LinkADRAns",
             "size": 1,
-            "parser": parse_maccmd_LinkADRAns
+            "decoder": decode_maccmd_LinkADRAns,
+            "printer": print_maccmd_LinkADRAns
         },
         MSGDIR_DOWN: {
             "name": "LinkADRReq",
             "size": 4,
-            "parser": parse_maccmd_LinkADRReq
+            "decoder": decode_maccmd_LinkADRReq,
+            "printer": print_maccmd_LinkADRReq
         }
     },
-    "04": {
+    0x04: {
         MSGDIR_UP: {
             "name": "DutyCycleAns",
             "size": 0,
-            "parser": parse_maccmd_DutyCycleAns
+            "decoder": decode_maccmd_empty,
+            "printer": print_maccmd_empty
         },
         MSGDIR_DOWN: {
             "name": "DutyCycleReq",
             "size": 1,
-            "parser": parse_maccmd_DutyCycleReq
+            "decoder": decode_maccmd_DutyCycleReq,
+            "printer": print_maccmd_DutyCycleReq
         }
     },
-    "05": {
+    0x05: {
         MSGDIR_UP: {
             "name": "RXParamSetupAns",
             "size": 1,
-            "parser": parse_maccmd_RXParamSetupAns
+            "decoder": decode_maccmd_RXParamSetupAns,
+            "printer": print_maccmd_RXParamSetupAns
         },
         MSGDIR_DOWN: {
             "name": "RXParamSetupReq",
             "size": 4,
-            "parser": parse_maccmd_RXParamSetupReq
+            "decoder": decode_maccmd_RXParamSetupReq,
+            "printer": print_maccmd_RXParamSetupReq
         }
     },
-    "06": {
+    0x06: {
         MSGDIR_UP: {
             "name": "DevStatusAns",
             "size": 2,
-            "parser": parse_maccmd_DevStatusAns
+            "decoder": decode_maccmd_DevStatusAns,
+            "printer": print_maccmd_DevStatusAns
         },
         MSGDIR_DOWN: {
             "name": "DevStatusReq",
             "size": 0,
-            "parser": parse_maccmd_DevStatusReq
+            "decoder": decode_maccmd_empty,
+            "printer": print_maccmd_empty
         }
     },
-    "07": {
+    0x07: {
         MSGDIR_UP: {
             "name": "NewChannelAns",
             "size": 1,
-            "parser": parse_maccmd_NewChannelAns
+            "decoder": decode_maccmd_NewChannelAns,
+            "printer": print_maccmd_NewChannelAns
         },
         MSGDIR_DOWN: {
             "name": "NewChannelReq",
             "size": 5,
-            "parser": parse_maccmd_NewChannelReq
+            "decoder": decode_maccmd_NewChannelReq,
+            "printer": print_maccmd_NewChannelReq
         }
     },
-    "08": {
+    0x08: {
         MSGDIR_UP: {
             "name": "RXTimingSetupAns",
             "size": 0,
-            "parser": parse_maccmd_RXTimingSetupAns
+            "decoder": decode_maccmd_empty,
+            "printer": print_maccmd_empty
         },
         MSGDIR_DOWN: {
             "name": "RXTimingSetupReq",
             "size": 1,
-            "parser": parse_maccmd_RXTimingSetupReq
+            "decoder": decode_maccmd_RXTimingSetupReq,
+            "printer": print_maccmd_RXTimingSetupReq
         }
     },
-    "09": {
+    0x09: {
         MSGDIR_UP: {
             "name": "TxParamSetupAns",
             "size": 0,
-            "parser": parse_maccmd_TxParamSetupAns
+            "decoder": decode_maccmd_empty,
+            "printer": print_maccmd_empty
         },
         MSGDIR_DOWN: {
             "name": "TxParamSetupReq",
             "size": 1,
-            "parser": parse_maccmd_TxParamSetupReq
+            "decoder": decode_maccmd_TxParamSetupReq,
+            "printer": print_maccmd_TxParamSetupReq
         }
     },
-    "0a": {
+    0x0a: {
         MSGDIR_UP: {
             "name": "DlChannelAns",
             "size": 1,
-            "parser": parse_maccmd_DlChannelAns
+            "decoder": decode_maccmd_DlChannelAns,
+            "printer": print_maccmd_DlChannelAns
         },
         MSGDIR_DOWN: {
             "name": "DlChannelReq",
             "size": 4,
-            "parser": parse_maccmd_DlChannelReq
+            "decoder": decode_maccmd_DlChannelReq,
+            "printer": print_maccmd_DlChannelReq
         }
     },
     #
     # Class B Mac Command
     #
-    "10": {
+    0x10: {
         MSGDIR_UP: {
             "name": "PingSlotInfoReq",
             "size": 1,
-            "parser": parse_maccmd_PingSlotInfoReq
+            "decoder": decode_maccmd_PingSlotInfoReq,
+            "printer": print_maccmd_PingSlotInfoReq
         },
         MSGDIR_DOWN: {
             "name": "PingSlotInfoAns",
             "size": 0,
-            "parser": parse_maccmd_PingSlotInfoAns
+            "decoder": decode_maccmd_empty,
+            "printer": print_maccmd_empty
         }
     },
-    "11": {
+    0x11: {
         MSGDIR_UP: {
             "name": "PingSlotChannelAns",
-            "size": 4,
-            "parser": parse_maccmd_PingSlotChannelAns
+            "size": 1,
+            "decoder": decode_maccmd_PingSlotChannelAns,
+            "printer": print_maccmd_PingSlotChannelAns
         },
         MSGDIR_DOWN: {
             "name": "PingSlotChannelReq",
             "size": 4,
-            "parser": parse_maccmd_PingSlotChannelReq
+            "decoder": decode_maccmd_PingSlotChannelReq,
+            "printer": print_maccmd_PingSlotChannelReq
         }
     },
-    "12": {
+    0x12: {
         MSGDIR_UP: {
             "name": "BeaconTimingReq",
             "size": 0,
-            "parser": parse_maccmd_BeaconTimingReq
+            "decoder": decode_maccmd_empty,
+            "printer": print_maccmd_BeaconTimingReq
         },
         MSGDIR_DOWN: {
             "name": "BeaconTimingAns",
             "size": 3,
-            "parser": parse_maccmd_BeaconTimingAns
+            "decoder": decode_maccmd_BeaconTimingAns,
+            "printer": print_maccmd_BeaconTimingAns
         }
     },
-    "13": {
+    0x13: {
         MSGDIR_UP: {
             "name": "BeaconFreqAns",
             "size": 1,
-            "parser": parse_maccmd_BeaconFreqAns
+            "decoder": decode_maccmd_BeaconFreqAns,
+            "printer": print_maccmd_BeaconFreqAns
         },
         MSGDIR_DOWN: {
             "name": "BeaconFreqReq",
             "size": 3,
-            "parser": parse_maccmd_BeaconFreqReq
+            "decoder": decode_maccmd_BeaconFreqReq,
+            "printer": print_maccmd_BeaconFreqReq
         }
     },
     #
     # Class C Mac Command
     #
-    "20": {
+    0x20: {
         MSGDIR_UP: {
             "name": "DeviceModeInd",
             "size": 1,
-            "parser": parse_maccmd_DeviceModeInd
+            "decoder": decode_maccmd_DeviceMode,
+            "printer": print_maccmd_DeviceMode
         },
         MSGDIR_DOWN: {
             "name": "DeviceModeConf",
             "size": 1,
-            "parser": parse_maccmd_DeviceModeConf
+            "decoder": decode_maccmd_DeviceMode,
+            "printer": print_maccmd_DeviceMode
         }
     }
     }
 
-def parse_mac_cmd(msg_dir, hex_data):
+class MacCmdDesc(object):
+    '''
+    descriptor of a MAC command compiled from mac_cmd_tab.
+    '''
+    __slots__ = ("cid", "name", "size", "decoder", "printer")
+
+    def __init__(self, cid, name, size, decoder, printer):
+        self.cid = cid
+        self.name = name
+        self.size = size
+        self.decoder = decoder
+        self.printer = printer
+
+'''
+compile mac_cmd_tab into a list of 256 MacCmdDesc for each direction,
+indexed by the CID.  The entry of an unknown CID is None.
+'''
+def compile_mac_cmd_tab(tab):
+    compiled = { MSGDIR_UP: [None] * 256, MSGDIR_DOWN: [None] * 256 }
+    for cid, t in tab.items():
+        for msg_dir, v in t.items():
+            compiled[msg_dir][cid] = MacCmdDesc(cid, v["name"], v["size"],
+                                                v["decoder"], v["printer"])
+    return compiled
+
+mac_cmd_desc = compile_mac_cmd_tab(mac_cmd_tab)
+
+'''
+decode a series of MAC commands into the list of MacCommand.
+it stops at the first unknown CID.
+'''
+def decode_mac_cmd(msg_dir, data):
+    tab = mac_cmd_desc[msg_dir]
+    data_len = len(data)
     offset = 0
-    n_maccmd = 0
-    while offset < len(hex_data):
-        cid = hex_data[offset]
-        a = mac_cmd_tab.has_key(cid)
-        if a:
-            t = mac_cmd_tab[cid][msg_dir]
-            offset += 1
-            n_maccmd += 1
-            if t["size"] == 0:
-                print("  %02d. %s (x%s %slink)" % (n_maccmd, t["name"],
-                                                   cid, msg_dir))
-            else:
-                print("  %02d. %s (x%s %slink) [%s]" % (
-                        n_maccmd, t["name"], cid, msg_dir,
-                        "".join(hex_data[offset:offset+t["size"]])))
-            t["parser"](hex_data[offset:])
-            offset += t["size"]
-        else:
-            print("ERROR: Proprietary MAC command [%s] has been found." %
-                  hex_data[offset])
-            # just stop to parse all.
-            return
+    mac_commands = []
+    while offset < data_len:
+        cid = data[offset]
+        t = tab[cid]
+        offset += 1
+        if t is None:
+            mac_commands.append(MacCommand(cid, None, bytes(data[offset:]),
+                                           None))
+            break
+        end = offset + t.size
+        content = data[offset:end]
+        if end > data_len:
+            mac_commands.append(MacCommand(cid, t.name, bytes(content), None))
+            break
+        mac_commands.append(MacCommand(cid, t.name, bytes(content),
+                                       t.decoder(content)))
+        offset = end
+    return mac_commands
 
 '''
 MHDR parser
@@ -876,63 +1009,30 @@ MHDR parser
     MType |  RFU  | Major
 '''
 def get_mtype_cmd(mtype):
-    return {
-        "000": "Join Request",
-        "001": "Join Accept",
-        "010": "Unconfirmed Data Up",
-        "011": "Unconfirmed Data Down",
-        "100": "Confirmed Data Up",
-        "101": "Confirmed Data Down",
-        "110": "RFU",
-        "111": "Proprietary"
-        }[mtype]
+    return (
+        "Join Request",
+        "Join Accept",
+        "Unconfirmed Data Up",
+        "Unconfirmed Data Down",
+        "Confirmed Data Up",
+        "Confirmed Data Down",
+        "RFU",
+        "Proprietary"
+        )[mtype]
 
 def get_major(major):
-    return {
-        "00": "LoRaWAN R1",
-        "01": "RFU",
-        "10": "RFU",
-        "11": "RFU"
-        }[major]
-
-def parse_mhdr(hex_data):
-    mhdr = hex_data[0]
-    mhdr_bin = bin(int(mhdr, 16))[2:].zfill(8)
-    mtype = mhdr_bin[0:3]
-    mtype_cmd = get_mtype_cmd(mtype)
-    mhdr_rfu = mhdr_bin[3:6]
-    major = mhdr_bin[6:]
-    print("## MHDR           [x%s] [b%s]" % (mhdr, mhdr_bin))
-    print("  MType         : %s [b%s]" % (get_mtype_cmd(mtype), mtype))
-    print("  RFU           : [b%s]" % mhdr_rfu)
-    print("  Major         : %s [b%s]" % (get_major(major), major))
-    #
-    return mtype
+    return (
+        "LoRaWAN R1",
+        "RFU",
+        "RFU",
+        "RFU"
+        )[major]
 
-def bin2hexarray(m):
-    return ["%02x" % m[i] for i in range(0,len(m),2)]
+def decode_mhdr(mhdr):
+    return MHDR(mhdr, mhdr >> 5, (mhdr >> 2) & 0x07, mhdr & 0x03)
 
 '''
-FRMPayload parser
-'''
-def parse_frm_payload(hex_data, askey, devaddr, dir_down, fcnt_hex):
-    print("## FRMPayload   : [x%s]" % hex_data)
-    if f_verbose:
-        print("  ** Detail:")
-        print("    hex_data = %s" % hex_data)
-        print("    askey = %s" % askey)
-        print("    devaddr = %s" % devaddr)
-        print("    dir_down = %d" % dir_down)
-        print("    fcnt = %s" % fcnt_hex)
-    if not askey:
-        return error("askey must be specified.")
-    m = LoRaMacPayloadEncrypt(hex_data, askey,
-                                devaddr, dir_down, fcnt_hex)
-    print("  x %s" % " ".join(bin2hexarray(m)))
-    return
-
-'''
-MACPayload parser
+MACPayload decoder
 
 - MACPayload
     FHDR | FPort | FRMPayload
@@ -950,37 +1050,30 @@ MACPayload parser
         |   ADR  |     |  RFT or  |
     ADR | ACKReq | ACK | Class B  | FOptsLen
 '''
-def parse_mac_payload(msg_dir, hex_data, nskey, askey, xfcnt):
-    global f_verbose
-    ret = {}
-    ret["devaddr"] = "".join(hex_data[0:4][::-1])
-    fctrl = hex_data[4]
-    fctrl_bin = bin(int(fctrl, 16))[2:].zfill(8)
-    print("  FHDR            [x%s]" % ("".join(hex_data)))
-    print("    DevAddr     : %s [x%s]" % (ret["devaddr"], "".join(hex_data[:4])))
-    print("    FCtrl       : [x%s] [b%s]" % (fctrl, fctrl_bin))
-    #
-    ret["adr"] = int(fctrl_bin[0:1])
-    print("      ADR       : %d" % ret["adr"])
+def decode_fctrl(msg_dir, fctrl):
+    adr = fctrl >> 7
+    ack = (fctrl >> 5) & 1
+    foptslen = fctrl & 0x0f
     if msg_dir == MSGDIR_DOWN:
-        fctrl_rfu = fctrl_bin[1:2]
-        ret["ack"] = int(fctrl_bin[2:3])
-        ret["fpending"] = int(fctrl_bin[3:4])
-        print("      RFU       : %s" % fctrl_rfu)
-        print("      ACK       : %d" % ret["ack"])
-        print("      FPending  : %d" % ret["fpending"])
+        return FCtrl(fctrl, adr, ack, foptslen,
+                     rfu=(fctrl >> 6) & 1, fpending=(fctrl >> 4) & 1)
     else:
-        ret["adrackreq"] = int(fctrl_bin[1:2])
-        ret["ack"] = int(fctrl_bin[2:3])
-        ret["rfu_classb"] = int(fctrl_bin[3:4])
-        print("      ADRACKReq : %d" % ret["adrackreq"])
-        print("      ACK       : %d" % ret["ack"])
-        print("      RFU/ClsB  : %d" % ret["rfu_classb"])
-    #
-    ret["foptslen"] = int(fctrl_bin[4:], 2)
-    ret["fcnt"] = int("".join(hex_data[5:7][::-1]), 16)
-    print("      FOptsLen  : %d [b%s]" % (ret["foptslen"], fctrl_bin[4:]))
-    print("    FCnt        : %d [x%s]" % (ret["fcnt"], "".join(hex_data[5:7])))
+        return FCtrl(fctrl, adr, ack, foptslen,
+                     adrackreq=(fctrl >> 6) & 1, classb=(fctrl >> 4) & 1)
+
+'''
+call func with args, same as Stats.call() without the timer.
+it is used as the call of the stages when Stats is not given.
+'''
+def _nocall(stage, func, *args):
+    return func(*args)
+
+def decode_mac_payload(msg_dir, data, keys, xfcnt, stats=None):
+    call = stats.call if stats is not None else _nocall
+    if len(data) < FHDR_STRUCT.size:
+        raise ValueError("ERROR: too short MACPayload, %d bytes." % len(data))
+    devaddr, fctrl, fcnt = FHDR_STRUCT.unpack_from(data)
+    fctrl = decode_fctrl(msg_dir, fctrl)
 
     '''
 ## FOptsLen, FOpts, FPort, FRMPayload
@@ -1028,167 +1121,742 @@ encrypted and must not exceed the maximum FRMPayload length.
     #
     fopts_offset = 7  # the index of the FOpts start.
     offset = fopts_offset
-    fopts = None
-    ret["fport"] = None
-    if ret["foptslen"]:
-        offset += ret["foptslen"]
-        fopts = hex_data[fopts_offset:offset]
-        print("    FOpts         [x%s]" % ("".join(fopts)))
-        print("## MAC Command (No. CMD (CID DIR) [MSG])")
-        parse_mac_cmd(msg_dir, fopts)
-    rest_len = len(hex_data[offset:])
-    if rest_len:
-        ret["fport"] = int(hex_data[offset], 16)
-        print("    FPort       : %d [x%s]" %
-              (ret["fport"], hex_data[offset]))
-        offset += 1
-        rest_len -= 1
-        #
-        # if fport == 224, just output the data and end of processing.
-        #
-        if ret["fport"] == "224":
-            print("=== MAC Command test ===")
-            print("  x %s " % " ".join(hex_data[offset:]))
-            return
-        #
-        # decryption of the FRMPayload is needed.
-        #
-        dir_down = 0 if msg_dir == MSGDIR_UP else 1
-        fcnt_hex = xfcnt.rjust(4,"0") + hex(ret["fcnt"])[2:].rjust(4,"0")
-        frmpl_hex = "".join(hex_data[offset:])
-        if ret["fport"] == 0:
-            if ret["foptslen"]:
-                return error("MAC Command is in both FOpts and FRMPayload.")
-            print("=== MAC Command in FRMPayload ===")
-            print("  [x %s]" % frmpl_hex)
-            if f_verbose:
-                print("  ** Detail:")
-                print("    buf_hex = %s" % frmpl_hex)
-                print("    key_hex = %s" % nskey)
-                print("    devaddr = %s" % ret["devaddr"])
-                print("    dir_down = %d" % dir_down)
-                print("    fcnt = %s" % fcnt_hex)
-            if not nskey:
-                return error("nskey must be specified.")
-            m = LoRaMacPayloadEncrypt(frmpl_hex, nskey,
-                                      ret["devaddr"], dir_down, fcnt_hex)
-            m = binascii.b2a_hex(m)
-            print("  Decrypted: [x %s]" % m)
-            parse_mac_cmd(msg_dir, hexstr2array(m))
-            return
-        #
-        parse_frm_payload(frmpl_hex, askey, ret["devaddr"], dir_down, fcnt_hex)
-        return
-    #
-    return
+    fhdr = FHDR(devaddr, fctrl, fcnt)
+    mp = MACPayload(bytes(data), fhdr, fcnt32=(xfcnt << 16) | fcnt)
+    if fctrl.foptslen:
+        offset += fctrl.foptslen
+        fopts = data[fopts_offset:offset]
+        fhdr.fopts = bytes(fopts)
+        mp.mac_commands = call("mac_cmd", decode_mac_cmd, msg_dir, fopts)
+    if len(data) <= offset:
+        return mp
+    mp.fport = data[offset]
+    offset += 1
+    mp.frm_payload = bytes(data[offset:])
+    mp.frm_payload_plain = call("crypto", decrypt_frm_payload, msg_dir,
+                                mp.fport, fctrl.foptslen, mp.frm_payload,
+                                keys, devaddr, mp.fcnt32)
+    if mp.fport == 0 and mp.frm_payload_plain is not None:
+        mp.mac_commands = call("mac_cmd", decode_mac_cmd, msg_dir,
+                               mp.frm_payload_plain)
+    return mp
+
+'''
+FRMPayload decryption
 
+it returns the decrypted FRMPayload, or None if the key is not known
+or it is not to be decrypted.
+'''
+def decrypt_frm_payload(msg_dir, fport, foptslen, frm_payload, keys, devaddr,
+                        fcnt32):
+    #
+    # if fport == 224, it is not encrypted.
+    #
+    if fport == 224:
+        return None
+    if fport == 0:
+        if foptslen:
+            # MAC Command is in both FOpts and FRMPayload.
+            return None
+        key = keys.nskey
+    else:
+        key = keys.askey
+    if not key:
+        return None
+    dir_down = 0 if msg_dir == MSGDIR_UP else 1
+    return LoRaMacPayloadEncryptRaw(frm_payload, key, devaddr, dir_down,
+                                    fcnt32)
 
 '''
-JoinReq parser
+JoinReq decoder
 
       8    |   8    |    2
     AppEUI | DevEUI | DevNonce
 
 '''
-def parse_joinreq(hex_data):
-    appeui = hex_data[0:8][::-1]
-    deveui = hex_data[8:16][::-1]
-    devnonce = hex_data[16:18]  # XXX little endian ?
-    print("  AppEUI        (x%s): %s" % ("".join(appeui[::-1]),
-                                         "".join(appeui)))
-    print("  DevEUI        (x%s): %s" % ("".join(deveui[::-1]),
-                                         "".join(deveui)))
-    print("  DevNonce      (x%s): %s" % ("".join(devnonce),
-                                         "".join(devnonce[::-1])))
+def decode_joinreq(data):
+    return JoinRequest(*JOINREQ_STRUCT.unpack_from(data))
 
 '''
-JoinAccept parser
+CFList decoder
 
-        3    |   3   |    4    |     1      |    1    |  (16)
-    AppNonce | NetID | DevAddr | DLSettings | RxDelay | (CFList)
+    CFListType 0: 5 frequencies of 3 bytes each.
+    CFListType 1: 5 ChMask of 2 bytes each.
+'''
+def decode_cflist(data):
+    cflist_type = data[15]
+    if cflist_type == 0:
+        return {
+            "CFListType": cflist_type,
+            "Freq": [decode_maccmd_Frequency(data[i:i+3])
+                     for i in range(0, 15, 3)],
+            }
+    elif cflist_type == 1:
+        return {
+            "CFListType": cflist_type,
+            "ChMask": [data[i] | (data[i+1] << 8) for i in range(0, 10, 2)],
+            }
+    return { "CFListType": cflist_type }
 
 '''
-def parse_joinaccept(hex_data, akey_hex, major=0):
-    # XXX endian check is not yet ?
-    if f_verbose:
-        print("  ** Detail:")
-        print("    hex_data = %s" % hex_data)
-        print("    akey_hex = %s" % akey_hex)
-        print("    major = %d" % major)
-    if not akey_hex:
-        return error("akey must be specified.")
-    m = lorawan_encrypt(binascii.a2b_hex(akey_hex),
-                        binascii.a2b_hex("".join(hex_data)))
-    m = binascii.b2a_hex(m)
-    print("  Decrypted: [x %s]" % m)
-    appnonce = hex_data[0:3]
-    netid = hex_data[3:6]
-    devaddr = hex_data[6:10]
-    DLSettings = hex_data[10]
-    RxDelay = hex_data[11]
-    print("  AppNonce      : x%s" % ("".join(appnonce)))
-    print("  NetID         : x%s" % ("".join(netid)))
-    print("  DevAddr       : x%s" % ("".join(devaddr)))
-    print("  DLSettings    : x%s" % (DLSettings))
-    print("  RxDelay       : x%s" % (RxDelay))
-    print("WARNING: not all implemented yet.")
+JoinAccept decoder
 
+    data: the payload and the MIC, i.e. PHYPayload without MHDR.
+    mhdr: the MHDR in bytes to compute the MIC.
+
+        3    |   3   |    4    |     1      |    1    |  (16)    |  4
+    AppNonce | NetID | DevAddr | DLSettings | RxDelay | (CFList) | MIC
+
+The payload and the MIC are encrypted together by aes128_decrypt(),
+therefore decrypted by aes128_encrypt().
 '''
-PHYPayload parser
+def decode_joinaccept(data, keys, mhdr=b"\x20"):
+    ja = JoinAccept(bytes(data))
+    if not keys.akey:
+        return ja
+    ja.decrypted = lorawan_encrypt(keys.akey, ja.encrypted)[:len(data)]
+    plain = ja.decrypted[:-MIC_LEN]
+    ja.mic = ja.decrypted[-MIC_LEN:]
+    if len(plain) < JOINACCEPT_LEN:
+        ja.mic_ok = False
+        return ja
+    ja.appnonce = int.from_bytes(plain[0:3], "little")
+    ja.netid = int.from_bytes(plain[3:6], "little")
+    ja.devaddr = DEVADDR_STRUCT.unpack_from(plain, 6)[0]
+    ja.dlsettings = plain[10]
+    ja.rxdelay = plain[11]
+    if len(plain) >= JOINACCEPT_LEN + CFLIST_LEN:
+        ja.cflist = decode_cflist(plain[JOINACCEPT_LEN:])
+    ja.mic_ok = lorawan_mic_joinaccept(keys.akey, mhdr + plain) == ja.mic
+    return ja
+
+'''
+PHYPayload decoder
 
-    phypayload: a hex string.
+    data: the PHYPayload in bytes.
+    keys: Keys, or None if no key is known.
+        or a keystore which has lookup(devaddr) and default.
+        the keys and xfcnt of the data frames are taken from the session
+        of the DevAddr, and the default is used for others.
+    xfcnt: the most significant 16-bit of the FCnt in integer.
 
       1  |    1...M   |  4
     MHDR | MACPayload | MIC
     MHDR |   JoinReq  | MIC
     MHDR |   JoinRes  | MIC
+
+    verify_mic: set Frame.mic_ok if True.
+    fcnt_tracker: FCntTracker to infer the upper 16-bit of the FCnt
+        of the data frames instead of xfcnt.  xfcnt is used for the device
+        not seen yet.  the tracker is updated by the frame.
+    stats: Stats to add the time of mac_cmd, crypto and mic into.
+
+It returns a Frame, and never prints anything.
 '''
-def parse_phy_payload(hexstr, nskey=None, askey=None, akey=None, xfcnt=""):
-    hex_data = hexstr2array(hexstr)
-    print("=== PHYPayload ===")
-    print("[x %s]" % " ".join(hex_data))
+def decode_phy_payload(data, keys=None, xfcnt=0, verify_mic=False,
+                       fcnt_tracker=None, stats=None):
+    call = stats.call if stats is not None else _nocall
+    keystore = None
+    if keys is None:
+        keys = Keys()
+    elif hasattr(keys, "lookup"):
+        keystore = keys
+        keys = keystore.default
+    if len(data) < 1 + MIC_LEN:
+        raise ValueError("ERROR: too short PHYPayload, %d bytes." % len(data))
+    view = memoryview(data)
     # payload: i.e. MACPayload, Join Req, JoinRes
-    payload_len = len(hex_data) - MIC_LEN
-    payload = hex_data[1:payload_len]
-    mic = hex_data[-MIC_LEN:]
+    payload_len = len(data) - MIC_LEN
+    payload = view[1:payload_len]
+    mic = bytes(view[payload_len:])
     #
-    mtype = parse_mhdr(hex_data)
+    mhdr = decode_mhdr(data[0])
     #
     msg_dir = MSGDIR_UP
-    if mtype in [ "000", "011", "101" ]:
+    if mhdr.mtype in [ MTYPE_JOIN_ACCEPT, MTYPE_UNCONFIRMED_DATA_DOWN,
+                       MTYPE_CONFIRMED_DATA_DOWN ]:
         msg_dir = MSGDIR_DOWN
     #
-    if mtype == "000":
-        print("## JoinReq")
-        parse_joinreq(payload)
-    elif mtype == "001":
-        print("## JoinAccept")
-        parse_joinaccept(payload, akey)
+    if mhdr.mtype == MTYPE_JOIN_REQUEST:
+        payload = decode_joinreq(payload)
+    elif mhdr.mtype == MTYPE_JOIN_ACCEPT:
+        payload = call("crypto", decode_joinaccept, view[1:], keys,
+                       bytes(view[:1]))
     else:
-        print("## MACPayload")
-        if opt.debug_level > 0:
-            parse_mac_payload(msg_dir, payload, nskey, askey, xfcnt)
+        if keystore is not None and len(payload) >= DEVADDR_STRUCT.size:
+            keys, xfcnt = lookup_session(keystore,
+                                         DEVADDR_STRUCT.unpack_from(payload)[0],
+                                         xfcnt)
+        if fcnt_tracker is not None and len(payload) >= 7:
+            xfcnt = track_fcnt(fcnt_tracker, data, msg_dir, keys, xfcnt)
+        payload = decode_mac_payload(msg_dir, payload, keys, xfcnt, stats)
+    frame = Frame(bytes(data), mhdr, msg_dir, payload, mic, keys)
+    if verify_mic:
+        frame.mic_ok = call("mic", verify_frame_mic, frame)
+    return frame
+
+'''
+return the keys and xfcnt of the DevAddr in the keystore,
+or the default and the xfcnt given if not found.
+'''
+def lookup_session(keystore, devaddr, xfcnt):
+    session = keystore.lookup(devaddr)
+    if session is None:
+        return keystore.default, xfcnt
+    return session, session.xfcnt
+
+'''
+infer the 32-bit FCnt of the data frame with the FCntTracker,
+and return the upper 16-bit of it.
+if the tracker uses the MIC and nskey is known, the first candidate of
+which MIC matches is taken, and the tracker is updated only in that case.
+'''
+def track_fcnt(tracker, data, msg_dir, keys, xfcnt):
+    devaddr, fcnt = DEVADDR_FCNT_STRUCT.unpack_from(data, 1)
+    dir_down = 0 if msg_dir == MSGDIR_UP else 1
+    if not (tracker.use_mic and keys.nskey):
+        fcnt32 = tracker.infer(devaddr, dir_down, fcnt, xfcnt)
+        tracker.update(devaddr, dir_down, fcnt32)
+        return fcnt32 >> 16
+    msg = bytes(data[:-MIC_LEN])
+    mic = bytes(data[-MIC_LEN:])
+    candidates = tracker.candidates(devaddr, dir_down, fcnt, xfcnt)
+    for fcnt32 in candidates:
+        if lorawan_mic_data(keys.nskey, msg, devaddr, dir_down,
+                            fcnt32) == mic:
+            tracker.update(devaddr, dir_down, fcnt32)
+            return fcnt32 >> 16
+    return candidates[0] >> 16
+
+'''
+return the keys and the upper 16-bit of the FCnt of the data frame,
+same as decode_phy_payload() takes them from the keys and the tracker.
+the tracker is updated by the frame.
+'''
+def track_session(tracker, data, keys, xfcnt):
+    if keys is None:
+        keys = Keys()
+    elif hasattr(keys, "lookup"):
+        keys, xfcnt = lookup_session(keys,
+                                     DEVADDR_STRUCT.unpack_from(data, 1)[0],
+                                     xfcnt)
+    msg_dir = MSGDIR_UP
+    if data[0] >> 5 in [ MTYPE_UNCONFIRMED_DATA_DOWN,
+                         MTYPE_CONFIRMED_DATA_DOWN ]:
+        msg_dir = MSGDIR_DOWN
+    return keys, track_fcnt(tracker, data, msg_dir, keys, xfcnt)
+
+'''
+decode each frame in bytes from the iterable, and yield the Frame.
+    session_deriver: SessionDeriver fed with each Frame.
+        keys should be its keystore.
+    with_meta: each item is (meta, frame in bytes), and the meta is set
+        into Frame.meta.
+    stats: Stats to count the frames and the errors, and to time the stages.
+        the time to get each item from frames is added into read.
+    cache: DecodeCache to return the Frame of the same data frame decoded
+        before, without decoding it again.  fcnt_tracker and
+        session_deriver are run for the Frame returned by the cache as well.
+'''
+def decode_stream(frames, keys=None, xfcnt=0, verify_mic=False,
+                  fcnt_tracker=None, session_deriver=None, with_meta=False,
+                  stats=None, cache=None):
+    meta = None
+    cache_key = None
+    if stats is not None:
+        frames = stats.iter("read", frames)
+    for data in frames:
+        if with_meta:
+            meta, data = data
+        if stats is not None:
+            t0 = stats.clock()
+        frame = None
+        # True for a hit, False for a miss, None if it is not cached.
+        cached = None
+        frame_keys, frame_xfcnt, tracker = keys, xfcnt, fcnt_tracker
+        try:
+            if cache is not None:
+                cache_key = cache.make_key(data, keys, xfcnt)
+                if cache_key is not None and tracker is not None:
+                    # the tracker is updated by a hit as well, and the upper
+                    # 16-bit of the FCnt inferred by it is a part of the key.
+                    frame_keys, frame_xfcnt = track_session(tracker, data,
+                                                            keys, xfcnt)
+                    tracker = None
+                    cache_key = cache.make_key(data, frame_keys, frame_xfcnt)
+                if cache_key is not None:
+                    frame = cache.get(cache_key)
+                    cached = frame is not None
+            if frame is None:
+                frame = decode_phy_payload(data, keys=frame_keys,
+                                           xfcnt=frame_xfcnt,
+                                           verify_mic=verify_mic,
+                                           fcnt_tracker=tracker, stats=stats)
+        except Exception as e:
+            if stats is not None:
+                stats.error(e)
+            raise
+        if cached is False:
+            cache.put(cache_key, frame)
+        frame.meta = meta
+        if session_deriver is not None:
+            session_deriver.feed(frame)
+        if stats is not None:
+            stats.add_frame(frame, stats.clock() - t0, cached)
+        yield frame
+
+'''
+MIC verifier
+
+it returns True or False,
+or None if the key is not known or the MType has no MIC defined.
+the data frames are verified with nskey as NwkSKey of v1.0.
+the join frames are verified with akey.
+'''
+def verify_frame_mic(frame):
+    keys = frame.keys
+    mtype = frame.mhdr.mtype
+    msg = frame.raw[:-MIC_LEN]
+    if mtype == MTYPE_JOIN_REQUEST:
+        if not keys.akey:
+            return None
+        return lorawan_mic_joinreq(keys.akey, msg) == frame.mic
+    elif mtype == MTYPE_JOIN_ACCEPT:
+        # the MIC is encrypted together, and verified in decoding.
+        return frame.payload.mic_ok
+    elif mtype == MTYPE_PROPRIETARY:
+        return None
+    if not keys.nskey:
+        return None
+    dir_down = 0 if frame.msg_dir == MSGDIR_UP else 1
+    mp = frame.payload
+    return lorawan_mic_data(keys.nskey, msg, mp.fhdr.devaddr, dir_down,
+                            mp.fcnt32) == frame.mic
+
+'''
+verify the MIC of each Frame, and return the list of the results.
+'''
+def verify_frame_mic_batch(frames):
+    return [verify_frame_mic(frame) for frame in frames]
+
+_UNSET = object()
+
+class FrameView(object):
+    '''
+    a lazy view of the PHYPayload.
+
+    MHDR, FHDR, FPort and MIC are read from the raw bytes when accessed.
+    mac_commands, frm_payload_plain, mic_ok and frame, i.e. the Frame fully
+    decoded, are computed when accessed first, and memoized.
+        raw: the PHYPayload in bytes.
+        keys: Keys, or a keystore, or None.  same as decode_phy_payload().
+        xfcnt: the most significant 16-bit of the FCnt in integer.
+
+    the header of the data frames is checked in the constructor,
+    the rest is not validated until it is decoded.
+    '''
+    __slots__ = ("raw", "_keys", "_xfcnt", "_mac_commands", "_plain",
+                 "_mic_ok", "_frame")
+
+    def __init__(self, raw, keys=None, xfcnt=0):
+        if len(raw) < 1 + MIC_LEN:
+            raise ValueError("ERROR: too short PHYPayload, %d bytes." %
+                             len(raw))
+        self.raw = raw
+        self._keys = keys
+        self._xfcnt = xfcnt
+        self._mac_commands = _UNSET
+        self._plain = _UNSET
+        self._mic_ok = _UNSET
+        self._frame = None
+        if self.is_data and len(raw) < 1 + 7 + MIC_LEN:
+            raise ValueError("ERROR: too short MACPayload, %d bytes." %
+                             len(raw))
+
+    @property
+    def mtype(self):
+        return self.raw[0] >> 5
+
+    @property
+    def major(self):
+        return self.raw[0] & 0x03
+
+    @property
+    def is_data(self):
+        return MTYPE_UNCONFIRMED_DATA_UP <= self.raw[0] >> 5 <= \
+                MTYPE_CONFIRMED_DATA_DOWN
+
+    @property
+    def msg_dir(self):
+        if self.raw[0] >> 5 in (MTYPE_JOIN_ACCEPT, MTYPE_UNCONFIRMED_DATA_DOWN,
+                                MTYPE_CONFIRMED_DATA_DOWN):
+            return MSGDIR_DOWN
+        return MSGDIR_UP
+
+    @property
+    def mic(self):
+        return self.raw[-MIC_LEN:]
+
+    #
+    # the data frames.  None for the others.
+    #
+    @property
+    def devaddr(self):
+        if not self.is_data:
+            return None
+        return DEVADDR_STRUCT.unpack_from(self.raw, 1)[0]
+
+    @property
+    def fctrl(self):
+        return self.raw[5] if self.is_data else None
+
+    @property
+    def foptslen(self):
+        return self.raw[5] & 0x0f if self.is_data else None
+
+    @property
+    def fcnt(self):
+        if not self.is_data:
+            return None
+        return self.raw[6] | (self.raw[7] << 8)
+
+    @property
+    def fopts(self):
+        if not self.is_data:
+            return None
+        return self.raw[8:8 + (self.raw[5] & 0x0f)] or None
+
+    @property
+    def fport(self):
+        if not self.is_data:
+            return None
+        offset = 8 + (self.raw[5] & 0x0f)
+        if len(self.raw) - MIC_LEN <= offset:
+            return None
+        return self.raw[offset]
+
+    @property
+    def frm_payload(self):
+        if self.fport is None:
+            return None
+        return self.raw[9 + (self.raw[5] & 0x0f):-MIC_LEN]
+
+    @property
+    def keys(self):
+        '''
+        the keys resolved from the keystore if any.
+        '''
+        self.resolve()
+        return self._keys
+
+    @property
+    def fcnt32(self):
+        if not self.is_data:
+            return None
+        self.resolve()
+        return (self._xfcnt << 16) | self.fcnt
+
+    def resolve(self):
+        keys = self._keys
+        if keys is None:
+            self._keys = Keys()
+        elif hasattr(keys, "lookup"):
+            if self.is_data:
+                self._keys, self._xfcnt = lookup_session(keys, self.devaddr,
+                                                         self._xfcnt)
+            else:
+                self._keys = keys.default
+
+    @property
+    def frm_payload_plain(self):
+        if self._plain is _UNSET:
+            fport = self.fport
+            if fport is None:
+                self._plain = None
+            else:
+                self._plain = decrypt_frm_payload(
+                        self.msg_dir, fport, self.foptslen, self.frm_payload,
+                        self.keys, self.devaddr, self.fcnt32)
+        return self._plain
+
+    @property
+    def mac_commands(self):
+        if self._mac_commands is _UNSET:
+            if not self.is_data:
+                self._mac_commands = None
+            elif self.foptslen:
+                self._mac_commands = decode_mac_cmd(self.msg_dir, self.fopts)
+            elif self.fport == 0 and self.frm_payload_plain is not None:
+                self._mac_commands = decode_mac_cmd(self.msg_dir,
+                                                    self.frm_payload_plain)
+            else:
+                self._mac_commands = None
+        return self._mac_commands
+
+    @property
+    def mic_ok(self):
+        if self._mic_ok is _UNSET:
+            if self.is_data:
+                keys = self.keys
+                if not keys.nskey:
+                    self._mic_ok = None
+                else:
+                    dir_down = 0 if self.msg_dir == MSGDIR_UP else 1
+                    self._mic_ok = lorawan_mic_data(
+                            keys.nskey, self.raw[:-MIC_LEN], self.devaddr,
+                            dir_down, self.fcnt32) == self.mic
+            else:
+                self._mic_ok = verify_frame_mic(self.frame)
+        return self._mic_ok
+
+    @property
+    def frame(self):
+        '''
+        the Frame by decode_phy_payload().
+        '''
+        if self._frame is None:
+            self._frame = decode_phy_payload(self.raw, self.keys, self._xfcnt)
+        return self._frame
+
+'''
+yield the FrameView of each frame in bytes from the iterable.
+'''
+def view_stream(frames, keys=None, xfcnt=0):
+    for data in frames:
+        yield FrameView(data, keys=keys, xfcnt=xfcnt)
+
+'''
+Text renderer
+
+it prints the Frame returned by decode_phy_payload().
+'''
+def print_mac_cmd(msg_dir, mac_commands, out=None):
+    for n_maccmd, c in enumerate(mac_commands, 1):
+        if c.name is None:
+            print("ERROR: Proprietary MAC command [%02x] has been found." %
+                  c.cid, file=out)
+            # just stop to parse all.
+            return
+        if not c.raw:
+            print("  %02d. %s (x%02x %slink)" % (n_maccmd, c.name,
+                                                 c.cid, msg_dir), file=out)
         else:
-            try:
-                parse_mac_payload(msg_dir, payload, nskey, askey, xfcnt)
-            except Exception as e:
-                print("Abort.")
-                print(e)
-                exit(1)
+            print("  %02d. %s (x%02x %slink) [%s]" % (
+                    n_maccmd, c.name, c.cid, msg_dir, bytes2hex(c.raw)),
+                  file=out)
+        if c.fields is None:
+            print("ERROR: MAC command [%02x] is truncated." % c.cid, file=out)
+            return
+        mac_cmd_desc[msg_dir][c.cid].printer(c.fields, out)
+
+def print_mhdr(mhdr, out=None):
+    mhdr_bin = int2bin(mhdr.raw)
+    print("## MHDR           [x%02x] [b%s]" % (mhdr.raw, mhdr_bin), file=out)
+    print("  MType         : %s [b%s]" % (get_mtype_cmd(mhdr.mtype),
+                                          mhdr_bin[0:3]), file=out)
+    print("  RFU           : [b%s]" % mhdr_bin[3:6], file=out)
+    print("  Major         : %s [b%s]" % (get_major(mhdr.major),
+                                          mhdr_bin[6:]), file=out)
+
+def print_key_detail(name, key, out=None):
+    print("    %s = %s" % (name, bytes2hex(key) if key else None), file=out)
+
+def print_frm_payload(mp, dir_down, keys, out=None):
+    print("## FRMPayload   : [x%s]" % bytes2hex(mp.frm_payload), file=out)
+    if f_verbose:
+        print("  ** Detail:", file=out)
+        print("    hex_data = %s" % bytes2hex(mp.frm_payload), file=out)
+        print_key_detail("askey", keys.askey, out)
+        print("    devaddr = %08x" % mp.fhdr.devaddr, file=out)
+        print("    dir_down = %d" % dir_down, file=out)
+        print("    fcnt = %08x" % mp.fcnt32, file=out)
+    if mp.frm_payload_plain is None:
+        return error("askey must be specified.", out)
+    print("  x %s" % bytes2hex(mp.frm_payload_plain, " "), file=out)
+
+def print_mac_payload(msg_dir, mp, keys, out=None):
+    fhdr = mp.fhdr
+    fctrl = fhdr.fctrl
+    fctrl_bin = int2bin(fctrl.raw)
+    print("  FHDR            [x%s]" % bytes2hex(mp.raw), file=out)
+    print("    DevAddr     : %08x [x%s]" % (fhdr.devaddr,
+                                            bytes2hex(mp.raw[:4])), file=out)
+    print("    FCtrl       : [x%02x] [b%s]" % (fctrl.raw, fctrl_bin), file=out)
+    print("      ADR       : %d" % fctrl.adr, file=out)
+    if msg_dir == MSGDIR_DOWN:
+        print("      RFU       : %d" % fctrl.rfu, file=out)
+        print("      ACK       : %d" % fctrl.ack, file=out)
+        print("      FPending  : %d" % fctrl.fpending, file=out)
+    else:
+        print("      ADRACKReq : %d" % fctrl.adrackreq, file=out)
+        print("      ACK       : %d" % fctrl.ack, file=out)
+        print("      RFU/ClsB  : %d" % fctrl.classb, file=out)
+    print("      FOptsLen  : %d [b%s]" % (fctrl.foptslen, fctrl_bin[4:]),
+          file=out)
+    print("    FCnt        : %d [x%s]" % (fhdr.fcnt, bytes2hex(mp.raw[5:7])),
+          file=out)
+    if fhdr.fopts:
+        print("    FOpts         [x%s]" % bytes2hex(fhdr.fopts), file=out)
+        print("## MAC Command (No. CMD (CID DIR) [MSG])", file=out)
+        print_mac_cmd(msg_dir, mp.mac_commands, out)
+    if mp.fport is None:
+        return
+    print("    FPort       : %d [x%02x]" % (mp.fport, mp.fport), file=out)
+    #
+    # if fport == 224, just output the data and end of processing.
     #
-    print("## MIC          : %s" % ("".join(mic))) # XXX endian ?
+    if mp.fport == 224:
+        print("=== MAC Command test ===", file=out)
+        print("  x %s " % bytes2hex(mp.frm_payload, " "), file=out)
+        return
+    dir_down = 0 if msg_dir == MSGDIR_UP else 1
+    if mp.fport == 0:
+        if fctrl.foptslen:
+            return error("MAC Command is in both FOpts and FRMPayload.", out)
+        print("=== MAC Command in FRMPayload ===", file=out)
+        print("  [x %s]" % bytes2hex(mp.frm_payload), file=out)
+        if f_verbose:
+            print("  ** Detail:", file=out)
+            print("    buf_hex = %s" % bytes2hex(mp.frm_payload), file=out)
+            print_key_detail("key_hex", keys.nskey, out)
+            print("    devaddr = %08x" % fhdr.devaddr, file=out)
+            print("    dir_down = %d" % dir_down, file=out)
+            print("    fcnt = %08x" % mp.fcnt32, file=out)
+        if mp.frm_payload_plain is None:
+            return error("nskey must be specified.", out)
+        print("  Decrypted: [x %s]" % bytes2hex(mp.frm_payload_plain),
+              file=out)
+        print_mac_cmd(msg_dir, mp.mac_commands, out)
+        return
+    #
+    print_frm_payload(mp, dir_down, keys, out)
+
+def print_joinreq(jr, out=None):
+    print("  AppEUI        (x%s): %016x" % (
+            bytes2hex(JOINREQ_STRUCT.pack(jr.appeui, 0, 0)[:8]), jr.appeui),
+          file=out)
+    print("  DevEUI        (x%s): %016x" % (
+            bytes2hex(JOINREQ_STRUCT.pack(0, jr.deveui, 0)[8:16]), jr.deveui),
+          file=out)
+    print("  DevNonce      (x%s): %04x" % (
+            bytes2hex(JOINREQ_STRUCT.pack(0, 0, jr.devnonce)[16:]),
+            jr.devnonce), file=out)
+
+def print_joinaccept(ja, keys, major, out=None):
+    if f_verbose:
+        print("  ** Detail:", file=out)
+        print_key_detail("akey_hex", keys.akey, out)
+        print("    major = %d" % major, file=out)
+    if ja.decrypted is None:
+        return error("akey must be specified.", out)
+    print("  Decrypted: [x %s]" % bytes2hex(ja.decrypted), file=out)
+    if ja.appnonce is None:
+        return error("too short JoinAccept, %d bytes." % len(ja.encrypted),
+                     out)
+    print("  AppNonce      : %06x [x%s]" % (ja.appnonce,
+                                           bytes2hex(ja.decrypted[0:3])),
+          file=out)
+    print("  NetID         : %06x [x%s]" % (ja.netid,
+                                           bytes2hex(ja.decrypted[3:6])),
+          file=out)
+    print("  DevAddr       : %08x [x%s]" % (ja.devaddr,
+                                           bytes2hex(ja.decrypted[6:10])),
+          file=out)
+    print("  DLSettings    : [x%02x] [b%s]" % (ja.dlsettings,
+                                               int2bin(ja.dlsettings)),
+          file=out)
+    print("    OptNeg      : %d" % (ja.dlsettings >> 7), file=out)
+    print("    RX1DRoffset : %d" % ((ja.dlsettings >> 4) & 0x07), file=out)
+    print("    RX2DataRate : %d" % (ja.dlsettings & 0x0f), file=out)
+    print("  RxDelay       : %d [x%02x]" % (ja.rxdelay & 0x0f, ja.rxdelay),
+          file=out)
+    if ja.cflist is not None:
+        print("  CFList        : [x %s]" % bytes2hex(
+                ja.decrypted[JOINACCEPT_LEN:JOINACCEPT_LEN+CFLIST_LEN], " "),
+              file=out)
+        print("    CFListType  : %d" % ja.cflist["CFListType"], file=out)
+        for freq in ja.cflist.get("Freq", []):
+            print_maccmd_Frequency(freq, out)
+        for chmask in ja.cflist.get("ChMask", []):
+            print("    ChMask : [b%s]" % int2bin(chmask, 16), file=out)
+    print("  MIC           : %s %s" % (bytes2hex(ja.mic),
+                                      "(OK)" if ja.mic_ok else "(NG)"),
+          file=out)
+
+def print_meta(meta, out=None):
+    print("## Radio        : %s" % " ".join(["%s=%s" % (k, v) for k, v in
+                                             meta.to_dict().items()
+                                             if v is not None]), file=out)
+
+def print_frame(frame, out=None):
+    print("=== PHYPayload ===", file=out)
+    print("[x %s]" % bytes2hex(frame.raw, " "), file=out)
+    if isinstance(frame.meta, list):
+        for meta in frame.meta:
+            if meta is not None:
+                print_meta(meta, out)
+    elif frame.meta is not None:
+        print_meta(frame.meta, out)
+    print_mhdr(frame.mhdr, out)
+    if frame.mhdr.mtype == MTYPE_JOIN_REQUEST:
+        print("## JoinReq", file=out)
+        print_joinreq(frame.payload, out)
+    elif frame.mhdr.mtype == MTYPE_JOIN_ACCEPT:
+        print("## JoinAccept", file=out)
+        print_joinaccept(frame.payload, frame.keys, frame.mhdr.major, out)
+    else:
+        print("## MACPayload", file=out)
+        print_mac_payload(frame.msg_dir, frame.payload, frame.keys, out)
+    #
+    if frame.mic_ok is None:
+        mic_status = ""
+    else:
+        mic_status = " (OK)" if frame.mic_ok else " (NG)"
+    print("## MIC          : %s%s" % (bytes2hex(frame.mic), mic_status),
+          file=out) # XXX endian ?
+
+'''
+return the function to render a Frame in the format, "text" or "ndjson".
+'''
+def get_renderer(fmt):
+    if fmt == "ndjson":
+        from lorawan_json import print_frame_json
+        return print_frame_json
+    return print_frame
+
+'''
+PHYPayload parser
 
-def str2hexstr(buf):
-    # in case like "a4.9.0.19"
-    if "." in buf:
-        return "".join([i.rjust(2,"0") for i in buf.split(".")])
-    # others
-    return re.sub(r"([,\s\n]|0x)", "", buf)
+    hexstr: a hex string.
+    nskey, askey, akey: keys in hex string.
+    xfcnt: the most significant 16-bit of the FCnt in hex string.
+    debug_level: raise the error if more than 0.
 
-def hexstr2array(hexstr):
-    return [ hexstr[i:i+2] for i in range(0,len(hexstr),2) ]
+It decodes the hex string and prints the result.
+It prints the error and exits if it fails to decode.
+'''
+def parse_phy_payload(hexstr, nskey=None, askey=None, akey=None, xfcnt="",
+                      debug_level=0):
+    try:
+        frame = decode_phy_payload(binascii.a2b_hex(hexstr),
+                                   keys=hex2keys(nskey, askey, akey),
+                                   xfcnt=int(xfcnt or "0", 16))
+        print_frame(frame)
+    except Exception as e:
+        if debug_level > 0:
+            raise
+        print("Abort.")
+        print(e)
+        exit(1)
+
+'''
+keys in hex string into Keys.
+'''
+def hex2keys(nskey=None, askey=None, akey=None):
+    return Keys(*[binascii.a2b_hex(k) if k else None
+                  for k in (nskey, askey, akey)])
 
-def test_regress():
+def test_regress(debug_level=0):
     v = [
         "402105810080160102a6bf4432169ea0784416868d9420dd244619443e",
         "40C1D25201A5050003070703120864FE226A9E",
@@ -1199,15 +1867,51 @@ def test_regress():
         "66.8c.cc.57.8a.a4.a4.9.0.19.14.10.0.8.0.0.a0.ad.ba.0.0.0.7.0.b.81.b0.bf.b6.d9.f1.ca.44.b4.7c.2c"
         ]
     for d in v:
-        parse_phy_payload(str2hexstr(d))
+        parse_phy_payload(str2hexstr(d), debug_level=debug_level)
     exit(1)
 
 def parse_args():
+    import argparse
     p = argparse.ArgumentParser(description="""
         LoRaWAN frame parser.
         You can use stdin to pass the hex string if the HEX_STR is '-'.""")
     p.add_argument("hex_str", metavar="HEX_STR", type=str, nargs='*',
         help="a series or multiple of hex string.")
+    p.add_argument("-f", action="store", dest="input_file",
+        help="specify the file containing the hex strings, one per line.")
+    p.add_argument("--input-format", action="store", dest="input_format",
+        default="hex", choices=["hex", "binary", "pcap", "semtech"],
+        help="specify the format of the file of -f.  binary is the frames "
+        "prefixed by 2 bytes of the length in big endian.  pcap is pcap or "
+        "pcapng of LoRaTap or the Semtech UDP packet forwarder.  "
+        "semtech is the JSON of the packet forwarder, i.e. rxpk or txpk, "
+        "which can be also from the stdin.")
+    p.add_argument("--jobs", action="store", dest="jobs", type=int, default=1,
+        help="specify the number of processes to decode the file of -f.")
+    p.add_argument("--unordered", action="store_true", dest="f_unordered",
+        help="output the result of --jobs as completed, "
+        "not in the input order.")
+    p.add_argument("--format", action="store", dest="format", default="text",
+        choices=["text", "ndjson"],
+        help="specify the output format.  ndjson is one JSON per frame.")
+    p.add_argument("--export", action="store", dest="export",
+        help="write the frames decoded into the columnar file instead of "
+        "the output, .parquet, .arrow or .csv.  Parquet and Arrow require "
+        "pyarrow, otherwise the CSV is written.")
+    p.add_argument("--filter", action="store", dest="filter",
+        help="select the frames by the header before decoding, "
+        "e.g. devaddr=49be7df1|01020304,mtype=2,fport=1.  "
+        "the keys are devaddr, mtype, fport and deveui.")
+    p.add_argument("--verify-mic", action="store_true", dest="f_verify_mic",
+        help="verify the MIC with --nskey, or --akey for the join frames.")
+    p.add_argument("--cache", action="store", dest="cache_size", type=int,
+        default=0,
+        help="specify the number of the data frames decoded to be kept, "
+        "so that the same frame is not decoded again.")
+    p.add_argument("--dedup", action="store", dest="dedup", type=int,
+        default=0,
+        help="collapse the same frames within the number of the frames "
+        "into one, keeping the radio metadata of each.")
     p.add_argument("-b", action="store", dest="beacon_rfu", default=2,
         help="specify the number of bytes of the RFU in the beacon.")
     p.add_argument("--nskey", action="store", dest="nskey", default="",
@@ -1216,8 +1920,29 @@ def parse_args():
         help="specify AppSKey.")
     p.add_argument("--akey", action="store", dest="akey", default="",
         help="specify AppKey.")
+    p.add_argument("--keystore", action="store", dest="keystore",
+        help="specify the file of the keys per DevAddr, "
+        "CSV, JSON or SQLite.  the other keys are used for unknown DevAddr.")
     p.add_argument("--xfcnt", action="store", dest="xfcnt", default="0000",
         help="specify the most significant 16-bit of the FCnt in hex.")
+    p.add_argument("--derive-keys", action="store_true", dest="f_derive_keys",
+        help="derive the session keys by --akey from the Join Request and "
+        "the Join Accept, and use them for the frames after that.")
+    p.add_argument("--track-fcnt", action="store_true", dest="f_track_fcnt",
+        help="infer the most significant 16-bit of the FCnt per DevAddr "
+        "from the FCnt seen before.  --xfcnt is used for a new DevAddr.  "
+        "the MIC is used to choose it if --verify-mic is specified.")
+    p.add_argument("--max-fcnt-gap", action="store", dest="max_fcnt_gap",
+        type=int, default=16384,
+        help="specify the max gap of the FCnt for --track-fcnt.")
+    p.add_argument("--fcnt-state", action="store", dest="fcnt_state",
+        help="specify the file to load and save the state of --track-fcnt.")
+    p.add_argument("--stats", action="store_true", dest="f_stats",
+        help="show the time of each stage and the counters of the frames "
+        "into the stderr at exit.")
+    p.add_argument("--stats-interval", action="store", dest="stats_interval",
+        type=float,
+        help="show a line of the stats into the stderr every the seconds.")
     p.add_argument("-i", action="store_true", dest="f_ignore_error",
         help="ignore error. keep processing if any error happen")
     p.add_argument("-v", action="store_true", dest="f_verbose", default=False,
@@ -1228,44 +1953,179 @@ def parse_args():
     args.debug_level = len(args._f_debug)
     return args
 
-
-opt = parse_args()
-global f_verbose
-global f_ignore_error
-f_verbose = opt.f_verbose
-f_ignore_error = opt.f_ignore_error
-#
-hex_str = str2hexstr("".join(opt.hex_str))
-#
-if hex_str == "test":
-    test_regress()
-    exit(1)
-#
-nskey_hex = None
-if opt.nskey:
-    nskey_hex = str2hexstr(opt.nskey)
-else:
-    nskey_hex = os.getenv("LORAWAN_NSKEY")
-#
-askey_hex = None
-if opt.askey:
-    askey_hex = str2hexstr(opt.askey)
-else:
-    askey_hex = os.getenv("LORAWAN_ASKEY")
-#
-akey_hex = None
-if opt.akey:
-    akey_hex = str2hexstr(opt.akey)
-else:
-    akey_hex = os.getenv("LORAWAN_AKEY")
-#
-if hex_str == "-":
-    for i in sys.stdin:
-        parse_phy_payload(str2hexstr(i), nskey=nskey_hex,
-                            askey=askey_hex, akey=akey_hex, xfcnt=opt.xfcnt)
-    exit(1)
-else:
-    parse_phy_payload(hex_str,
-                        nskey=nskey_hex, askey=askey_hex, akey=akey_hex,
-                        xfcnt=opt.xfcnt)
-
+def main():
+    global f_verbose
+    global f_ignore_error
+    opt = parse_args()
+    f_verbose = opt.f_verbose
+    f_ignore_error = opt.f_ignore_error
+    #
+    hex_str = str2hexstr("".join(opt.hex_str))
+    #
+    if hex_str == "test":
+        test_regress(opt.debug_level)
+        exit(1)
+    #
+    nskey_hex = None
+    if opt.nskey:
+        nskey_hex = str2hexstr(opt.nskey)
+    else:
+        nskey_hex = os.getenv("LORAWAN_NSKEY")
+    #
+    askey_hex = None
+    if opt.askey:
+        askey_hex = str2hexstr(opt.askey)
+    else:
+        askey_hex = os.getenv("LORAWAN_ASKEY")
+    #
+    akey_hex = None
+    if opt.akey:
+        akey_hex = str2hexstr(opt.akey)
+    else:
+        akey_hex = os.getenv("LORAWAN_AKEY")
+    #
+    keys = hex2keys(nskey_hex, askey_hex, akey_hex)
+    xfcnt = int(opt.xfcnt or "0", 16)
+    if opt.keystore:
+        from lorawan_keystore import load_keystore, DeviceSession
+        keys = load_keystore(opt.keystore,
+                             default=DeviceSession(None, keys.nskey,
+                                                   keys.askey, keys.akey,
+                                                   xfcnt))
+    render = get_renderer(opt.format)
+    frame_filter = None
+    if opt.filter:
+        from lorawan_filter import parse_filter
+        try:
+            frame_filter = parse_filter(opt.filter)
+        except ValueError as e:
+            print(e)
+            exit(1)
+    fcnt_tracker = None
+    if opt.f_track_fcnt:
+        from lorawan_fcnt import FCntTracker
+        fcnt_tracker = FCntTracker(max_gap=opt.max_fcnt_gap,
+                                   use_mic=opt.f_verify_mic)
+        if opt.fcnt_state and os.path.exists(opt.fcnt_state):
+            fcnt_tracker.load(opt.fcnt_state)
+    session_deriver = None
+    if opt.f_derive_keys:
+        from lorawan_keystore import KeyStore, DeviceSession
+        from lorawan_session import SessionDeriver
+        if not hasattr(keys, "lookup"):
+            keys = KeyStore(default=DeviceSession(None, keys.nskey,
+                                                  keys.askey, keys.akey,
+                                                  xfcnt))
+        session_deriver = SessionDeriver(keys, fcnt_tracker=fcnt_tracker)
+    stats = None
+    if opt.f_stats or opt.stats_interval:
+        from lorawan_stats import Stats
+        stats = Stats(interval=opt.stats_interval)
+    cache = None
+    if opt.cache_size > 0:
+        from lorawan_cache import DecodeCache
+        cache = DecodeCache(opt.cache_size)
+    if opt.jobs > 1 and (fcnt_tracker is not None or
+                         session_deriver is not None or
+                         opt.export or opt.dedup or
+                         opt.input_format != "hex"):
+        print("WARNING: --jobs is used only for the hex input without "
+              "--track-fcnt, --derive-keys, --export and --dedup.",
+              file=sys.stderr)
+        opt.jobs = 1
+    if opt.input_format in ["binary", "pcap"] and not opt.input_file:
+        print("ERROR: -f is required for --input-format %s." %
+              opt.input_format)
+        exit(1)
+    #
+    if opt.input_file and opt.jobs > 1:
+        import lorawan_parallel
+        out = BatchWriter(sys.stdout)
+        err = lorawan_parallel.run_parallel(opt.input_file, opt.jobs, keys,
+                                            xfcnt, out,
+                                            ordered=not opt.f_unordered,
+                                            verbose=f_verbose,
+                                            ignore_error=f_ignore_error,
+                                            fmt=opt.format,
+                                            verify_mic=opt.f_verify_mic,
+                                            frame_filter=frame_filter,
+                                            stats=stats,
+                                            cache_size=opt.cache_size)
+        if err is not None:
+            print("Abort.", file=out)
+            print(err, file=out)
+        out.flush()
+        if stats is not None and opt.f_stats:
+            stats.summary()
+        exit(1)
+    #
+    with_meta = False
+    if opt.input_format == "semtech":
+        from lorawan_semtech import iter_semtech_json
+        out = BatchWriter(sys.stdout)
+        with_meta = True
+        if opt.input_file:
+            frames = iter_semtech_json(open(opt.input_file))
+        else:
+            frames = iter_semtech_json(sys.stdin)
+    elif opt.input_file and opt.input_format != "hex":
+        from lorawan_readers import read_frames
+        out = BatchWriter(sys.stdout)
+        frames = read_frames(opt.input_file, opt.input_format)
+    elif opt.input_file:
+        out = BatchWriter(sys.stdout)
+        frames = iter_hex_frames(iter_lines(open(opt.input_file, "rb")))
+    elif hex_str == "-":
+        out = BatchWriter(sys.stdout)
+        frames = iter_hex_frames(iter_lines(sys.stdin.buffer))
+    else:
+        out = sys.stdout
+        frames = [binascii.a2b_hex(hex_str)]
+    if frame_filter is not None:
+        frames = frame_filter.filter(frames, with_meta=with_meta)
+    dedup = None
+    if opt.dedup > 0:
+        from lorawan_cache import Deduplicator
+        dedup = Deduplicator(opt.dedup)
+        frames = dedup.filter(frames, with_meta=with_meta)
+    exporter = None
+    if opt.export:
+        from lorawan_export import open_export
+        try:
+            exporter = open_export(opt.export)
+        except ValueError as e:
+            print(e)
+            exit(1)
+        render = lambda frame, out: exporter.add(frame)
+    if stats is not None:
+        render = stats.wrap("output", render)
+    #
+    try:
+        for frame in decode_stream(frames, keys=keys, xfcnt=xfcnt,
+                                   verify_mic=opt.f_verify_mic,
+                                   fcnt_tracker=fcnt_tracker,
+                                   session_deriver=session_deriver,
+                                   with_meta=with_meta, stats=stats,
+                                   cache=cache):
+            render(frame, out)
+    except Exception as e:
+        if opt.debug_level > 0:
+            raise
+        print("Abort.", file=out)
+        print(e, file=out)
+        exit(1)
+    finally:
+        out.flush()
+        if exporter is not None:
+            exporter.close()
+        if fcnt_tracker is not None and opt.fcnt_state:
+            fcnt_tracker.save(opt.fcnt_state)
+        if stats is not None and opt.f_stats:
+            if dedup is not None:
+                stats.counters["duplicates"] = dedup.duplicates
+            stats.summary()
+    if opt.input_file or hex_str == "-":
+        exit(1)
+
+if __name__ == "__main__" :
+    main()
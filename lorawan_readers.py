@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+import mmap
+import struct
+from lorawan_semtech import iter_udp_frames
+
+# the link types of pcap.
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LORATAP = 270
+LINKTYPE_LINUX_SLL2 = 276
+
+PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": "<",   # usec, little endian
+    b"\xa1\xb2\xc3\xd4": ">",
+    b"\x4d\x3c\xb2\xa1": "<",   # nsec
+    b"\xa1\xb2\x3c\x4d": ">",
+}
+PCAPNG_SHB = b"\x0a\x0d\x0d\x0a"
+PCAPNG_IDB = 1
+PCAPNG_SPB = 3
+PCAPNG_EPB = 6
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_IPV6 = 0x86dd
+ETHERTYPE_VLAN = (0x8100, 0x88a8)
+IPPROTO_UDP = 17
+
+'''
+map the file into the memory, and return the memoryview of it.
+the frames read from it are the slices of the memoryview, not copied.
+'''
+def map_file(path):
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return memoryview(b"")
+        return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+'''
+the length-prefixed binary frames.
+
+    length | PHYPayload | length | PHYPayload | ...
+
+    len_size: the size of the length in bytes, 1, 2 or 4.
+    byteorder: "big" or "little".
+'''
+def iter_length_prefixed(buf, len_size=2, byteorder="big"):
+    pos = 0
+    end = len(buf)
+    while pos < end:
+        if pos + len_size > end:
+            raise ValueError("ERROR: truncated length at offset %d" % pos)
+        n = int.from_bytes(buf[pos:pos + len_size], byteorder)
+        pos += len_size
+        if pos + n > end:
+            raise ValueError("ERROR: truncated frame at offset %d" % pos)
+        yield buf[pos:pos + n]
+        pos += n
+
+'''
+the payload of UDP in the packet of the link type, or None.
+'''
+def get_udp_payload(pkt, linktype):
+    if linktype == LINKTYPE_ETHERNET:
+        offset = 14
+        ethertype = int.from_bytes(pkt[12:14], "big")
+        while ethertype in ETHERTYPE_VLAN:
+            ethertype = int.from_bytes(pkt[offset + 2:offset + 4], "big")
+            offset += 4
+    elif linktype == LINKTYPE_LINUX_SLL:
+        offset = 16
+        ethertype = int.from_bytes(pkt[14:16], "big")
+    elif linktype == LINKTYPE_LINUX_SLL2:
+        offset = 20
+        ethertype = int.from_bytes(pkt[0:2], "big")
+    elif linktype == LINKTYPE_NULL:
+        offset = 4
+        family = int.from_bytes(pkt[0:4], "little")
+        if family > 0xffff:
+            family = int.from_bytes(pkt[0:4], "big")
+        ethertype = ETHERTYPE_IPV4 if family == 2 else ETHERTYPE_IPV6
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        offset = 0
+        if len(pkt) < 1:
+            return None
+        ethertype = ETHERTYPE_IPV4 if pkt[0] >> 4 == 4 else ETHERTYPE_IPV6
+    else:
+        return None
+    if ethertype == ETHERTYPE_IPV4:
+        if len(pkt) < offset + 20 or pkt[offset + 9] != IPPROTO_UDP:
+            return None
+        offset += (pkt[offset] & 0x0f) * 4
+    elif ethertype == ETHERTYPE_IPV6:
+        if len(pkt) < offset + 40 or pkt[offset + 6] != IPPROTO_UDP:
+            return None
+        offset += 40
+    else:
+        return None
+    if len(pkt) < offset + 8:
+        return None
+    return pkt[offset + 8:]
+
+'''
+yield the PHYPayloads in the packet of the link type.
+LoRaTap yields the slice of the packet,
+the Semtech UDP packet forwarder yields bytes decoded from base64.
+'''
+def iter_packet_frames(pkt, linktype):
+    if linktype == LINKTYPE_LORATAP:
+        # version | padding | length(2, big endian) | ...
+        if len(pkt) >= 4:
+            yield pkt[int.from_bytes(pkt[2:4], "big"):]
+        return
+    udp = get_udp_payload(pkt, linktype)
+    if udp is not None:
+        yield from iter_udp_frames(udp)
+
+'''
+yield (linktype, packet) of each packet in pcap.
+'''
+def iter_pcap_packets(buf):
+    endian = PCAP_MAGIC.get(bytes(buf[0:4]))
+    if endian is None:
+        raise ValueError("ERROR: not a pcap file.")
+    linktype = struct.unpack_from(endian + "I", buf, 20)[0] & 0x0fffffff
+    rec = struct.Struct(endian + "IIII")
+    pos = 24
+    end = len(buf)
+    while pos + rec.size <= end:
+        _, _, caplen, _ = rec.unpack_from(buf, pos)
+        pos += rec.size
+        if pos + caplen > end:
+            raise ValueError("ERROR: truncated packet at offset %d" % pos)
+        yield linktype, buf[pos:pos + caplen]
+        pos += caplen
+
+'''
+yield (linktype, packet) of each packet in pcapng.
+'''
+def iter_pcapng_packets(buf):
+    pos = 0
+    end = len(buf)
+    endian = "<"
+    linktypes = []
+    while pos + 12 <= end:
+        if buf[pos:pos + 4] == PCAPNG_SHB:
+            endian = "<" if buf[pos + 8:pos + 12] == b"\x4d\x3c\x2b\x1a" \
+                    else ">"
+            linktypes = []
+        block_type, block_len = struct.unpack_from(endian + "II", buf, pos)
+        if block_len < 12 or pos + block_len > end:
+            raise ValueError("ERROR: truncated block at offset %d" % pos)
+        if block_type == PCAPNG_IDB:
+            linktypes.append(struct.unpack_from(endian + "H", buf, pos + 8)[0])
+        elif block_type == PCAPNG_EPB:
+            if_id, _, _, caplen, _ = struct.unpack_from(endian + "IIIII", buf,
+                                                        pos + 8)
+            if if_id >= len(linktypes):
+                raise ValueError("ERROR: unknown interface %d at offset %d" %
+                                 (if_id, pos))
+            yield linktypes[if_id], buf[pos + 28:pos + 28 + caplen]
+        elif block_type == PCAPNG_SPB:
+            if not linktypes:
+                raise ValueError("ERROR: no interface at offset %d" % pos)
+            origlen = struct.unpack_from(endian + "I", buf, pos + 8)[0]
+            caplen = min(origlen, block_len - 16)
+            yield linktypes[0], buf[pos + 12:pos + 12 + caplen]
+        pos += block_len
+
+'''
+yield the PHYPayloads in pcap or pcapng, which is distinguished by the magic.
+'''
+def iter_pcap_frames(buf):
+    if buf[0:4] == PCAPNG_SHB:
+        packets = iter_pcapng_packets(buf)
+    else:
+        packets = iter_pcap_packets(buf)
+    for linktype, pkt in packets:
+        yield from iter_packet_frames(pkt, linktype)
+
+readers = {
+    "binary": iter_length_prefixed,
+    "pcap": iter_pcap_frames,
+}
+
+'''
+map the file and yield the frames in the format, "binary" or "pcap".
+'''
+def read_frames(path, fmt):
+    yield from readers[fmt](map_file(path))
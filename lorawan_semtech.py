@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import json
+import binascii
+
+# Semtech UDP packet forwarder protocol.
+PUSH_DATA = 0x00
+PUSH_ACK = 0x01
+PULL_DATA = 0x02
+PULL_RESP = 0x03
+PULL_ACK = 0x04
+TX_ACK = 0x05
+PROTOCOL_VERSIONS = (1, 2)
+# the size to read the JSON stream at once.
+JSON_CHUNK_SIZE = 1024 * 1024
+JSON_SEPARATORS = " \t\r\n,[]"
+
+'''
+the JSON in the datagram of the Semtech UDP packet forwarder.
+
+    PUSH_DATA: version | token(2) | 0x00 | gateway EUI(8) | JSON
+    PULL_RESP: version | token(2) | 0x03 | JSON
+    TX_ACK:    version | token(2) | 0x05 | gateway EUI(8) | JSON (optional)
+
+It returns the JSON object, or None if the datagram doesn't have it.
+'''
+def parse_udp_json(datagram):
+    if len(datagram) < 4 or datagram[0] not in PROTOCOL_VERSIONS:
+        return None
+    ident = datagram[3]
+    if ident == PUSH_DATA:
+        offset = 12
+    elif ident == PULL_RESP:
+        offset = 4
+    else:
+        return None
+    try:
+        return json.loads(bytes(datagram[offset:]))
+    except ValueError:
+        return None
+
+'''
+yield the PHYPayload in bytes of each rxpk and txpk in the datagram.
+'''
+def iter_udp_frames(datagram):
+    for meta, data in iter_udp_packets(datagram):
+        yield data
+
+class RadioMeta(object):
+    '''
+    the radio metadata of rxpk or txpk.
+        kind: "rxpk" or "txpk".
+        tmst: the timestamp of the concentrator in usec.
+        freq: the frequency in MHz.
+        datr: the datarate, e.g. "SF7BW125", or the bit rate of FSK.
+        rssi, lsnr: RSSI in dBm and SNR in dB, None for txpk.
+        gweui: the gateway EUI in integer if known.
+    '''
+    __slots__ = ("kind", "tmst", "freq", "datr", "rssi", "lsnr", "gweui")
+
+    def __init__(self, kind, tmst=None, freq=None, datr=None, rssi=None,
+                 lsnr=None, gweui=None):
+        self.kind = kind
+        self.tmst = tmst
+        self.freq = freq
+        self.datr = datr
+        self.rssi = rssi
+        self.lsnr = lsnr
+        self.gweui = gweui
+
+    def to_dict(self):
+        return dict([(k, getattr(self, k)) for k in self.__slots__])
+
+'''
+yield (RadioMeta, PHYPayload in bytes) of each rxpk and txpk in the object.
+the object is the JSON of PUSH_DATA or PULL_RESP, i.e. having "rxpk" or
+"txpk", or a rxpk itself.
+'''
+def iter_json_packets(obj, gweui=None):
+    if not isinstance(obj, dict):
+        return
+    if "data" in obj:
+        pkts = [("rxpk", obj)]
+    else:
+        pkts = [("rxpk", pkt) for pkt in obj.get("rxpk") or []]
+        if obj.get("txpk"):
+            pkts.append(("txpk", obj["txpk"]))
+    for kind, pkt in pkts:
+        data = pkt.get("data")
+        if not data:
+            continue
+        yield (RadioMeta(kind, pkt.get("tmst"), pkt.get("freq"),
+                         pkt.get("datr"), pkt.get("rssi"), pkt.get("lsnr"),
+                         gweui),
+               binascii.a2b_base64(data))
+
+'''
+return True if the error of raw_decode() may be by the end of the buffer,
+i.e. no newline follows the position of the error, so that the value may
+be complete with the next chunk.
+'''
+def is_truncated(e, buf):
+    return buf.find("\n", getattr(e, "pos", len(buf))) < 0
+
+'''
+yield the JSON values in the text stream one by one, without reading
+the whole stream.  the values can be separated by spaces or newlines,
+i.e. JSON lines, or can be the elements of the array at the top level.
+a malformed value is skipped with a warning up to the newline after
+the error, and the values after it are read.  a value truncated at the end of the stream
+raises ValueError.
+'''
+def iter_json_stream(f, chunk_size=JSON_CHUNK_SIZE):
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    while True:
+        while pos < len(buf) and buf[pos] in JSON_SEPARATORS:
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                return
+            buf = f.read(chunk_size)
+            pos = 0
+            eof = not buf
+            continue
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except ValueError as e:
+            if not is_truncated(e, buf):
+                # the rest of the line from the error is skipped, so that
+                # the lines of the value before it are not read again.
+                print("WARNING: invalid JSON skipped, %s" % buf[pos:pos+40],
+                      file=sys.stderr)
+                pos = buf.find("\n", max(pos, e.pos)) + 1
+                continue
+            if eof:
+                raise ValueError("ERROR: invalid JSON at %s" % buf[pos:pos+40])
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        # a number may be cut at the end of the chunk.
+        if (not eof and not isinstance(obj, (dict, list, str)) and
+                (end == len(buf) or buf[end] not in JSON_SEPARATORS)):
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+            continue
+        yield obj
+        pos = end
+
+'''
+yield (RadioMeta, PHYPayload in bytes) in the text stream of the JSON
+of the packet forwarder.
+'''
+def iter_semtech_json(f, chunk_size=JSON_CHUNK_SIZE):
+    for obj in iter_json_stream(f, chunk_size):
+        yield from iter_json_packets(obj)
+
+'''
+yield (RadioMeta, PHYPayload in bytes) in the datagram of the packet
+forwarder.
+'''
+def iter_udp_packets(datagram):
+    gweui = None
+    if len(datagram) >= 12 and datagram[3] == PUSH_DATA:
+        gweui = int.from_bytes(datagram[4:12], "big")
+    yield from iter_json_packets(parse_udp_json(datagram), gweui)
@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import sys
+import os
+import asyncio
+import argparse
+import base64
+import json
+import concurrent.futures
+import lorawan_phy_parser as parser
+from lorawan_json import frame_to_dict, dumps
+from lorawan_stream import BatchWriter, iter_lines, iter_hex_frames
+from lorawan_semtech import (iter_udp_packets, PUSH_DATA, PUSH_ACK,
+                             PULL_DATA, PULL_ACK, PROTOCOL_VERSIONS)
+
+# the max number of the frames being decoded.
+MAX_PENDING = 10000
+
+#
+# worker
+#
+_worker = {}
+
+def _init_worker(keys, xfcnt, verify_mic):
+    _worker["keys"] = keys
+    _worker["xfcnt"] = xfcnt
+    _worker["verify_mic"] = verify_mic
+
+'''
+decode the frame in the worker, and return the dict of the result.
+    data: the PHYPayload in bytes.
+    radio: the dict of RadioMeta, or None.
+'''
+def decode_packet(data, radio):
+    try:
+        frame = parser.decode_phy_payload(data, keys=_worker["keys"],
+                                          xfcnt=_worker["xfcnt"],
+                                          verify_mic=_worker["verify_mic"])
+        d = frame_to_dict(frame)
+    except Exception as e:
+        d = { "phypayload": parser.bytes2hex(data), "error": str(e) }
+    if radio is not None:
+        d["radio"] = radio
+    return d
+
+class PacketForwarderProtocol(asyncio.DatagramProtocol):
+    '''
+    the server side of the Semtech UDP packet forwarder protocol.
+    PUSH_DATA and PULL_DATA are acknowledged at once, and each rxpk of
+    PUSH_DATA is passed to the DecodeServer.
+    '''
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < 4 or data[0] not in PROTOCOL_VERSIONS:
+            self.server.stats["invalid"] += 1
+            return
+        ident = data[3]
+        if ident == PUSH_DATA:
+            self.transport.sendto(data[:3] + bytes([PUSH_ACK]), addr)
+            try:
+                packets = list(iter_udp_packets(data))
+            except ValueError:
+                self.server.stats["invalid"] += 1
+                return
+            for meta, frame in packets:
+                self.server.submit(frame, meta.to_dict())
+        elif ident == PULL_DATA:
+            self.transport.sendto(data[:3] + bytes([PULL_ACK]), addr)
+        else:
+            self.server.stats["ignored"] += 1
+
+class DecodeServer(object):
+    '''
+    decode the frames received by PacketForwarderProtocol in the pool of
+    the workers, so that the event loop is not blocked by the decryption.
+        keys: Keys or a keystore.
+        on_result: called with the dict of each result.
+            it writes a line of JSON into out if None.
+        executor: concurrent.futures.Executor.
+            ProcessPoolExecutor of the jobs is created if None.
+    '''
+    def __init__(self, keys=None, xfcnt=0, verify_mic=False, out=None,
+                 on_result=None, executor=None, jobs=1,
+                 max_pending=MAX_PENDING):
+        if keys is None:
+            keys = parser.Keys()
+        if executor is None:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                    jobs, initializer=_init_worker,
+                    initargs=(keys, xfcnt, verify_mic))
+        else:
+            _init_worker(keys, xfcnt, verify_mic)
+        self.executor = executor
+        self.out = out if out is not None else sys.stdout
+        self.on_result = on_result if on_result is not None else self.write
+        self.max_pending = max_pending
+        self.pending = set()
+        self.stats = dict.fromkeys(["received", "decoded", "errors",
+                                    "dropped", "invalid", "ignored"], 0)
+        self.transport = None
+
+    def write(self, result):
+        self.out.write(dumps(result))
+        self.out.write("\n")
+
+    def submit(self, data, radio=None):
+        self.stats["received"] += 1
+        if len(self.pending) >= self.max_pending:
+            self.stats["dropped"] += 1
+            return
+        loop = asyncio.get_running_loop()
+        fut = loop.run_in_executor(self.executor, decode_packet, data, radio)
+        self.pending.add(fut)
+        fut.add_done_callback(self.done)
+
+    def done(self, fut):
+        self.pending.discard(fut)
+        try:
+            result = fut.result()
+        except Exception as e:
+            result = { "error": str(e) }
+        if "error" in result:
+            self.stats["errors"] += 1
+        else:
+            self.stats["decoded"] += 1
+        self.on_result(result)
+
+    async def start(self, host="0.0.0.0", port=1700):
+        '''
+        return the address bound.
+        '''
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(
+                lambda: PacketForwarderProtocol(self), local_addr=(host, port))
+        return self.transport.get_extra_info("sockname")
+
+    async def drain(self):
+        '''
+        wait for the frames being decoded.
+        '''
+        while self.pending:
+            await asyncio.gather(*list(self.pending),
+                                 return_exceptions=True)
+
+    async def stop(self):
+        await self.drain()
+        if self.transport is not None:
+            self.transport.close()
+        self.executor.shutdown()
+
+#
+# simulator
+#
+class SimulatorProtocol(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.acks = asyncio.Queue()
+
+    def datagram_received(self, data, addr):
+        if len(data) >= 4 and data[3] in (PUSH_ACK, PULL_ACK):
+            self.acks.put_nowait(data)
+
+'''
+send the frames to the server as a packet forwarder.
+    frames: the PHYPayloads in bytes.
+    per_push: the number of rxpk in a PUSH_DATA.
+    timeout: the time to wait for each PUSH_ACK in seconds.
+return the number of PUSH_ACK received.
+'''
+async def simulate(host, port, frames, gweui=0x0102030405060708,
+                   per_push=1, timeout=1.0):
+    loop = asyncio.get_running_loop()
+    transport, proto = await loop.create_datagram_endpoint(
+            SimulatorProtocol, remote_addr=(host, port))
+    header = gweui.to_bytes(8, "big")
+    token = 0
+    nb_acks = 0
+    try:
+        transport.sendto(b"\x02\x00\x00" + bytes([PULL_DATA]) + header)
+        try:
+            await asyncio.wait_for(proto.acks.get(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        frames = list(frames)
+        for i in range(0, len(frames), per_push):
+            rxpk = [{ "tmst": int(loop.time() * 1000000) & 0xffffffff,
+                      "freq": 868.1, "datr": "SF7BW125", "rssi": -60,
+                      "lsnr": 7.5, "size": len(f),
+                      "data": base64.b64encode(f).decode() }
+                    for f in frames[i:i + per_push]]
+            token = (token + 1) & 0xffff
+            transport.sendto(b"\x02" + token.to_bytes(2, "big") +
+                             bytes([PUSH_DATA]) + header +
+                             json.dumps({ "rxpk": rxpk }).encode())
+            try:
+                await asyncio.wait_for(proto.acks.get(), timeout)
+                nb_acks += 1
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        transport.close()
+    return nb_acks
+
+def parse_args():
+    p = argparse.ArgumentParser(description="""
+        LoRaWAN decoder as a server of the Semtech UDP packet forwarder.
+        It writes the result of each frame in a line of JSON.""")
+    p.add_argument("--host", action="store", dest="host", default="0.0.0.0",
+        help="specify the address to listen.")
+    p.add_argument("--port", action="store", dest="port", type=int,
+        default=1700, help="specify the port to listen.")
+    p.add_argument("--jobs", action="store", dest="jobs", type=int,
+        default=os.cpu_count() or 1,
+        help="specify the number of the processes to decode.")
+    p.add_argument("--nskey", action="store", dest="nskey", default="",
+        help="specify NwkSEncKey(v1.1) or NwkSKey(v1.0.2).")
+    p.add_argument("--askey", action="store", dest="askey", default="",
+        help="specify AppSKey.")
+    p.add_argument("--akey", action="store", dest="akey", default="",
+        help="specify AppKey.")
+    p.add_argument("--keystore", action="store", dest="keystore",
+        help="specify the file of the keys per DevAddr.")
+    p.add_argument("--xfcnt", action="store", dest="xfcnt", default="0000",
+        help="specify the most significant 16-bit of the FCnt in hex.")
+    p.add_argument("--verify-mic", action="store_true", dest="f_verify_mic",
+        help="verify the MIC.")
+    p.add_argument("--simulate", action="store", dest="simulate",
+        help="send the frames in the file of the hex strings to the server "
+        "at --host and --port as a packet forwarder, instead of listening.")
+    return p.parse_args()
+
+async def serve(opt):
+    keys = parser.hex2keys(opt.nskey, opt.askey, opt.akey)
+    xfcnt = int(opt.xfcnt or "0", 16)
+    if opt.keystore:
+        from lorawan_keystore import load_keystore, DeviceSession
+        keys = load_keystore(opt.keystore,
+                             default=DeviceSession(None, keys.nskey,
+                                                   keys.askey, keys.akey,
+                                                   xfcnt))
+    out = BatchWriter(sys.stdout, flush_size=1)
+    server = DecodeServer(keys, xfcnt, verify_mic=opt.f_verify_mic, out=out,
+                          jobs=opt.jobs)
+    addr = await server.start(opt.host, opt.port)
+    print("listening on %s:%d" % addr[:2], file=sys.stderr)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+        print(server.stats, file=sys.stderr)
+
+def main():
+    opt = parse_args()
+    if opt.simulate:
+        frames = iter_hex_frames(iter_lines(open(opt.simulate, "rb")))
+        host = "127.0.0.1" if opt.host == "0.0.0.0" else opt.host
+        nb_acks = asyncio.run(simulate(host, opt.port, frames))
+        print("%d PUSH_ACK received." % nb_acks, file=sys.stderr)
+        return
+    try:
+        asyncio.run(serve(opt))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__" :
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import struct
+import collections
+import lorawan_phy_parser as parser
+from lorawan_cipher import lorawan_gen_key, lorawan_mic_joinreq, MIC_LEN
+from lorawan_keystore import KeyStore, DeviceSession
+
+# the number of the Join Requests waiting for the Join Accept.
+MAX_PENDING = 1024
+DEVNONCE_STRUCT = struct.Struct("<H")
+
+class SessionDeriver(object):
+    '''
+    derive the session keys from the Join Request and the Join Accept
+    in the stream, and add the DeviceSession into the keystore, so that
+    the frames of the device after the join are decrypted.
+        keystore: KeyStore to be updated, which is passed to the decoder.
+        appkeys: a dict of AppKey in bytes keyed by DevEUI in integer.
+            the akey of the default of the keystore is used if not found.
+        fcnt_tracker: FCntTracker of which FCnt of the DevAddr is reset
+            when the session is derived, because FCnt restarts from 0.
+
+    the Join Request is kept pending if its MIC matches with the AppKey.
+    the Join Accept doesn't have DevEUI.  it is matched with the pending
+    Join Requests by the MIC, from the newest one.
+    '''
+    def __init__(self, keystore=None, appkeys=None, max_pending=MAX_PENDING,
+                 fcnt_tracker=None):
+        self.keystore = keystore if keystore is not None else KeyStore()
+        self.appkeys = appkeys if appkeys is not None else {}
+        self.fcnt_tracker = fcnt_tracker
+        self.max_pending = max_pending
+        self.pending = collections.OrderedDict()
+
+    def appkey(self, deveui):
+        return self.appkeys.get(deveui) or self.keystore.default.akey
+
+    def join_request(self, frame):
+        jr = frame.payload
+        appkey = self.appkey(jr.deveui)
+        if not appkey:
+            return
+        if lorawan_mic_joinreq(appkey, frame.raw[:-MIC_LEN]) != frame.mic:
+            return
+        key = (jr.deveui, jr.devnonce)
+        self.pending.pop(key, None)
+        self.pending[key] = appkey
+        if len(self.pending) > self.max_pending:
+            self.pending.popitem(last=False)
+
+    def join_accept(self, frame):
+        '''
+        return the DeviceSession derived, or None.
+        the payload and the keys of the frame are replaced with the ones
+        decoded by the AppKey matched.
+        '''
+        mhdr = frame.raw[:1]
+        for key in reversed(self.pending):
+            appkey = self.pending[key]
+            if frame.payload.mic_ok and appkey == frame.keys.akey:
+                ja = frame.payload
+            else:
+                ja = parser.decode_joinaccept(frame.raw[1:],
+                                              parser.Keys(akey=appkey), mhdr)
+                if not ja.mic_ok:
+                    continue
+            del self.pending[key]
+            nskey, askey = lorawan_gen_key(appkey, ja.decrypted[0:3],
+                                           ja.decrypted[3:6],
+                                           DEVNONCE_STRUCT.pack(key[1]))
+            session = DeviceSession(ja.devaddr, nskey, askey, appkey)
+            self.keystore.add(session)
+            if self.fcnt_tracker is not None:
+                self.fcnt_tracker.reset(ja.devaddr)
+            frame.payload = ja
+            frame.keys = session
+            frame.mic_ok = ja.mic_ok
+            return session
+        return None
+
+    def feed(self, frame):
+        '''
+        called with each Frame decoded.
+        return the DeviceSession if it is derived from the frame.
+        '''
+        if frame.mhdr.mtype == parser.MTYPE_JOIN_REQUEST:
+            self.join_request(frame)
+        elif frame.mhdr.mtype == parser.MTYPE_JOIN_ACCEPT:
+            return self.join_accept(frame)
+        return None
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+import sys
+import time
+
+# the stages timed.  decode includes mac_cmd, crypto and mic, and the rest
+# of decode is shown as header.
+STAGES = ("read", "decode", "mac_cmd", "crypto", "mic", "output")
+REPORT_STAGES = ("read", "header", "mac_cmd", "crypto", "mic", "output")
+COUNTERS = ("frames", "bytes", "decrypts", "mic_ok", "mic_failures",
+            "unknown_cids")
+
+class Stats(object):
+    '''
+    the cumulative timers of the stages and the counters of the frames.
+    It is passed to decode_stream() only when it is needed, so that
+    the decoder costs nothing more without it.
+
+        interval: the seconds to write a line of the stats into out
+            periodically, or None not to write.
+        clock: the function to return the time in seconds.
+
+    >>> stats = Stats()
+    >>> for frame in decode_stream(frames, keys, stats=stats):
+    ...     pass
+    >>> stats.snapshot()["counters"]["frames"]
+    '''
+    def __init__(self, interval=None, out=None, clock=time.perf_counter):
+        self.interval = interval
+        self.out = out if out is not None else sys.stderr
+        self.clock = clock
+        self.timers = dict.fromkeys(STAGES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.errors = {}
+        self.start_time = clock()
+        self.last_report = (self.start_time, 0)
+        self.next_report = (self.start_time + interval
+                            if interval is not None else None)
+
+    def call(self, stage, func, *args):
+        '''
+        call func with args, and add the time into the stage.
+        '''
+        t0 = self.clock()
+        try:
+            return func(*args)
+        finally:
+            self.timers[stage] += self.clock() - t0
+
+    def wrap(self, stage, func):
+        '''
+        return func of which time is added into the stage.
+        '''
+        def timed(*args):
+            return self.call(stage, func, *args)
+        return timed
+
+    def iter(self, stage, items):
+        '''
+        yield the items, and add the time to get each into the stage,
+        e.g. the time to read and to convert the input.
+        '''
+        clock = self.clock
+        timers = self.timers
+        it = iter(items)
+        while True:
+            t0 = clock()
+            try:
+                item = next(it)
+            except StopIteration:
+                timers[stage] += clock() - t0
+                return
+            timers[stage] += clock() - t0
+            yield item
+
+    def error(self, e):
+        name = type(e).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def add_frame(self, frame, elapsed, cached=None):
+        '''
+        count the Frame decoded in elapsed seconds.
+            cached: True if the Frame is returned by the cache, so that
+                only cache_hits is counted instead of the decode,
+                False if it is decoded and put into the cache,
+                None if the cache is not used.
+        '''
+        c = self.counters
+        c["frames"] += 1
+        c["bytes"] += len(frame.raw)
+        if cached:
+            c["cache_hits"] = c.get("cache_hits", 0) + 1
+            if (self.next_report is not None and
+                    self.clock() >= self.next_report):
+                self.report()
+            return
+        if cached is False:
+            c["cache_misses"] = c.get("cache_misses", 0) + 1
+        self.timers["decode"] += elapsed
+        if frame.mic_ok:
+            c["mic_ok"] += 1
+        elif frame.mic_ok is False:
+            c["mic_failures"] += 1
+        payload = frame.payload
+        if (getattr(payload, "frm_payload_plain", None) is not None or
+                getattr(payload, "decrypted", None) is not None):
+            c["decrypts"] += 1
+        for cmd in getattr(payload, "mac_commands", None) or ():
+            if cmd.name is None:
+                c["unknown_cids"] += 1
+        if self.next_report is not None and self.clock() >= self.next_report:
+            self.report()
+
+    def merge(self, snapshot):
+        '''
+        add the snapshot, e.g. of a worker process, into the stats.
+        '''
+        for k in STAGES:
+            self.timers[k] += snapshot["timers"].get(k, 0.0)
+        for k, v in snapshot["counters"].items():
+            self.counters[k] = self.counters.get(k, 0) + v
+        for k, v in snapshot["errors"].items():
+            self.errors[k] = self.errors.get(k, 0) + v
+        if self.next_report is not None and self.clock() >= self.next_report:
+            self.report()
+
+    def snapshot(self):
+        '''
+        return the copy of the stats in a dict.
+        the timers are in seconds, and header is the time of decode
+        except mac_cmd, crypto and mic.
+        '''
+        timers = dict(self.timers)
+        timers["header"] = max(0.0, timers["decode"] - timers["mac_cmd"] -
+                               timers["crypto"] - timers["mic"])
+        return {
+            "elapsed": self.clock() - self.start_time,
+            "timers": timers,
+            "counters": dict(self.counters),
+            "errors": dict(self.errors),
+            }
+
+    def report(self):
+        '''
+        write a line of the stats since the last report.
+        '''
+        now = self.clock()
+        last_time, last_frames = self.last_report
+        frames = self.counters["frames"]
+        rate = (frames - last_frames) / (now - last_time) \
+                if now > last_time else 0.0
+        print("stats: frames=%d fps=%.0f %s errors=%d" % (
+                frames, rate,
+                " ".join(["%s=%d" % (k, self.counters[k])
+                          for k in COUNTERS[2:]]),
+                sum(self.errors.values())), file=self.out)
+        self.last_report = (now, frames)
+        if self.interval is not None:
+            self.next_report = now + self.interval
+
+    def summary(self, out=None):
+        '''
+        write the summary of the stats.
+        '''
+        if out is None:
+            out = self.out
+        s = self.snapshot()
+        frames = s["counters"]["frames"]
+        elapsed = s["elapsed"]
+        print("## Stats", file=out)
+        print("frames: %d in %.3f s (%.0f frames/s)" % (
+                frames, elapsed, frames / elapsed if elapsed else 0.0),
+              file=out)
+        total = sum([s["timers"][k] for k in REPORT_STAGES])
+        print("  %-8s %10s %12s %6s" % ("stage", "total(s)", "us/frame", "%"),
+              file=out)
+        for k in REPORT_STAGES:
+            t = s["timers"][k]
+            print("  %-8s %10.3f %12.2f %6.1f" % (
+                    k, t, t * 1e6 / frames if frames else 0.0,
+                    t * 100 / total if total else 0.0), file=out)
+        print("counters: %s" % " ".join(["%s=%d" % (k, v) for k, v in
+                                         s["counters"].items()]), file=out)
+        print("errors: %s" % (" ".join(["%s=%d" % (k, v) for k, v in
+                                        sorted(s["errors"].items())])
+                              or "none"), file=out)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+
+import binascii
+
+# the size to read the input at once.
+CHUNK_SIZE = 1024 * 1024
+# the size of the output to be written at once.
+FLUSH_SIZE = 256 * 1024
+
+'''
+a hex string into the canonical form of the hex string.
+The following strings are decoded as a same string.  i.e. '01020304'
+
+    01020304
+    0102 0304
+    01.02.03.04
+    0x01 0x02 0x03 0x04
+    0x01,0x02,0x03,0x04
+'''
+def str2hexstr(buf):
+    # in case like "a4.9.0.19"
+    if "." in buf:
+        return "".join([i.rjust(2,"0") for i in buf.strip().split(".")])
+    # others
+    import re
+    return re.sub(r"([,\s\n]|0x)", "", buf)
+
+'''
+a line of the hex string in bytes into the frame in bytes.
+a plain hex string is converted directly, others through str2hexstr().
+'''
+def hex2bytes(line):
+    try:
+        return binascii.a2b_hex(line.strip())
+    except (binascii.Error, ValueError):
+        return binascii.a2b_hex(str2hexstr(line.decode("ascii")))
+
+'''
+read the binary file object in chunks, and yield each line in bytes
+without the new line code.  the memory is bounded by the chunk size
+and the longest line.
+'''
+def iter_lines(f, chunk_size=CHUNK_SIZE):
+    rest = b""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()
+        for line in lines:
+            yield line
+    if rest:
+        yield rest
+
+'''
+yield each frame in bytes from the lines of the hex string.
+empty lines are skipped.
+'''
+def iter_hex_frames(lines):
+    for line in lines:
+        data = hex2bytes(line)
+        if data:
+            yield data
+
+class BatchWriter(object):
+    '''
+    text writer to accumulate the output and to write it in batches.
+
+    >>> out = BatchWriter(sys.stdout)
+    >>> print("hello", file=out)
+    >>> out.flush()
+    '''
+    def __init__(self, out, flush_size=FLUSH_SIZE):
+        self.out = out
+        self.flush_size = flush_size
+        self.buf = []
+        self.size = 0
+
+    def write(self, s):
+        self.buf.append(s)
+        self.size += len(s)
+        if self.size >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        if self.buf:
+            self.out.write("".join(self.buf))
+            self.buf = []
+            self.size = 0
+        self.out.flush()
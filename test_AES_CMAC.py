@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from binascii import a2b_hex, b2a_hex
+from AES_CMAC import AES_CMAC, aes_cmac, get_cmac
+
+####
+
+class test_AES_CMAC(unittest.TestCase):
+
+    def setUp(self):
+        self.key = a2b_hex("2b7e151628aed2a6abf7158809cf4f3c")
+        self.msg = a2b_hex(
+            "6bc1bee22e409f96e93d7e117393172a"
+            "ae2d8a571e03ac9c9eb76fac45af8e51"
+            "30c81c46a35ce411e5fbc1191a0a52ef"
+            "f69f2445df4f9b17ad2b417be66c3710")
+
+    # the test vectors in RFC 4493.
+    def test_rfc4493(self):
+        v = [
+            (0, "bb1d6929e95937287fa37d129b756746"),
+            (16, "070a16b46b4d4144f79bdd9dd04a287c"),
+            (40, "dfa66747de9ae63030ca32611497c827"),
+            (64, "51f0bebf7e3b9d92fc49741779363cfe"),
+            ]
+        for n, mac in v:
+            self.assertEqual(b2a_hex(aes_cmac(self.key, self.msg[:n])).decode(),
+                             mac)
+
+    def test_update(self):
+        cmac = AES_CMAC(self.key)
+        cmac.update(self.msg[:10])
+        cmac.update(self.msg[10:40])
+        self.assertEqual(cmac.hexdigest(), "dfa66747de9ae63030ca32611497c827")
+
+    def test_cache(self):
+        self.assertIs(get_cmac(self.key), get_cmac(self.key))
+        # the cached key has no buffer shared by the callers.
+        a = get_cmac(self.key).new()
+        b = AES_CMAC(self.key)
+        self.assertIs(a.key, b.key)
+        a.update(self.msg[:16])
+        b.update(self.msg[:40])
+        self.assertEqual(a.hexdigest(), "070a16b46b4d4144f79bdd9dd04a287c")
+        self.assertEqual(b.hexdigest(), "dfa66747de9ae63030ca32611497c827")
+        self.assertEqual(AES_CMAC(self.key).hexdigest(),
+                         "bb1d6929e95937287fa37d129b756746")
+        self.assertFalse(hasattr(get_cmac(self.key), "update"))
+
+if __name__ == '__main__':
+    unittest.main()
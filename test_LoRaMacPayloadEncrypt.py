@@ -2,8 +2,12 @@
 # -*- coding: utf-8 -*-
 
 import unittest
-from LoRaMacPayloadEncrypt import LoRaMacPayloadEncrypt
+from LoRaMacPayloadEncrypt import (LoRaMacPayloadEncrypt,
+                                   LoRaMacPayloadCipher, get_payload_cipher,
+                                   LoRaMacPayloadEncryptBatch, get_numpy)
+from AES_ECB import aes_ecb_encrypt
 import binascii
+import struct
 
 ####
 
@@ -19,7 +23,7 @@ class test_LoRaMacPayloadEncrypt(unittest.TestCase):
         fcnt_hex = "0000000d"
         addr_hex = "BEEF00B1"
         r1 = LoRaMacPayloadEncrypt(buf_hex, key_hex, addr_hex, 0, fcnt_hex)
-        r2 = binascii.b2a_hex(r1).upper()
+        r2 = binascii.b2a_hex(r1).decode().upper()
         self.assertEqual(r2, res_hex.upper())
 
     def test_2(self):
@@ -29,7 +33,7 @@ class test_LoRaMacPayloadEncrypt(unittest.TestCase):
         fcnt_hex = "00000003"
         addr_hex = "0000baad"
         r1 = LoRaMacPayloadEncrypt(buf_hex, key_hex, addr_hex, 1, fcnt_hex)
-        r2 = binascii.b2a_hex(r1).upper()
+        r2 = binascii.b2a_hex(r1).decode().upper()
         self.assertEqual(r2, res_hex.upper())
 
     def test_3(self):
@@ -39,8 +43,55 @@ class test_LoRaMacPayloadEncrypt(unittest.TestCase):
         fcnt_hex = "00000008"
         addr_hex = "01460c75"
         r1 = LoRaMacPayloadEncrypt(buf_hex, key_hex, addr_hex, 0, fcnt_hex)
-        r2 = binascii.b2a_hex(r1).upper()
+        r2 = binascii.b2a_hex(r1).decode().upper()
         self.assertEqual(r2, res_hex.upper())
 
+    def test_4(self):
+        # more than one block, compared with the A blocks one by one.
+        key = binascii.a2b_hex("2B7E151628AED2A6ABF7158809CF4F3C")
+        buf = bytes(range(40))
+        s = b""
+        for i in range(1, 4):
+            a = struct.pack("<B4xBIIxB", 1, 1, 0x01460c75, 0x00010008, i)
+            s += aes_ecb_encrypt(key, a)
+        res = bytes([buf[i] ^ s[i] for i in range(len(buf))])
+        cipher = LoRaMacPayloadCipher(key)
+        r1 = cipher.encrypt(buf, 0x01460c75, 1, 0x00010008)
+        self.assertEqual(r1, res)
+        self.assertEqual(cipher.decrypt(r1, 0x01460c75, 1, 0x00010008), buf)
+        self.assertEqual(cipher.encrypt(b"", 0x01460c75, 1, 0x00010008), b"")
+
+    def test_5(self):
+        key = binascii.a2b_hex("2B7E151628AED2A6ABF7158809CF4F3C")
+        self.assertIs(get_payload_cipher(key), get_payload_cipher(bytes(key)))
+
+    def test_batch(self):
+        keys = [binascii.a2b_hex(k) for k in [
+                "2B7E151628AED2A6ABF7158809CF4F3C",
+                "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAABB"]]
+        bufs = [bytes(range(i)) for i in range(0, 60, 7)]
+        keys = [keys[i % 2] for i in range(len(bufs))]
+        devaddrs = [0x01460c75 + i for i in range(len(bufs))]
+        dirs = [i % 2 for i in range(len(bufs))]
+        fcnts = [i * 3 for i in range(len(bufs))]
+        res = [LoRaMacPayloadCipher(k).encrypt(b, a, d, f)
+               for b, k, a, d, f in zip(bufs, keys, devaddrs, dirs, fcnts)]
+        r1 = LoRaMacPayloadEncryptBatch(bufs, keys, devaddrs, dirs, fcnts,
+                                        use_numpy=False)
+        self.assertEqual(r1, res)
+        if get_numpy() is not None:
+            r2 = LoRaMacPayloadEncryptBatch(bufs, keys, devaddrs, dirs, fcnts,
+                                            use_numpy=True)
+            self.assertEqual(r2, res)
+        # memoryview of the frames, e.g. from mmap.
+        views = [memoryview(b) for b in bufs]
+        for use_numpy in [False, True]:
+            if use_numpy and get_numpy() is None:
+                continue
+            self.assertEqual(LoRaMacPayloadEncryptBatch(views, keys, devaddrs,
+                                                        dirs, fcnts,
+                                                        use_numpy=use_numpy),
+                             res)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import binascii
+from lorawan_phy_parser import decode_phy_payload, bytes2hex
+from lorawan_batch import pack_frames, decode_headers, decode_batch, \
+        iter_batches
+from LoRaMacPayloadEncrypt import get_numpy
+
+DATA_UP = binascii.a2b_hex("40F17DBE4900020001954378762B11FF0D")
+FOPTS_UP = binascii.a2b_hex("40C1D25201A5050003070703120864FE226A9E")
+JOINREQ = binascii.a2b_hex("000102030405060708111213141516171802030a0b0c0d")
+# no FPort.
+NO_FPORT = binascii.a2b_hex("60F17DBE4910020001020304")
+
+####
+
+@unittest.skipIf(get_numpy() is None, "numpy is not available")
+class test_batch(unittest.TestCase):
+
+    def test_pack(self):
+        arr, lengths = pack_frames([b"\x01\x02\x03", b"", b"\x04"])
+        self.assertEqual(arr.tolist(), [[1, 2, 3], [0, 0, 0], [4, 0, 0]])
+        self.assertEqual(lengths.tolist(), [3, 0, 1])
+        arr, lengths = pack_frames([b"\x01\x02\x03"], width=2)
+        self.assertEqual(arr.tolist(), [[1, 2]])
+
+    def test_same_as_decode(self):
+        frames = [DATA_UP, FOPTS_UP, NO_FPORT]
+        cols = decode_batch(frames)
+        for i, data in enumerate(frames):
+            frame = decode_phy_payload(data)
+            fhdr = frame.payload.fhdr
+            self.assertTrue(cols["is_data"][i])
+            self.assertEqual(cols["mtype"][i], frame.mhdr.mtype)
+            self.assertEqual(cols["devaddr"][i], fhdr.devaddr)
+            self.assertEqual(cols["fcnt"][i], fhdr.fcnt)
+            self.assertEqual(cols["foptslen"][i], fhdr.fctrl.foptslen)
+            self.assertEqual(cols["ack"][i], fhdr.fctrl.ack)
+            self.assertEqual(cols["dir_down"][i], frame.msg_dir == "down")
+            fport = frame.payload.fport
+            self.assertEqual(cols["fport"][i], -1 if fport is None else fport)
+            self.assertEqual(cols["frm_payload_len"][i],
+                             len(frame.payload.frm_payload or b""))
+            self.assertEqual("%08x" % cols["mic"][i], bytes2hex(frame.mic))
+
+    def test_not_data(self):
+        cols = decode_batch([JOINREQ, b"\x40\x01\x02", b""])
+        self.assertEqual(cols["mtype"].tolist(), [0, 2, 0])
+        self.assertEqual(cols["is_data"].tolist(), [False, False, False])
+        self.assertEqual(cols["devaddr"].tolist(), [0, 0, 0])
+        self.assertEqual(cols["fport"].tolist(), [-1, -1, -1])
+        self.assertEqual("%08x" % cols["mic"][0], "0a0b0c0d")
+        self.assertEqual(cols["mic"].tolist()[1:], [0, 0])
+
+    def test_truncated(self):
+        arr, lengths = pack_frames([DATA_UP], width=8)
+        cols = decode_headers(arr, lengths)
+        self.assertEqual(cols["devaddr"][0], 0x49be7df1)
+        self.assertEqual(cols["fport"][0], -1)
+        self.assertEqual(cols["mic"][0], 0)
+
+    def test_iter_batches(self):
+        batches = list(iter_batches([DATA_UP] * 5, batch_size=2))
+        self.assertEqual([len(b["length"]) for b in batches], [2, 2, 1])
+
+if __name__ == "__main__" :
+    unittest.main()
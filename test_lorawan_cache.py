@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import binascii
+import struct
+from lorawan_phy_parser import decode_stream, Keys
+from lorawan_keystore import KeyStore, DeviceSession
+from lorawan_cache import DecodeCache, Deduplicator
+from lorawan_stats import Stats
+from lorawan_fcnt import FCntTracker
+from lorawan_cipher import lorawan_mic_data
+from LoRaMacPayloadEncrypt import LoRaMacPayloadEncryptRaw
+
+NSKEY = binascii.a2b_hex("44024241ed4ce9a68c6a8bc055233fd3")
+ASKEY = binascii.a2b_hex("ec925802ae430ca77fd3dd73cb2cc588")
+DATA_UP = binascii.a2b_hex("40F17DBE4900020001954378762B11FF0D")
+FOPTS_UP = binascii.a2b_hex("40C1D25201A5050003070703120864FE226A9E")
+JOINREQ = binascii.a2b_hex("000102030405060708111213141516171802030a0b0c0d")
+DEVADDR = 0x01020304
+
+def make_frame(fcnt32, plain=b"hello"):
+    msg = struct.pack("<BIBHB", 0x40, DEVADDR, 0, fcnt32 & 0xffff, 1)
+    msg += LoRaMacPayloadEncryptRaw(plain, ASKEY, DEVADDR, 0, fcnt32)
+    return msg + lorawan_mic_data(NSKEY, msg, DEVADDR, 0, fcnt32)
+
+####
+
+class test_decode_cache(unittest.TestCase):
+
+    def test_hit(self):
+        cache = DecodeCache()
+        frames = list(decode_stream([DATA_UP, DATA_UP, JOINREQ, JOINREQ],
+                                    Keys(NSKEY, ASKEY), verify_mic=True,
+                                    cache=cache))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertIsNot(frames[0], frames[1])
+        self.assertEqual(frames[1].payload.frm_payload_plain, b"test")
+        self.assertTrue(frames[1].mic_ok)
+
+    def test_stats(self):
+        # a hit is counted as a frame, but not as a decode.
+        cache = DecodeCache()
+        stats = Stats()
+        list(decode_stream([DATA_UP, DATA_UP, DATA_UP, JOINREQ],
+                           Keys(NSKEY, ASKEY), verify_mic=True,
+                           stats=stats, cache=cache))
+        c = stats.snapshot()["counters"]
+        self.assertEqual((c["frames"], c["cache_hits"], c["cache_misses"]),
+                         (4, 2, 1))
+        self.assertEqual((c["decrypts"], c["mic_ok"]), (1, 1))
+
+    def test_fcnt_tracker(self):
+        # the same bytes after the rollover are the next FCnt, not a hit.
+        frames = [make_frame(5), make_frame(0xfffe), make_frame(5),
+                  make_frame(5)]
+        results = []
+        for cache in (None, DecodeCache()):
+            tracker = FCntTracker()
+            decoded = list(decode_stream(frames, Keys(NSKEY, ASKEY),
+                                         verify_mic=True,
+                                         fcnt_tracker=tracker, cache=cache))
+            results.append(([f.payload.fcnt32 for f in decoded],
+                            [f.mic_ok for f in decoded], tracker.table))
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[1][0], [5, 0xfffe, 0x10005, 0x10005])
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_meta(self):
+        cache = DecodeCache()
+        frames = list(decode_stream([("a", DATA_UP), ("b", DATA_UP)],
+                                    with_meta=True, cache=cache))
+        self.assertEqual([f.meta for f in frames], ["a", "b"])
+
+    def test_keys(self):
+        cache = DecodeCache()
+        list(decode_stream([DATA_UP], Keys(NSKEY, ASKEY), cache=cache))
+        frame = next(decode_stream([DATA_UP], Keys(), cache=cache))
+        self.assertIsNone(frame.payload.frm_payload_plain)
+        ks = KeyStore()
+        ks.add(DeviceSession(0x49be7df1, NSKEY, ASKEY))
+        frame = next(decode_stream([DATA_UP], ks, cache=cache))
+        self.assertEqual(frame.payload.frm_payload_plain, b"test")
+        self.assertEqual(cache.hits, 0)
+
+    def test_lru(self):
+        cache = DecodeCache(maxsize=1)
+        list(decode_stream([DATA_UP, FOPTS_UP, DATA_UP], cache=cache))
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+        self.assertEqual(len(cache), 1)
+
+class test_deduplicator(unittest.TestCase):
+
+    def test_window(self):
+        dedup = Deduplicator(window=2)
+        items = [("g1", DATA_UP), ("g2", DATA_UP), ("g1", FOPTS_UP),
+                 ("g3", DATA_UP), ("g2", JOINREQ), ("g3", DATA_UP)]
+        self.assertEqual(list(dedup.filter(items, with_meta=True)),
+                         [(["g1", "g2"], DATA_UP), (["g1"], FOPTS_UP),
+                          (["g3", "g3"], DATA_UP), (["g2"], JOINREQ)])
+        self.assertEqual(dedup.duplicates, 2)
+
+    def test_no_meta(self):
+        dedup = Deduplicator()
+        self.assertEqual(list(dedup.filter([DATA_UP, DATA_UP, JOINREQ])),
+                         [DATA_UP, JOINREQ])
+
+if __name__ == "__main__" :
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import os
+import csv
+import tempfile
+import binascii
+from lorawan_phy_parser import decode_stream, Keys
+from lorawan_semtech import RadioMeta
+from lorawan_export import (open_export, frame_to_row, get_pyarrow,
+                            COLUMN_NAMES)
+
+NSKEY = binascii.a2b_hex("44024241ed4ce9a68c6a8bc055233fd3")
+ASKEY = binascii.a2b_hex("ec925802ae430ca77fd3dd73cb2cc588")
+DATA_UP = binascii.a2b_hex("40F17DBE4900020001954378762B11FF0D")
+FOPTS_UP = binascii.a2b_hex("40C1D25201A5050003070703120864FE226A9E")
+JOINREQ = binascii.a2b_hex("000102030405060708111213141516171802030a0b0c0d")
+
+####
+
+class test_lorawan_export(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        meta = RadioMeta("rxpk", tmst=1000, freq=868.1, datr="SF7BW125",
+                         rssi=-60, lsnr=7.5)
+        self.frames = list(decode_stream([(meta, DATA_UP), (None, FOPTS_UP),
+                                          (None, JOINREQ)],
+                                         Keys(NSKEY, ASKEY), verify_mic=True,
+                                         with_meta=True))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_row(self):
+        rows = [dict(zip(COLUMN_NAMES, frame_to_row(f)))
+                for f in self.frames]
+        self.assertEqual(rows[0]["devaddr"], 0x49be7df1)
+        self.assertEqual(rows[0]["frm_payload_plain"], b"test")
+        self.assertEqual(rows[0]["mic_ok"], True)
+        self.assertEqual(rows[0]["freq"], 868.1)
+        self.assertEqual(rows[1]["cids"], [3, 7, 0x12])
+        self.assertIsNone(rows[1]["tmst"])
+        self.assertEqual(rows[2]["deveui"], 0x1817161514131211)
+        self.assertIsNone(rows[2]["devaddr"])
+
+    def test_csv(self):
+        exporter = open_export(self.path("frames.csv"), row_group_size=2)
+        for f in self.frames:
+            exporter.add(f)
+        exporter.close()
+        with open(self.path("frames.csv"), newline="") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]["devaddr"], "49be7df1")
+        self.assertEqual(rows[0]["frm_payload_plain"], "74657374")
+        self.assertEqual(rows[0]["mic_ok"], "1")
+        self.assertEqual(rows[1]["cids"], "03|07|12")
+        self.assertEqual(rows[1]["fport"], "8")
+        self.assertEqual(rows[2]["devaddr"], "")
+        self.assertEqual(rows[2]["deveui"], "1817161514131211")
+
+    @unittest.skipIf(get_pyarrow() is None, "pyarrow is not available.")
+    def test_parquet(self):
+        import pyarrow.parquet
+        exporter = open_export(self.path("frames.parquet"), row_group_size=2)
+        for f in self.frames:
+            exporter.add(f)
+        exporter.close()
+        table = pyarrow.parquet.read_table(self.path("frames.parquet"))
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.column("devaddr").to_pylist(),
+                         [0x49be7df1, 0x0152d2c1, None])
+
+    def test_unknown(self):
+        with self.assertRaises(ValueError):
+            open_export(self.path("frames.txt"))
+
+if __name__ == "__main__" :
+    unittest.main()
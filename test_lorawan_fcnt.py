@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import os
+import struct
+import tempfile
+from lorawan_fcnt import FCntTracker
+from lorawan_cipher import lorawan_mic_data
+from LoRaMacPayloadEncrypt import LoRaMacPayloadEncryptRaw
+from lorawan_phy_parser import decode_phy_payload, Keys
+
+NSKEY = b"\x01" * 16
+ASKEY = b"\x02" * 16
+DEVADDR = 0x01020304
+
+def make_frame(fcnt32, plain=b"hello"):
+    msg = struct.pack("<BIBHB", 0x40, DEVADDR, 0, fcnt32 & 0xffff, 1)
+    msg += LoRaMacPayloadEncryptRaw(plain, ASKEY, DEVADDR, 0, fcnt32)
+    return msg + lorawan_mic_data(NSKEY, msg, DEVADDR, 0, fcnt32)
+
+####
+
+class test_lorawan_fcnt(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_infer(self):
+        t = FCntTracker(max_gap=100)
+        self.assertEqual(t.infer(DEVADDR, 0, 5, xfcnt=2), 0x20005)
+        t.update(DEVADDR, 0, 0xfffe)
+        self.assertEqual(t.infer(DEVADDR, 0, 0xffff), 0xffff)
+        # rolled over.
+        self.assertEqual(t.infer(DEVADDR, 0, 3), 0x10003)
+        # an old frame.
+        self.assertEqual(t.infer(DEVADDR, 0, 0xff00), 0xff00)
+        # the other direction is not seen yet.
+        self.assertEqual(t.infer(DEVADDR, 1, 3), 3)
+        t.update(DEVADDR, 0, 0x10003)
+        t.update(DEVADDR, 0, 0xff00)
+        self.assertEqual(t.table[DEVADDR << 1], 0x10003)
+
+    def test_reset(self):
+        t = FCntTracker()
+        t.update(DEVADDR, 0, 70000)
+        t.update(DEVADDR, 1, 9)
+        t.update(DEVADDR + 1, 0, 5)
+        t.reset(DEVADDR)
+        self.assertEqual(t.infer(DEVADDR, 0, 0), 0)
+        self.assertEqual(list(t.table), [(DEVADDR + 1) << 1])
+
+    def test_save_load(self):
+        t = FCntTracker()
+        t.update(DEVADDR, 0, 0x12345)
+        t.update(DEVADDR, 1, 7)
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "state")
+            t.save(path)
+            t2 = FCntTracker()
+            t2.load(path)
+        self.assertEqual(t2.table, t.table)
+
+    def test_decode(self):
+        keys = Keys(NSKEY, ASKEY)
+        t = FCntTracker(max_gap=16)
+        for fcnt32 in [0xfff0, 0xfffa, 0x10001, 0x10005]:
+            frame = decode_phy_payload(make_frame(fcnt32), keys,
+                                       fcnt_tracker=t, verify_mic=True)
+            self.assertEqual(frame.payload.fcnt32, fcnt32)
+            self.assertEqual(frame.payload.frm_payload_plain, b"hello")
+            self.assertTrue(frame.mic_ok)
+
+    def test_decode_mic(self):
+        keys = Keys(NSKEY, ASKEY)
+        t = FCntTracker(max_gap=16, use_mic=True)
+        t.update(DEVADDR, 0, 0xfff0)
+        # the gap is larger than max_gap, but the MIC tells the epoch.
+        frame = decode_phy_payload(make_frame(0x10100), keys, fcnt_tracker=t)
+        self.assertEqual(frame.payload.fcnt32, 0x10100)
+        self.assertEqual(t.table[DEVADDR << 1], 0x10100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import binascii
+from lorawan_filter import parse_filter, FrameFilter
+
+DATA_UP = binascii.a2b_hex("40F17DBE4900020001954378762B11FF0D")
+FOPTS_UP = binascii.a2b_hex("40C1D25201A5050003070703120864FE226A9E")
+NO_FPORT = binascii.a2b_hex("40C1D2520100050001020304")
+JOINREQ = binascii.a2b_hex("000102030405060708111213141516171802030a0b0c0d")
+
+####
+
+class test_lorawan_filter(unittest.TestCase):
+
+    def setUp(self):
+        self.frames = [DATA_UP, FOPTS_UP, NO_FPORT, JOINREQ]
+
+    def select(self, spec):
+        return list(parse_filter(spec).filter(self.frames))
+
+    def test_devaddr(self):
+        self.assertEqual(self.select("devaddr=49be7df1"), [DATA_UP])
+        self.assertEqual(self.select("devaddr=49be7df1|0152d2c1"),
+                         [DATA_UP, FOPTS_UP, NO_FPORT])
+
+    def test_fport(self):
+        self.assertEqual(self.select("fport=8"), [FOPTS_UP])
+        self.assertEqual(self.select("devaddr=0152d2c1, fport=1|8"),
+                         [FOPTS_UP])
+
+    def test_mtype(self):
+        self.assertEqual(self.select("mtype=0"), [JOINREQ])
+        self.assertEqual(self.select("mtype=UnconfirmedDataUp"),
+                         [DATA_UP, FOPTS_UP, NO_FPORT])
+
+    def test_deveui(self):
+        self.assertEqual(self.select("deveui=1817161514131211"), [JOINREQ])
+        self.assertEqual(self.select("deveui=1817161514131210"), [])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, parse_filter, "devaddr")
+        self.assertRaises(ValueError, parse_filter, "foo=1")
+        self.assertRaises(ValueError, parse_filter, "mtype=x")
+        self.assertTrue(FrameFilter().match(JOINREQ))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import io
+from lorawan_phy_parser import decode_stream, MTYPE_JOIN_ACCEPT
+from lorawan_keystore import KeyStore, DeviceSession
+from lorawan_session import SessionDeriver
+from lorawan_fcnt import FCntTracker
+from lorawan_generator import (TrafficGenerator, write_frames, split_jobs,
+                               generate_parallel)
+from lorawan_readers import iter_length_prefixed
+from lorawan_semtech import iter_semtech_json
+
+APPKEY = bytes(range(16))
+
+####
+
+class test_lorawan_generator(unittest.TestCase):
+
+    def keystore(self, gen):
+        ks = KeyStore()
+        for s in gen.sessions():
+            ks.add(s)
+        return ks
+
+    def test_abp(self):
+        gen = TrafficGenerator(nb_devices=10, seed=1, fopts_ratio=0.5,
+                               port0_ratio=0.2, down_ratio=0.3,
+                               fcnt_gap=(1, 2000), fcnt_start=0xff00)
+        frames = [data for dir_down, data in gen.generate(500)]
+        self.assertEqual(len(frames), 500)
+        ks = KeyStore()
+        for s in TrafficGenerator(nb_devices=10, seed=1).sessions():
+            ks.add(s)
+        decoded = list(decode_stream(frames, ks, verify_mic=True,
+                                     fcnt_tracker=FCntTracker(max_gap=4000)))
+        self.assertTrue(all([f.mic_ok for f in decoded]))
+        devaddrs = set([f.payload.fhdr.devaddr for f in decoded])
+        self.assertTrue(devaddrs <= set(range(0x26000000, 0x2600000a)))
+        self.assertTrue(any([f.payload.fhdr.fopts for f in decoded]))
+        self.assertTrue(any([f.payload.fport == 0 for f in decoded]))
+
+    def test_otaa(self):
+        gen = TrafficGenerator(nb_devices=5, appkey=APPKEY, otaa=True,
+                               rejoin_ratio=0.05, seed=2)
+        frames = [data for dir_down, data in gen.generate(200)]
+        ks = KeyStore(default=DeviceSession(akey=APPKEY))
+        decoded = list(decode_stream(frames, ks, verify_mic=True,
+                                     session_deriver=SessionDeriver(ks)))
+        self.assertTrue(all([f.mic_ok for f in decoded]))
+        self.assertGreater(len([f for f in decoded
+                                if f.mhdr.mtype == MTYPE_JOIN_ACCEPT]), 5)
+
+    def test_cids(self):
+        gen = TrafficGenerator(nb_devices=1, seed=3, fopts_ratio=1.0,
+                               port0_ratio=0.0, down_ratio=0.0, cids=set([2]))
+        for f in decode_stream([data for dir_down, data in gen.generate(20)]):
+            self.assertEqual(set([c.cid for c in f.payload.mac_commands]),
+                             set([2]))
+
+    def test_formats(self):
+        gen = TrafficGenerator(nb_devices=3, seed=4, down_ratio=0.5)
+        frames = [data for dir_down, data in gen.generate(20)]
+        f = io.BytesIO()
+        write_frames(TrafficGenerator(nb_devices=3, seed=4, down_ratio=0.5),
+                     20, "binary", f)
+        self.assertEqual([bytes(v) for v in
+                          iter_length_prefixed(f.getvalue())], frames)
+        f = io.BytesIO()
+        write_frames(TrafficGenerator(nb_devices=3, seed=4, down_ratio=0.5),
+                     20, "semtech", f)
+        packets = list(iter_semtech_json(io.StringIO(f.getvalue().decode())))
+        self.assertEqual([data for meta, data in packets], frames)
+        self.assertIn("txpk", [meta.kind for meta, data in packets])
+
+    def test_parallel(self):
+        kwargs = dict(nb_devices=5, seed=5)
+        jobs = split_jobs(kwargs, 101, 2)
+        self.assertEqual([n for kw, n in jobs], [51, 50])
+        self.assertEqual([kw["devaddr"] for kw, n in jobs],
+                         [0x26000000, 0x26000003])
+        f = io.BytesIO()
+        generate_parallel(kwargs, 101, 2, "hex", f, chunk_size=10)
+        self.assertEqual(f.getvalue().count(b"\n"), 101)
+        # a job failed before the end doesn't hang the parent.
+        self.assertRaises(ValueError, generate_parallel,
+                          dict(kwargs, no_such_arg=1), 10, 2, "hex", f)
+
+if __name__ == "__main__" :
+    unittest.main()
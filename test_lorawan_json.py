@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import io
+import json
+import binascii
+import lorawan_json
+from lorawan_phy_parser import decode_phy_payload, Keys
+
+####
+
+class test_lorawan_json(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_data_up(self):
+        data = binascii.a2b_hex("40B200EFBE9A0300030705070703070310040209AA50B1F0792F31AD9C63785F838D95C6FE81D29709BA3C6E19B771437C")
+        keys = Keys(None, b"\xaa" * 15 + b"\xbb", None)
+        out = io.StringIO()
+        lorawan_json.print_frame_json(decode_phy_payload(data, keys), out)
+        self.assertEqual(out.getvalue().count("\n"), 1)
+        d = json.loads(out.getvalue())
+        self.assertEqual(d["mhdr"]["mtype_name"], "Unconfirmed Data Up")
+        self.assertEqual(d["dir"], "up")
+        mp = d["mac_payload"]
+        self.assertEqual(mp["devaddr"], "beef00b2")
+        self.assertEqual(mp["fctrl"]["foptslen"], 10)
+        self.assertEqual(mp["fport"], 2)
+        self.assertEqual(mp["frm_payload_plain"][:8], "000009c4")
+        self.assertEqual([c["name"] for c in mp["mac_commands"]],
+                         ["LinkADRAns", "RXParamSetupAns", "NewChannelAns",
+                          "NewChannelAns", "PingSlotInfoReq"])
+        self.assertEqual(d["mic"], "b771437c")
+
+    def test_joinreq(self):
+        data = binascii.a2b_hex("000102030405060708111213141516171802030a0b0c0d")
+        d = lorawan_json.frame_to_dict(decode_phy_payload(data))
+        self.assertEqual(d["join_request"],
+                         { "appeui": "0807060504030201",
+                           "deveui": "1817161514131211", "devnonce": 0x0302 })
+
+    def test_dumps_compact(self):
+        obj = { "a": [1, None, "x"], "b": { "c": True } }
+        self.assertEqual(lorawan_json.dumps(obj),
+                         '{"a":[1,null,"x"],"b":{"c":true}}')
+
+if __name__ == '__main__':
+    unittest.main()
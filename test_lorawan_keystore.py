@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import os
+import json
+import sqlite3
+import tempfile
+import binascii
+from lorawan_keystore import load_keystore, save_csv, DeviceSession
+from lorawan_phy_parser import decode_phy_payload
+
+NSKEY = "44024241ed4ce9a68c6a8bc055233fd3"
+ASKEY = "ec925802ae430ca77fd3dd73cb2cc588"
+DATA = "40F17DBE4900020001954378762B11FF0D"
+
+####
+
+class test_lorawan_keystore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def check(self, ks):
+        self.assertEqual(len(ks), 2)
+        s = ks.lookup(0x49be7df1)
+        self.assertEqual(s.nskey, binascii.a2b_hex(NSKEY))
+        self.assertEqual(s.askey, binascii.a2b_hex(ASKEY))
+        self.assertIsNone(s.akey)
+        self.assertEqual(ks.lookup(0x01020304).xfcnt, 1)
+        self.assertIsNone(ks.lookup(0))
+
+    def test_csv(self):
+        with open(self.path("ks.csv"), "w") as f:
+            f.write("devaddr,nskey,askey,xfcnt\n")
+            f.write("49be7df1,%s,%s,0000\n" % (NSKEY, ASKEY))
+            f.write("01020304,%s,,0001\n" % NSKEY)
+        self.check(load_keystore(self.path("ks.csv")))
+
+    def test_csv_error(self):
+        for text, msg in [("nskey,askey\n%s,%s\n" % (NSKEY, ASKEY),
+                           "no devaddr column"),
+                          ("devaddr,nskey,askey\n49be7df1,%s,%s\n"
+                           "01020304,%s\n" % (NSKEY, ASKEY, NSKEY),
+                           "short row at line 3")]:
+            with open(self.path("ks.csv"), "w") as f:
+                f.write(text)
+            with self.assertRaises(ValueError) as cm:
+                load_keystore(self.path("ks.csv"))
+            self.assertIn(msg, str(cm.exception))
+
+    def test_save_csv(self):
+        save_csv(self.path("ks.csv"),
+                 [DeviceSession(0x49be7df1, binascii.a2b_hex(NSKEY),
+                                binascii.a2b_hex(ASKEY)),
+                  DeviceSession(0x01020304, binascii.a2b_hex(NSKEY),
+                                xfcnt=1)])
+        self.check(load_keystore(self.path("ks.csv")))
+
+    def test_json(self):
+        with open(self.path("ks.json"), "w") as f:
+            json.dump({ "49be7df1": { "nskey": NSKEY, "askey": ASKEY },
+                        "01020304": { "nskey": NSKEY, "xfcnt": 1 } }, f)
+        self.check(load_keystore(self.path("ks.json")))
+
+    def test_sqlite(self):
+        con = sqlite3.connect(self.path("ks.db"))
+        con.execute("create table sessions "
+                    "(devaddr text, nskey blob, askey text, xfcnt integer)")
+        con.execute("insert into sessions values (?,?,?,?)",
+                    ("49be7df1", binascii.a2b_hex(NSKEY), ASKEY, 0))
+        con.execute("insert into sessions values (?,?,?,?)",
+                    ("01020304", binascii.a2b_hex(NSKEY), None, 1))
+        con.commit()
+        con.close()
+        self.check(load_keystore(self.path("ks.db")))
+
+    def test_decode(self):
+        with open(self.path("ks.csv"), "w") as f:
+            f.write("devaddr,askey\n49be7df1,%s\n" % ASKEY)
+        data = binascii.a2b_hex(DATA)
+        ks = load_keystore(self.path("ks.csv"))
+        frame = decode_phy_payload(data, ks)
+        self.assertEqual(frame.payload.frm_payload_plain, b"test")
+        # the default is used for an unknown DevAddr.
+        ks.sessions.clear()
+        self.assertIsNone(decode_phy_payload(data, ks).payload.frm_payload_plain)
+        ks.default = DeviceSession(askey=binascii.a2b_hex(ASKEY))
+        self.assertEqual(decode_phy_payload(data, ks).payload.frm_payload_plain,
+                         b"test")
+
+if __name__ == '__main__':
+    unittest.main()
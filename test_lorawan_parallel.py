@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import io
+import os
+import tempfile
+import lorawan_phy_parser as parser
+from lorawan_parallel import split_file, decode_range, run_parallel
+
+####
+
+class test_lorawan_parallel(unittest.TestCase):
+
+    def setUp(self):
+        lines = [
+            "402105810080c9fe02a434eaa5f9787f187538d9b054ea0ffcb67898d4",
+            "809a4ed301080200050707030703070308d7bcacbcfa",
+            "40C1 D252 01A5 0500 0307 0703 1208 64FE 226A 9E",
+            ]
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, "w") as f:
+            for i in range(100):
+                f.write(lines[i % 3] + "\n")
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_split_file(self):
+        ranges = split_file(self.path, shard_size=100)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], os.path.getsize(self.path))
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for start, end in ranges:
+            self.assertEqual(data[end-1:end], b"\n")
+
+    def test_run_parallel(self):
+        parser.f_ignore_error = True
+        try:
+            res = io.StringIO()
+            decode_range(self.path, 0, os.path.getsize(self.path),
+                         parser.Keys(), 0, res)
+        finally:
+            parser.f_ignore_error = False
+        out = io.StringIO()
+        err = run_parallel(self.path, 2, parser.Keys(), 0, out,
+                           ignore_error=True, shard_size=500)
+        self.assertIsNone(err)
+        self.assertEqual(out.getvalue(), res.getvalue())
+        out = io.StringIO()
+        err = run_parallel(self.path, 2, parser.Keys(), 0, out,
+                           shard_size=500)
+        self.assertEqual(err, "ERROR: askey must be specified.")
+
+if __name__ == '__main__':
+    unittest.main()
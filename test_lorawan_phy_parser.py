@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import binascii
+import io
+import os
+import sys
+import subprocess
+from Crypto.Cipher import AES
+from AES_CMAC import aes_cmac
+from lorawan_phy_parser import (decode_phy_payload, print_frame, Keys,
+                                decode_mac_cmd, mac_cmd_desc, MSGDIR_DOWN,
+                                MSGDIR_UP, MTYPE_UNCONFIRMED_DATA_UP,
+                                MTYPE_CONFIRMED_DATA_UP, verify_frame_mic,
+                                verify_frame_mic_batch, FrameView)
+
+####
+
+class test_decode_phy_payload(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_data_up(self):
+        data = binascii.a2b_hex(
+                "402105810080c9fe02a434eaa5f9787f187538d9b054ea0ffcb67898d4")
+        frame = decode_phy_payload(data)
+        self.assertEqual(frame.mhdr.mtype, MTYPE_UNCONFIRMED_DATA_UP)
+        self.assertEqual(frame.msg_dir, MSGDIR_UP)
+        mp = frame.payload
+        self.assertEqual(mp.fhdr.devaddr, 0x00810521)
+        self.assertEqual(mp.fhdr.fctrl.adr, 1)
+        self.assertEqual(mp.fhdr.fctrl.foptslen, 0)
+        self.assertEqual(mp.fhdr.fcnt, 65225)
+        self.assertEqual(mp.fport, 2)
+        self.assertEqual(mp.frm_payload,
+                binascii.a2b_hex("a434eaa5f9787f187538d9b054ea0ffc"))
+        self.assertIsNone(mp.frm_payload_plain)
+        self.assertEqual(frame.mic, binascii.a2b_hex("b67898d4"))
+
+    def test_short_mac_payload(self):
+        self.assertRaises(ValueError, decode_phy_payload,
+                          binascii.a2b_hex("400102030405060708"))
+
+    def test_fopts(self):
+        data = binascii.a2b_hex("809a4ed301080200050707030703070308d7bcacbcfa")
+        frame = decode_phy_payload(data)
+        self.assertEqual(frame.mhdr.mtype, MTYPE_CONFIRMED_DATA_UP)
+        cmds = frame.payload.mac_commands
+        self.assertEqual([c.name for c in cmds],
+                         ["RXParamSetupAns", "NewChannelAns", "NewChannelAns",
+                          "NewChannelAns"])
+        self.assertEqual(cmds[0].fields["Channel_ACK"], 1)
+        self.assertEqual(cmds[1].fields["Data_rate_range_ok"], 1)
+
+    def test_decrypt(self):
+        data = binascii.a2b_hex(
+                "40B200EFBE9A0300030705070703070310040209AA50B1F0792F31AD9C6378"
+                "5F838D95C6FE81D29709BA3C6E19B771437C")
+        frame = decode_phy_payload(data,
+                keys=Keys(askey=binascii.a2b_hex(
+                    "AAAAAAAAAAAAAAAAAAAAAAAAAAAAAABB")))
+        mp = frame.payload
+        self.assertEqual(len(mp.mac_commands), 5)
+        self.assertEqual(mp.mac_commands[4].fields["Periodicity"], 4)
+        self.assertEqual(mp.frm_payload_plain,
+                         b"\x00\x00\x09\xc4" + b"\x00" * 22)
+        out = io.StringIO()
+        print_frame(frame, out)
+        self.assertIn("  x 00 00 09 c4 00", out.getvalue())
+
+    def test_mac_cmd(self):
+        self.assertEqual(mac_cmd_desc[MSGDIR_DOWN][0x03].name, "LinkADRReq")
+        self.assertIsNone(mac_cmd_desc[MSGDIR_UP][0x80])
+        # LinkADRReq, DevStatusReq, unknown
+        cmds = decode_mac_cmd(MSGDIR_DOWN,
+                              binascii.a2b_hex("0352ff000106800102"))
+        self.assertEqual([c.name for c in cmds],
+                         ["LinkADRReq", "DevStatusReq", None])
+        self.assertEqual(cmds[0].fields["DataRate"], 5)
+        self.assertEqual(cmds[0].fields["TXPower"], 2)
+        self.assertEqual(cmds[0].fields["ChMask"], 0x00ff)
+        self.assertEqual(cmds[0].fields["NbTrans"], 1)
+        self.assertEqual(cmds[2].raw, b"\x01\x02")
+        # truncated NewChannelReq
+        cmds = decode_mac_cmd(MSGDIR_DOWN, binascii.a2b_hex("070102"))
+        self.assertEqual(cmds[0].name, "NewChannelReq")
+        self.assertIsNone(cmds[0].fields)
+
+    def test_mac_cmd_fields(self):
+        cmds = decode_mac_cmd(MSGDIR_DOWN, binascii.a2b_hex("0352ff000106"))
+        fields = cmds[0].fields
+        self.assertEqual(fields.DataRate, 5)
+        self.assertEqual(dict(fields),
+                         { "DataRate_TXPower": 0x52, "DataRate": 5,
+                           "TXPower": 2, "ChMask": 0x00ff, "Redundancy": 1,
+                           "ChMaskCntl": 0, "NbTrans": 1 })
+        self.assertEqual(fields, dict(fields))
+        self.assertRaises(KeyError, lambda: fields["keys"])
+        self.assertEqual(dict(cmds[1].fields), {})
+        self.assertFalse(hasattr(fields, "__dict__"))
+        self.assertIn("__init__", type(fields).__dict__)
+        self.assertRaises(TypeError, hash, fields)
+        frame = decode_phy_payload(binascii.a2b_hex(
+                "809a4ed301080200050707030703070308d7bcacbcfa"))
+        for obj in (frame, frame.mhdr, frame.payload, frame.payload.fhdr,
+                    frame.payload.fhdr.fctrl, frame.payload.mac_commands[0]):
+            self.assertFalse(hasattr(obj, "__dict__"))
+
+    def test_verify_mic_data(self):
+        data = binascii.a2b_hex("40F17DBE4900020001954378762B11FF0D")
+        keys = Keys(binascii.a2b_hex("44024241ed4ce9a68c6a8bc055233fd3"),
+                    binascii.a2b_hex("ec925802ae430ca77fd3dd73cb2cc588"))
+        frame = decode_phy_payload(data, keys, verify_mic=True)
+        self.assertTrue(frame.mic_ok)
+        self.assertEqual(frame.payload.frm_payload_plain, b"test")
+        bad = data[:-1] + b"\x0e"
+        self.assertEqual(verify_frame_mic_batch([
+                decode_phy_payload(data, keys), decode_phy_payload(bad, keys),
+                decode_phy_payload(data)]), [True, False, None])
+
+    def test_verify_mic_join(self):
+        akey = b"\x01" * 16
+        msg = b"\x00" + bytes(range(18))
+        frame = decode_phy_payload(msg + aes_cmac(akey, msg)[:4],
+                                   Keys(akey=akey), verify_mic=True)
+        self.assertTrue(frame.mic_ok)
+        # the network server encrypts the JoinAccept by AES decrypt.
+        plain = bytes(range(12))
+        mic = aes_cmac(akey, b"\x20" + plain)[:4]
+        enc = AES.new(akey, AES.MODE_ECB).decrypt(plain + mic)
+        frame = decode_phy_payload(b"\x20" + enc, Keys(akey=akey))
+        self.assertTrue(verify_frame_mic(frame))
+        self.assertFalse(verify_frame_mic(
+                decode_phy_payload(b"\x20" + enc, Keys(akey=b"\x02" * 16))))
+
+    def test_frame_view(self):
+        data = binascii.a2b_hex("40F17DBE4900020001954378762B11FF0D")
+        keys = Keys(binascii.a2b_hex("44024241ed4ce9a68c6a8bc055233fd3"),
+                    binascii.a2b_hex("ec925802ae430ca77fd3dd73cb2cc588"))
+        v = FrameView(data, keys)
+        self.assertEqual((v.mtype, v.devaddr, v.fcnt, v.fport),
+                         (MTYPE_UNCONFIRMED_DATA_UP, 0x49be7df1, 2, 1))
+        self.assertIsNone(v.fopts)
+        self.assertIsNone(v._frame)
+        self.assertEqual(v.frm_payload_plain, b"test")
+        self.assertIs(v.frm_payload_plain, v.frm_payload_plain)
+        self.assertTrue(v.mic_ok)
+        self.assertIsNone(v.mac_commands)
+        # the Frame is decoded only if it is accessed.
+        self.assertIsNone(v._frame)
+        self.assertEqual(v.frame.payload.frm_payload_plain, b"test")
+        self.assertIs(v.frame, v.frame)
+        #
+        data = binascii.a2b_hex("40B200EFBE9A0300030705070703070310040209AA50B1F0792F31AD9C63785F838D95C6FE81D29709BA3C6E19B771437C")
+        v = FrameView(data)
+        self.assertEqual(v.foptslen, 10)
+        self.assertEqual(len(v.mac_commands), 5)
+        self.assertIsNone(v.frm_payload_plain)
+        self.assertIsNone(v.mic_ok)
+        self.assertRaises(ValueError, FrameView, b"\x40\x01\x02\x03\x04\x05")
+
+    def test_cli_abort(self):
+        # the error is printed instead of the traceback.
+        p = subprocess.run([sys.executable, "lorawan_phy_parser.py", "test"],
+                           stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                           cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(p.returncode, 1)
+        self.assertIn(b"Abort.\nERROR: askey must be specified.", p.stdout)
+        self.assertNotIn(b"Traceback", p.stderr)
+
+    def test_lazy_import(self):
+        # the crypto, the CLI and the detail texts are not imported until
+        # they are used.
+        code = """if True:
+            import sys, binascii
+            from lorawan_phy_parser import decode_phy_payload, Keys
+            lazy = ["Crypto", "lorawan_cipher", "argparse", "re",
+                    "lorawan_mac_detail"]
+            print(",".join([m for m in lazy if m in sys.modules]))
+            decode_phy_payload(binascii.a2b_hex(
+                    "40F17DBE4900020001954378762B11FF0D"),
+                    Keys(askey=bytes(16)))
+            print(",".join([m for m in lazy if m in sys.modules]))
+            """
+        out = subprocess.check_output([sys.executable, "-c", code],
+                cwd=os.path.dirname(os.path.abspath(__file__)))
+        before, after = out.decode().splitlines()
+        self.assertEqual(before, "")
+        self.assertIn("Crypto", after.split(","))
+        self.assertNotIn("argparse", after.split(","))
+
+if __name__ == '__main__':
+    unittest.main()
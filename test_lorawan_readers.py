@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import os
+import json
+import struct
+import base64
+import tempfile
+import binascii
+from lorawan_readers import (read_frames, iter_length_prefixed,
+                             iter_pcap_frames, LINKTYPE_LORATAP,
+                             LINKTYPE_ETHERNET)
+from lorawan_phy_parser import decode_stream
+
+DATA_UP = binascii.a2b_hex("40F17DBE4900020001954378762B11FF0D")
+FOPTS_UP = binascii.a2b_hex("40C1D25201A5050003070703120864FE226A9E")
+
+def loratap(frame):
+    # version | padding | length | the rest of the header (11 bytes)
+    return b"\x00\x00\x00\x0f" + b"\x00" * 11 + frame
+
+def semtech_udp(frames):
+    rxpk = [{ "tmst": 1, "data": base64.b64encode(f).decode() }
+            for f in frames]
+    body = b"\x02\x12\x34\x00" + b"\x01" * 8
+    body += json.dumps({ "rxpk": rxpk }).encode()
+    udp = struct.pack(">HHHH", 1700, 1700, 8 + len(body), 0) + body
+    ip = struct.pack(">BBHHHBBH4s4s", 0x45, 0, 20 + len(udp), 0, 0, 64, 17,
+                     0, b"\x7f\x00\x00\x01", b"\x7f\x00\x00\x01")
+    return b"\x00" * 12 + b"\x08\x00" + ip + udp
+
+def pcap(linktype, pkts):
+    data = struct.pack("<IHHiIII", 0xa1b2c3d4, 2, 4, 0, 0, 65535, linktype)
+    for p in pkts:
+        data += struct.pack("<IIII", 0, 0, len(p), len(p)) + p
+    return data
+
+def pcapng_block(block_type, body):
+    body += b"\x00" * (-len(body) % 4)
+    n = len(body) + 12
+    return struct.pack("<II", block_type, n) + body + struct.pack("<I", n)
+
+def pcapng(linktypes, pkts):
+    data = pcapng_block(0x0a0d0d0a, struct.pack("<IHHq", 0x1a2b3c4d, 1, 0, -1))
+    for linktype in linktypes:
+        data += pcapng_block(1, struct.pack("<HHI", linktype, 0, 65535))
+    for if_id, p in pkts:
+        data += pcapng_block(6, struct.pack("<IIIII", if_id, 0, 0, len(p),
+                                            len(p)) + p)
+    return data
+
+####
+
+class test_lorawan_readers(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_length_prefixed(self):
+        data = b"".join([len(f).to_bytes(2, "big") + f
+                         for f in [DATA_UP, FOPTS_UP]])
+        path = self.write("frames.bin", data)
+        frames = list(read_frames(path, "binary"))
+        self.assertTrue(all([isinstance(f, memoryview) for f in frames]))
+        self.assertEqual([bytes(f) for f in frames], [DATA_UP, FOPTS_UP])
+        r = list(decode_stream(frames))
+        self.assertEqual(r[1].payload.fhdr.devaddr, 0x0152d2c1)
+        self.assertEqual(list(read_frames(self.write("empty.bin", b""),
+                                          "binary")), [])
+        self.assertRaises(ValueError, list, iter_length_prefixed(data[:-1]))
+
+    def test_pcap_loratap(self):
+        path = self.write("lt.pcap", pcap(LINKTYPE_LORATAP,
+                                          [loratap(DATA_UP),
+                                           loratap(FOPTS_UP)]))
+        self.assertEqual([bytes(f) for f in read_frames(path, "pcap")],
+                         [DATA_UP, FOPTS_UP])
+
+    def test_pcap_semtech(self):
+        path = self.write("udp.pcap", pcap(LINKTYPE_ETHERNET,
+                                           [semtech_udp([DATA_UP, FOPTS_UP]),
+                                            semtech_udp([DATA_UP])]))
+        self.assertEqual(list(read_frames(path, "pcap")),
+                         [DATA_UP, FOPTS_UP, DATA_UP])
+
+    def test_pcapng(self):
+        data = pcapng([LINKTYPE_LORATAP, LINKTYPE_ETHERNET],
+                      [(0, loratap(FOPTS_UP)), (1, semtech_udp([DATA_UP]))])
+        self.assertEqual([bytes(f) for f in iter_pcap_frames(data)],
+                         [FOPTS_UP, DATA_UP])
+        self.assertRaises(ValueError, list, iter_pcap_frames(b"\x00" * 24))
+        # the EPB of an interface not described, and the SPB before any IDB.
+        data = pcapng([LINKTYPE_LORATAP], [(1, loratap(DATA_UP))])
+        self.assertRaises(ValueError, list, iter_pcap_frames(data))
+        data = pcapng([], []) + pcapng_block(3, struct.pack("<I", 4) +
+                                             b"\x00" * 4)
+        self.assertRaises(ValueError, list, iter_pcap_frames(data))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import io
+import json
+import contextlib
+import binascii
+from lorawan_semtech import (iter_json_stream, iter_semtech_json,
+                             iter_udp_packets, iter_udp_frames)
+from lorawan_phy_parser import decode_stream
+
+DATA_UP = binascii.a2b_hex("40F17DBE4900020001954378762B11FF0D")
+RXPK = { "tmst": 3512348611, "freq": 866.349812, "datr": "SF7BW125",
+         "rssi": -35, "lsnr": 5.1, "data": "QPF9vkkAAgABlUN4disR/w0=" }
+TXPK = { "imme": True, "freq": 864.123456, "datr": "SF11BW125",
+         "data": "QPF9vkkAAgABlUN4disR/w0=" }
+
+####
+
+class test_lorawan_semtech(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_json_stream(self):
+        text = '{"a": [1, 2]}\n{"b": "x y"}\n\n12345 [{"c": null}, 6.5]'
+        for chunk_size in [1, 2, 3, 7, 1024]:
+            r = list(iter_json_stream(io.StringIO(text), chunk_size))
+            self.assertEqual(r, [{"a": [1, 2]}, {"b": "x y"}, 12345,
+                                 {"c": None}, 6.5])
+        self.assertRaises(ValueError, list,
+                          iter_json_stream(io.StringIO('{"a": 1} {"b"'), 4))
+
+    def test_json_stream_garbage(self):
+        good = json.dumps({ "rxpk": [RXPK] })
+        text = "\n".join(["xyz {", '{"rxpk": [{"data": "QPF9', good,
+                          '{"a": 1 "b"}', good, "}}", good])
+        for chunk_size in [1, 5, 16, 1024]:
+            err = io.StringIO()
+            with contextlib.redirect_stderr(err):
+                r = list(iter_semtech_json(io.StringIO(text), chunk_size))
+            self.assertEqual(len(r), 3)
+            self.assertTrue(all([d == DATA_UP for m, d in r]))
+            self.assertEqual(err.getvalue().count("WARNING"), 4)
+
+    def test_json_stream_multiline(self):
+        # the lines before the error in a pretty-printed value are not
+        # read again as the values.
+        bad = '{\n  "rxpk": [\n    %s\n  ],\n  "stat": }' % json.dumps(RXPK)
+        text = "\n".join([bad, json.dumps({ "rxpk": [RXPK] })])
+        for chunk_size in [1, 7, 1024]:
+            err = io.StringIO()
+            with contextlib.redirect_stderr(err):
+                r = list(iter_semtech_json(io.StringIO(text), chunk_size))
+            self.assertEqual(len(r), 1)
+            self.assertEqual(err.getvalue().count("WARNING"), 1)
+
+    def test_semtech_json(self):
+        text = "\n".join([json.dumps({ "rxpk": [RXPK, RXPK] }),
+                          json.dumps({ "txpk": TXPK }), json.dumps(RXPK)])
+        r = list(iter_semtech_json(io.StringIO(text), chunk_size=16))
+        self.assertEqual([m.kind for m, d in r],
+                         ["rxpk", "rxpk", "txpk", "rxpk"])
+        self.assertTrue(all([d == DATA_UP for m, d in r]))
+        meta = r[0][0]
+        self.assertEqual((meta.tmst, meta.freq, meta.datr, meta.rssi,
+                          meta.lsnr), (3512348611, 866.349812, "SF7BW125",
+                                       -35, 5.1))
+        self.assertIsNone(r[2][0].rssi)
+        frames = list(decode_stream(r, with_meta=True))
+        self.assertIs(frames[0].meta, meta)
+        self.assertEqual(frames[3].payload.fhdr.devaddr, 0x49be7df1)
+
+    def test_udp(self):
+        datagram = b"\x02\x12\x34\x00" + b"\x01\x02\x03\x04\x05\x06\x07\x08"
+        datagram += json.dumps({ "rxpk": [RXPK] }).encode()
+        r = list(iter_udp_packets(datagram))
+        self.assertEqual(r[0][0].gweui, 0x0102030405060708)
+        self.assertEqual(r[0][1], DATA_UP)
+        datagram = b"\x02\x12\x34\x03" + json.dumps({ "txpk": TXPK }).encode()
+        self.assertEqual(list(iter_udp_frames(datagram)), [DATA_UP])
+        self.assertEqual(list(iter_udp_frames(b"\x02\x12\x34\x02")), [])
+
+if __name__ == '__main__':
+    unittest.main()
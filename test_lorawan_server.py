@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import asyncio
+import binascii
+import concurrent.futures
+from lorawan_server import DecodeServer, simulate
+from lorawan_phy_parser import Keys
+
+DATA_UP = binascii.a2b_hex("40F17DBE4900020001954378762B11FF0D")
+ASKEY = binascii.a2b_hex("ec925802ae430ca77fd3dd73cb2cc588")
+
+####
+
+class test_lorawan_server(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def run_server(self, executor, frames, per_push=1):
+        results = []
+        async def run():
+            server = DecodeServer(Keys(askey=ASKEY), on_result=results.append,
+                                  executor=executor)
+            host, port = await server.start("127.0.0.1", 0)
+            nb_acks = await simulate(host, port, frames, per_push=per_push)
+            await server.drain()
+            await server.stop()
+            return nb_acks, server.stats
+        nb_acks, stats = asyncio.run(run())
+        return nb_acks, stats, results
+
+    def test_threads(self):
+        frames = [DATA_UP] * 5 + [b"\x40\x01"]
+        nb_acks, stats, results = self.run_server(
+                concurrent.futures.ThreadPoolExecutor(2), frames, per_push=2)
+        self.assertEqual(nb_acks, 3)
+        self.assertEqual((stats["received"], stats["decoded"],
+                          stats["errors"]), (6, 5, 1))
+        ok = [r for r in results if "error" not in r]
+        self.assertEqual(ok[0]["mac_payload"]["frm_payload_plain"], "74657374")
+        self.assertEqual(ok[0]["radio"]["datr"], "SF7BW125")
+
+    def test_processes(self):
+        nb_acks, stats, results = self.run_server(None, [DATA_UP] * 3)
+        self.assertEqual(nb_acks, 3)
+        self.assertEqual(stats["decoded"], 3)
+        self.assertEqual(results[0]["mac_payload"]["devaddr"], "49be7df1")
+
+if __name__ == '__main__':
+    unittest.main()
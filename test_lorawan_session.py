@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import struct
+from Crypto.Cipher import AES
+from lorawan_cipher import (lorawan_gen_key, lorawan_mic_joinreq,
+                            lorawan_mic_joinaccept, lorawan_mic_data)
+from LoRaMacPayloadEncrypt import LoRaMacPayloadEncryptRaw
+from lorawan_keystore import KeyStore, DeviceSession
+from lorawan_session import SessionDeriver
+from lorawan_fcnt import FCntTracker
+from lorawan_phy_parser import decode_stream
+
+APPKEY = b"\x2b\x7e\x15\x16\x28\xae\xd2\xa6\xab\xf7\x15\x88\x09\xcf\x4f\x3c"
+DEVEUI = 0x0102030405060708
+DEVADDR = 0x26011234
+
+def make_joinreq(appkey, devnonce):
+    msg = struct.pack("<BQQH", 0x00, 0x7000000000000001, DEVEUI, devnonce)
+    return msg + lorawan_mic_joinreq(appkey, msg)
+
+def make_joinaccept(appkey, cflist=b""):
+    plain = b"\x01\x02\x03" + b"\x13\x00\x00" + struct.pack("<I", DEVADDR)
+    plain += b"\x02\x01" + cflist
+    mic = lorawan_mic_joinaccept(appkey, b"\x20" + plain)
+    return b"\x20" + AES.new(appkey, AES.MODE_ECB).decrypt(plain + mic)
+
+def make_data(nskey, askey, fcnt, plain):
+    msg = struct.pack("<BIBHB", 0x40, DEVADDR, 0, fcnt & 0xffff, 1)
+    msg += LoRaMacPayloadEncryptRaw(plain, askey, DEVADDR, 0, fcnt)
+    return msg + lorawan_mic_data(nskey, msg, DEVADDR, 0, fcnt)
+
+####
+
+class test_lorawan_session(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_gen_key(self):
+        nskey, askey = lorawan_gen_key(APPKEY, b"\x01\x02\x03",
+                                       b"\x13\x00\x00", b"\x05\x00")
+        cipher = AES.new(APPKEY, AES.MODE_ECB)
+        base = b"\x01\x02\x03\x13\x00\x00\x05\x00" + b"\x00" * 7
+        self.assertEqual(nskey, cipher.encrypt(b"\x01" + base))
+        self.assertEqual(askey, cipher.encrypt(b"\x02" + base))
+
+    def test_joinaccept_cflist(self):
+        cflist = b"\x18\x4f\x84" * 5 + b"\x00"
+        ks = KeyStore(default=DeviceSession(akey=APPKEY))
+        frame = next(decode_stream([make_joinaccept(APPKEY, cflist)], ks,
+                                   verify_mic=True))
+        ja = frame.payload
+        self.assertTrue(frame.mic_ok)
+        self.assertEqual((ja.appnonce, ja.netid, ja.devaddr), (0x030201, 0x13,
+                                                               DEVADDR))
+        self.assertEqual((ja.dlsettings, ja.rxdelay), (2, 1))
+        self.assertEqual(ja.cflist, { "CFListType": 0,
+                                      "Freq": [8671000] * 5 })
+
+    def test_derive(self):
+        nskey, askey = lorawan_gen_key(APPKEY, b"\x01\x02\x03",
+                                       b"\x13\x00\x00", b"\x05\x00")
+        frames = [
+            make_joinreq(b"\x00" * 16, 4),
+            make_joinreq(APPKEY, 5),
+            make_joinaccept(APPKEY),
+            make_data(nskey, askey, 1, b"hello"),
+            ]
+        other = 0x0807060504030201
+        ks = KeyStore()
+        deriver = SessionDeriver(ks, appkeys={ DEVEUI: APPKEY,
+                                               other: b"\x00" * 16 })
+        r = list(decode_stream(frames, ks, verify_mic=True,
+                               session_deriver=deriver))
+        self.assertTrue(r[2].mic_ok)
+        self.assertEqual(r[2].payload.devaddr, DEVADDR)
+        self.assertEqual(r[3].payload.frm_payload_plain, b"hello")
+        self.assertTrue(r[3].mic_ok)
+        s = ks.lookup(DEVADDR)
+        self.assertEqual((s.nskey, s.askey, s.akey), (nskey, askey, APPKEY))
+        self.assertEqual(len(deriver.pending), 0)
+
+    def test_rejoin_fcnt(self):
+        # the FCnt of the old session doesn't affect the new session.
+        nskey, askey = lorawan_gen_key(APPKEY, b"\x01\x02\x03",
+                                       b"\x13\x00\x00", b"\x06\x00")
+        ks = KeyStore()
+        tracker = FCntTracker()
+        tracker.update(DEVADDR, 0, 70000)
+        deriver = SessionDeriver(ks, appkeys={ DEVEUI: APPKEY },
+                                 fcnt_tracker=tracker)
+        frames = [
+            make_joinreq(APPKEY, 6),
+            make_joinaccept(APPKEY),
+            make_data(nskey, askey, 0, b"again"),
+            ]
+        r = list(decode_stream(frames, ks, verify_mic=True,
+                               fcnt_tracker=tracker, session_deriver=deriver))
+        self.assertEqual(r[2].payload.fcnt32, 0)
+        self.assertEqual(r[2].payload.frm_payload_plain, b"again")
+        self.assertTrue(r[2].mic_ok)
+
+if __name__ == '__main__':
+    unittest.main()
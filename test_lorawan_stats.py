@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import io
+import binascii
+from lorawan_phy_parser import decode_stream, Keys
+from lorawan_stats import Stats
+
+NSKEY = binascii.a2b_hex("44024241ed4ce9a68c6a8bc055233fd3")
+ASKEY = binascii.a2b_hex("ec925802ae430ca77fd3dd73cb2cc588")
+DATA_UP = binascii.a2b_hex("40F17DBE4900020001954378762B11FF0D")
+BAD_MIC = binascii.a2b_hex("40F17DBE4900020001954378762B11FF0E")
+UNKNOWN_CID = binascii.a2b_hex("40C1D25201A1050080070703120864FE226A9E")
+
+####
+
+class test_lorawan_stats(unittest.TestCase):
+
+    def test_counters(self):
+        stats = Stats()
+        frames = list(decode_stream([DATA_UP, BAD_MIC, UNKNOWN_CID],
+                                    Keys(NSKEY, ASKEY), verify_mic=True,
+                                    stats=stats))
+        self.assertEqual(len(frames), 3)
+        s = stats.snapshot()
+        self.assertEqual(s["counters"]["frames"], 3)
+        self.assertEqual(s["counters"]["decrypts"], 3)
+        self.assertEqual(s["counters"]["mic_ok"], 1)
+        self.assertEqual(s["counters"]["mic_failures"], 2)
+        self.assertEqual(s["counters"]["unknown_cids"], 1)
+        self.assertGreater(s["timers"]["decode"], 0)
+        self.assertGreater(s["timers"]["crypto"], 0)
+        self.assertGreater(s["timers"]["mic"], 0)
+
+    def test_errors(self):
+        stats = Stats()
+        with self.assertRaises(ValueError):
+            list(decode_stream([DATA_UP, b"\x40"], stats=stats))
+        s = stats.snapshot()
+        self.assertEqual(s["counters"]["frames"], 1)
+        self.assertEqual(s["errors"], { "ValueError": 1 })
+
+    def test_report(self):
+        now = [0.0]
+        out = io.StringIO()
+        stats = Stats(interval=10, out=out, clock=lambda: now[0])
+        for i in range(3):
+            now[0] += 4
+            list(decode_stream([DATA_UP], stats=stats))
+        self.assertEqual(out.getvalue().count("\n"), 1)
+        self.assertIn("frames=3", out.getvalue())
+
+    def test_merge(self):
+        a = Stats()
+        b = Stats()
+        list(decode_stream([DATA_UP], stats=a))
+        list(decode_stream([DATA_UP, DATA_UP], stats=b))
+        b.error(ValueError())
+        a.merge(b.snapshot())
+        s = a.snapshot()
+        self.assertEqual(s["counters"]["frames"], 3)
+        self.assertEqual(s["errors"], { "ValueError": 1 })
+        out = io.StringIO()
+        a.summary(out)
+        self.assertIn("frames: 3", out.getvalue())
+
+if __name__ == "__main__" :
+    unittest.main()
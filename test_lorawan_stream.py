@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import io
+from lorawan_stream import iter_lines, iter_hex_frames, BatchWriter
+
+####
+
+class test_lorawan_stream(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_iter_lines(self):
+        data = b"0102\n\n0304\r\n05060708\n0a0b"
+        for chunk_size in [1, 3, 5, 1024]:
+            r = list(iter_lines(io.BytesIO(data), chunk_size=chunk_size))
+            self.assertEqual(r, [b"0102", b"", b"0304\r", b"05060708",
+                                 b"0a0b"])
+
+    def test_iter_hex_frames(self):
+        lines = [b"01020304", b"", b"0102 0304", b"01.2.03.4",
+                 b"0x01,0x02,0x03,0x04", b"0102,0304\r"]
+        r = list(iter_hex_frames(lines))
+        self.assertEqual(r, [b"\x01\x02\x03\x04"] * 5)
+
+    def test_batch_writer(self):
+        f = io.StringIO()
+        out = BatchWriter(f, flush_size=10)
+        print("abc", file=out)
+        self.assertEqual(f.getvalue(), "")
+        print("defghijk", file=out)
+        self.assertEqual(f.getvalue(), "abc\ndefghijk")
+        print("x", file=out)
+        out.flush()
+        self.assertEqual(f.getvalue(), "abc\ndefghijk\nx\n")
+
+if __name__ == '__main__':
+    unittest.main()